@@ -0,0 +1,36 @@
+"""
+Prints every numeric metric two benchmark runs have in common with the
+relative change:
+
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+"""
+import json
+import sys
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_metrics = dict(_flatten(old["results"]))
+    new_metrics = dict(_flatten(new["results"]))
+    print(f"{'metric':<50} {old.get('commit') or 'old':>12} {new.get('commit') or 'new':>12} {'change':>9}")
+    for key in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[key], new_metrics[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"{key:<50} {before:>12} {after:>12} {change:>9}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    compare(sys.argv[1], sys.argv[2])
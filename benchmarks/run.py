@@ -0,0 +1,271 @@
+"""
+Offline benchmark suite. Serves fixtures from a local HTTP server, times
+the scraper's hot paths and writes one JSON file per run:
+
+    python -m benchmarks.run                         # everything except db/selenium
+    python -m benchmarks.run --only sitemap,utils
+    python -m benchmarks.run --db                    # also DB writes (uses DB_URL)
+    python -m benchmarks.run --selenium              # also update_names_for_urls
+    python -m benchmarks.compare old.json new.json
+
+Results go to benchmarks/results/<commit>.json unless --output is given.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# The shared HTTP client would otherwise rate-limit the local server, and
+# its AIMD limiter would read local queueing delay as congestion and shrink
+# the concurrency limit: pin it so the extractor itself is what is timed.
+os.environ.setdefault("HTTP_RATE_LIMIT", "0")
+os.environ.setdefault("HTTP_LATENCY_SPIKE_FACTOR", "0")
+os.environ.setdefault("HTTP_INITIAL_CONCURRENCY", "64")
+os.environ.setdefault("HTTP_MIN_CONCURRENCY", "64")
+os.environ.setdefault("HTTP_MAX_CONCURRENCY", "64")
+
+from benchmarks.server import FixtureServer  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BENCHMARKS = ("sitemap", "extractor", "selenium", "utils", "geocoder", "db")
+DEFAULT_BENCHMARKS = ("sitemap", "extractor", "utils", "geocoder")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _latency_stats(latencies, elapsed):
+    return {
+        "pages": len(latencies),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+    }
+
+
+def _throughput(fn, inputs, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for value in inputs:
+            fn(value)
+    elapsed = time.perf_counter() - started
+    calls = repeat * len(inputs)
+    return {"calls": calls, "seconds": round(elapsed, 3), "calls_per_second": round(calls / elapsed)}
+
+
+def bench_sitemap(server, args):
+    from src.Scraper.sitemap_handler import iter_sitemap_entries
+    server.sitemap()  # build it before timing
+
+    started = time.perf_counter()
+    count = sum(1 for _ in iter_sitemap_entries(server.sitemap_url, 1))
+    elapsed = time.perf_counter() - started
+
+    # Separate pass: tracemalloc slows parsing down too much to time it.
+    gc.collect()
+    tracemalloc.start()
+    sum(1 for _ in iter_sitemap_entries(server.sitemap_url, 1))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "urls": count,
+        "seconds": round(elapsed, 3),
+        "urls_per_second": round(count / elapsed),
+        "peak_traced_mb": round(peak / 2**20, 2),
+        "gz_bytes": len(server.sitemap()),
+    }
+
+
+def bench_extractor(server, args):
+    from src.Scraper.http_client import get_client
+    from src.Scraper.http_extractor import create_session, fetch_campground
+    urls = server.page_urls(args.pages)
+    session = create_session(args.workers)
+
+    def fetch(url):
+        started = time.perf_counter()
+        fetch_campground(session, url, {})
+        return time.perf_counter() - started
+
+    try:
+        fetch(urls[0])  # warm up the connection pool
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            latencies = list(executor.map(fetch, urls))
+        elapsed = time.perf_counter() - started
+    finally:
+        session.close()
+    host = get_client().host_state(urls[0]).snapshot()
+    return {
+        "workers": args.workers,
+        # Should stay at the pinned limit with no failures; anything else
+        # means the numbers include client-side throttling.
+        "concurrency_limit": host["concurrency_limit"],
+        "http_failures": host["failures"],
+        **_latency_stats(latencies, elapsed),
+    }
+
+
+def bench_selenium(server, args):
+    from src.Scraper.scraper import WebDriverPool, update_names_for_urls
+    urls = server.page_urls(min(args.pages, 50))
+    pool = WebDriverPool(size=args.browser_workers)
+    started = time.perf_counter()
+    results = update_names_for_urls({url: {} for url in urls}, pool=pool)
+    elapsed = time.perf_counter() - started
+    if not pool.latencies:
+        return {"skipped": "no pages rendered (is Chrome installed?)"}
+    return {
+        "workers": pool.size,
+        "extracted": len(results),
+        "peak_driver_rss_mb": round(max(pool.peak_rss.values(), default=0) / 2**20, 1),
+        **_latency_stats(pool.latencies, elapsed),
+    }
+
+
+def bench_utils(server, args):
+    from src.Scraper.utils import extract_prices, get_nearest_city, normalize_timestamp
+    prices = ["$12 - $45 / night", "$30 / night", "From $18 - $22", "Free", "$7.50 - $15.25 / night"]
+    drive_times = [
+        "1 hr 10 min from Moab 2 hr 5 min from Grand Junction",
+        "35 min from Bend",
+        "3 hrs from Salt Lake City 45 min from Provo",
+        "",
+    ]
+    timestamps = ["2024-05-01T12:00:00+00:00", "2024-05-01T12:00:00Z", "2024-05-01"]
+    logging.disable(logging.CRITICAL)
+    try:
+        return {
+            "extract_prices": _throughput(extract_prices, prices, args.repeat),
+            "get_nearest_city": _throughput(get_nearest_city, drive_times, args.repeat),
+            "normalize_timestamp": _throughput(normalize_timestamp, timestamps, args.repeat),
+        }
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def bench_geocoder(server, args):
+    from src.Scraper.geocoder import get_geocoder
+    started = time.perf_counter()
+    geocoder = get_geocoder()
+    load = time.perf_counter() - started
+    rng = random.Random(42)
+    points = [(rng.uniform(24, 50), rng.uniform(-125, -66)) for _ in range(args.repeat)]
+    started = time.perf_counter()
+    geocoder.nearest_many(points)
+    elapsed = time.perf_counter() - started
+    return {
+        "places": geocoder.size,
+        "load_seconds": round(load, 4),
+        "lookups": len(points),
+        "us_per_lookup": round(elapsed / len(points) * 1e6, 2),
+    }
+
+
+def bench_db(server, args):
+    from src.db import db_methods
+    db_methods.create_table()
+    prefix = f"https://benchmark.invalid/{uuid.uuid4().hex}/"
+
+    def record(index, price):
+        rng = random.Random(index)  # same coordinates on every pass
+        return {
+            "id": str(uuid.uuid4()), "type": "campground", "links": f"{prefix}{index}", "name": f"Benchmark {index}",
+            "latitude": rng.uniform(24, 50), "longitude": rng.uniform(-125, -66), "region_name": "Utah",
+            "administrative_area": None, "nearest_city_name": None, "accommodation_type_names": ["Tent"],
+            "bookable": index % 2 == 0, "camper_types": ["Tent"], "operator": None, "photo_url": None,
+            "photo_urls": [], "photos_count": 0, "rating": 4.0, "reviews_count": 1, "slug": f"benchmark-{index}",
+            "price_low": price, "price_high": price + 10, "availability_updated_at": None,
+        }
+
+    def write(price):
+        writer = db_methods.CampgroundBatchWriter()
+        started = time.perf_counter()
+        with writer:
+            for index in range(args.rows):
+                writer.add(record(index, price))
+        elapsed = time.perf_counter() - started
+        return {"rows": args.rows, "seconds": round(elapsed, 3), "rows_per_second": round(args.rows / elapsed),
+                **writer.stats}
+
+    try:
+        return {"insert": write(10.0), "unchanged": write(10.0), "update": write(11.0)}
+    finally:
+        with db_methods.get_cursor() as cur:
+            cur.execute("DELETE FROM campgrounds WHERE links LIKE %s", (prefix + "%",))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help=f"comma separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--db", action="store_true", help="include DB write benchmark (uses DB_URL)")
+    parser.add_argument("--selenium", action="store_true", help="include update_names_for_urls (needs Chrome)")
+    parser.add_argument("--sitemap-urls", type=int, default=100000)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--browser-workers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    selected = list(DEFAULT_BENCHMARKS)
+    if args.db:
+        selected.append("db")
+    if args.selenium:
+        selected.append("selenium")
+    if args.only:
+        selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {},
+    }
+    with FixtureServer(sitemap_urls=args.sitemap_urls) as server:
+        for name in selected:
+            print(f"[{name}] running...", file=sys.stderr)
+            try:
+                report["results"][name] = globals()[f"bench_{name}"](server, args)
+            except Exception as e:
+                report["results"][name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"[{name}] {json.dumps(report['results'][name])}", file=sys.stderr)
+    report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Local HTTP server for the benchmarks and tests. Serves a synthetic gzipped
+sitemap, campground pages rendered from fixtures/campground_page.html and a
+map search stub, so every run sees the same bytes and no request leaves the
+machine.
+
+    GET /sitemaps/campgrounds.xml.gz   -> SITEMAP_URLS <url> entries, with an ETag; a
+                                          matching If-None-Match gets a 304
+    GET /camping/<region>/<slug>       -> fixture page for that campground
+    GET /api/v6/locations/search-results?filter[search][bbox]=w,s,e,n&page[number]=&page[size]=
+                                       -> map search stub over `map_campgrounds`
+                                          points, at most page[size] per page
+"""
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SITEMAP_PATH = "/sitemaps/campgrounds.xml.gz"
+MAP_SEARCH_PATH = "/api/v6/locations/search-results"
+# Every this-many map points share one location, so a small enough box
+# still holds more than a page of results and has to be paged through.
+MAP_CLUSTER_EVERY = 50
+MAP_CLUSTER_POINT = (-111.5, 38.5)
+REGIONS = ["utah", "colorado", "california", "arizona", "oregon", "montana", "wyoming", "washington"]
+
+
+def campground_path(index):
+    return f"/camping/{REGIONS[index % len(REGIONS)]}/benchmark-campground-{index}"
+
+
+def build_sitemap(base_url, count):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+             'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">\n']
+    for index in range(count):
+        parts.append(
+            f"<url><loc>{base_url}{campground_path(index)}</loc>"
+            f"<lastmod>2024-{index % 12 + 1:02d}-{index % 28 + 1:02d}T12:00:00+00:00</lastmod>"
+            f"<image:image><image:loc>https://images.example.org/{index}-1.jpg</image:loc></image:image>"
+            f"<image:image><image:loc>https://images.example.org/{index}-2.jpg</image:loc></image:image>"
+            "</url>\n"
+        )
+    parts.append("</urlset>\n")
+    return gzip.compress("".join(parts).encode(), compresslevel=6)
+
+
+def map_point(index):
+    """
+    Search result `index` of the map stub, a JSON:API resource like the
+    real endpoint's. Its slug and region point at the fixture page.
+    """
+    rng = random.Random(index)
+    longitude, latitude = MAP_CLUSTER_POINT if index % MAP_CLUSTER_EVERY == 0 else (
+        rng.uniform(-124.5, -67.0), rng.uniform(25.0, 49.0))
+    region = REGIONS[index % len(REGIONS)]
+    return {
+        "id": str(index),
+        "type": "campground",
+        "attributes": {
+            "name": f"Benchmark Campground {index}",
+            "slug": f"benchmark-campground-{index}",
+            "latitude": latitude,
+            "longitude": longitude,
+            "region-name": region.title(),
+            "bookable": index % 2 == 0,
+            "rating": round(3 + rng.random() * 2, 1),
+            "reviews-count": index % 300,
+            "price-low": 10 + index % 20,
+            "price-high": 40 + index % 30,
+            "campground-type": "dispersed" if index % 5 == 0 else "campground",
+        },
+    }
+
+
+def search_map(points, query):
+    params = parse_qs(query)
+    west, south, east, north = (float(v) for v in params["filter[search][bbox]"][0].split(","))
+    page = int(params.get("page[number]", ["1"])[0])
+    size = int(params.get("page[size]", ["500"])[0])
+    matches = [
+        point for point in points
+        if west <= point["attributes"]["longitude"] <= east and south <= point["attributes"]["latitude"] <= north
+    ]
+    return {"data": matches[(page - 1) * size:page * size]}
+
+
+def render_page(template, region, slug):
+    # Deterministic per slug, so the same URL always renders the same page.
+    seed = int(hashlib.blake2b(slug.encode(), digest_size=4).hexdigest(), 16)
+    latitude = 31 + (seed % 1800) / 100
+    longitude = -124 + (seed % 5600) / 100
+    name = slug.replace("-", " ").title()
+    attributes = {
+        "name": name,
+        "slug": slug,
+        "latitude": latitude,
+        "longitude": longitude,
+        "region-name": region.title(),
+        "administrative-area": f"{region.title()} National Forest",
+        "nearest-city-name": "Moab",
+        "accommodation-type-names": ["Tent", "RV", "Cabin"],
+        "camper-types": ["Tent", "RV"],
+        "bookable": seed % 2 == 0,
+        "operator": "Forest Service",
+        "rating": round(3 + (seed % 20) / 10, 1),
+        "reviews-count": seed % 300,
+        "price-low": 10 + seed % 20,
+        "price-high": 40 + seed % 30,
+        "campground-type": "campground",
+    }
+    next_data = {"props": {"pageProps": {"campground": {"id": str(seed), "type": "campgrounds", "attributes": attributes}}}}
+    return template.format(
+        name=name,
+        slug=slug,
+        type="Campground",
+        area=attributes["administrative-area"],
+        region_title=region.title(),
+        latitude=latitude,
+        longitude=longitude,
+        rating=attributes["rating"],
+        reviews=attributes["reviews-count"],
+        price_low=attributes["price-low"],
+        price_high=attributes["price-high"],
+        availability="<button>Check Availability</button>" if attributes["bookable"] else "",
+        photos="\n".join(f'<img src="https://images.example.org/{slug}-{i}.jpg" alt="">' for i in range(24)),
+        description=" ".join(["Quiet sites along the river with shade and vault toilets."] * 40),
+        next_data=json.dumps(next_data),
+    ).encode()
+
+
+class FixtureServer:
+    def __init__(self, sitemap_urls=100000, map_campgrounds=2000, host="127.0.0.1", port=0):
+        with open(os.path.join(FIXTURE_DIR, "campground_page.html"), encoding="utf-8") as f:
+            template = f.read()
+        self.sitemap_urls = sitemap_urls
+        self.map_points = [map_point(index) for index in range(map_campgrounds)]
+        self.map_requests = 0
+        self.page_requests = 0
+        self.sitemap_requests = 0
+        self.sitemap_not_modified = 0
+        self._counter_lock = threading.Lock()
+        self._sitemap = None
+        self._sitemap_etag = None
+        self._sitemap_lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type, etag=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == SITEMAP_PATH:
+                    body, etag = server.sitemap(), server.sitemap_etag()
+                    server.count("sitemap_requests")
+                    if self.headers.get("If-None-Match") == etag:
+                        server.count("sitemap_not_modified")
+                        self._send(304, b"", "application/gzip", etag)
+                        return
+                    self._send(200, body, "application/gzip", etag)
+                    return
+                if path == MAP_SEARCH_PATH:
+                    server.count("map_requests")
+                    body = json.dumps(search_map(server.map_points, urlsplit(self.path).query)).encode()
+                    self._send(200, body, "application/vnd.api+json")
+                    return
+                parts = path.strip("/").split("/")
+                if len(parts) == 3 and parts[0] == "camping":
+                    server.count("page_requests")
+                    self._send(200, render_page(template, parts[1], parts[2]), "text/html; charset=utf-8")
+                    return
+                self._send(404, b"not found", "text/plain")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def sitemap(self):
+        with self._sitemap_lock:
+            if self._sitemap is None:
+                self._sitemap = build_sitemap(self.base_url, self.sitemap_urls)
+                self._sitemap_etag = f'"{hashlib.blake2b(self._sitemap, digest_size=8).hexdigest()}"'
+            return self._sitemap
+
+    def sitemap_etag(self):
+        self.sitemap()
+        return self._sitemap_etag
+
+    def count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @property
+    def sitemap_url(self):
+        return self.base_url + SITEMAP_PATH
+
+    @property
+    def map_search_url(self):
+        return self.base_url + MAP_SEARCH_PATH
+
+    def page_urls(self, count):
+        return [self.base_url + campground_path(index) for index in range(count)]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,43 +1,31 @@
 import logging
+import os
 import schedule
 import time
 from threading import Thread
 from src.api.api import app
-from src.db import db_methods
+from src.db import db_methods, run_store, scrape_queue
+from src.Scraper.refresh_scheduler import refresh_scheduler, REFRESH_INTERVAL_MINUTES
+
+# DEBUG logs every parsed price and sitemap entry; keep it for troubleshooting.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 def start_logging(log_file="app.log"):
     logging.basicConfig(
         filename=log_file, 
-        level=logging.DEBUG, 
+        level=LOG_LEVEL, 
         format="%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     logging.info("Logging started.")
 
-def update_data():
-    try:
-        logging.info("Starting scheduled update.")
-        
-        db_methods.create_connection()
-        logging.info("Database connection established.")
-
-        db_methods.create_database()
-        logging.info("Database created (if not already existing).")
-        
-        db_methods.create_table()
-        logging.info("Table created (if not already existing).")
-        
-        logging.info("Data update completed.")
-        
-    except Exception as e:
-        logging.error(f"Error during scheduled update: {e}")
-
 def run_flask_app():
     app.run(host='0.0.0.0', port=5000)
 
 def run_schedule():
-    # Schedule every 2 hours for the update task
-    schedule.every(2).hours.do(update_data)
+    # Each cycle refreshes the campgrounds most likely to be stale, within
+    # REFRESH_PAGE_BUDGET pages.
+    schedule.every(REFRESH_INTERVAL_MINUTES).minutes.do(refresh_scheduler.run_cycle)
     while True:
         schedule.run_pending()
         time.sleep(1)
@@ -52,9 +40,11 @@ if __name__ == "__main__":
     logging.info("Database created (if not already existing).")
     
     db_methods.create_table()
+    run_store.create_run_tables()
+    scrape_queue.create_queue_table()
     logging.info("Table created (if not already existing).")
     
-    logging.info("Scheduled updates set for every 2 hours.")
+    logging.info(f"Refresh cycles scheduled every {REFRESH_INTERVAL_MINUTES} minutes.")
     
     flask_thread = Thread(target=run_flask_app)
     flask_thread.start()
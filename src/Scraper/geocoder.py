@@ -0,0 +1,274 @@
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# GeoNames cities*.txt / admin1CodesASCII.txt layout. The bundled file is
+# the US part of GeoNames cities500 (populated places with at least 500
+# people, CC BY 4.0, https://www.geonames.org/); point this at a newer or
+# larger dump (e.g. allCountries.txt) for finer results.
+GEOCODER_PLACES_FILE = os.getenv("GEOCODER_PLACES_FILE", os.path.join(DATA_DIR, "us_places.txt"))
+GEOCODER_ADMIN1_FILE = os.getenv("GEOCODER_ADMIN1_FILE", os.path.join(DATA_DIR, "admin1_codes.txt"))
+GEOCODER_COUNTRIES = {c.strip() for c in os.getenv("GEOCODER_COUNTRIES", "US").split(",") if c.strip()}
+GEOCODER_INDEX_DIR = os.getenv("GEOCODER_INDEX_DIR", ".geocoder_cache")
+# "fill" only sets nearest_city_name when the page did not give one;
+# "replace" overwrites the page's value whenever a place is found; "off"
+# disables it. Either way a record with no place in range keeps what the
+# page gave.
+GEOCODER_MODE = os.getenv("GEOCODER_MODE", "fill")
+# A place farther than this from the campground is not used at all, so a
+# remote campground is never labelled with a town hours away.
+GEOCODER_MAX_DISTANCE_KM = float(os.getenv("GEOCODER_MAX_DISTANCE_KM", "50"))
+
+EARTH_RADIUS_KM = 6371.0088
+UNKNOWN_VALUES = (None, "", "Bilinmiyor")
+
+_MAGIC = b"KDT1"
+# magic, point count, source size, source mtime_ns
+_HEADER = struct.Struct("<4sIqq")
+
+
+class Place:
+    __slots__ = ("name", "admin1", "distance_km")
+
+    def __init__(self, name, admin1, distance_km):
+        self.name = name
+        self.admin1 = admin1
+        self.distance_km = distance_km
+
+    def __repr__(self):
+        return f"Place({self.name!r}, {self.admin1!r}, {self.distance_km:.1f} km)"
+
+
+def _to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    # Unit vectors: chord distance orders points exactly like great-circle
+    # distance, with no special cases at the antimeridian or the poles.
+    lat, lon = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def _load_admin1_names(path: str) -> dict:
+    names = {}
+    if not os.path.exists(path):
+        return names
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2:
+                names[parts[0]] = parts[1]
+    return names
+
+
+def _load_places(path: str, admin1_path: str) -> List[Tuple[float, float, float, str]]:
+    admin1_names = _load_admin1_names(admin1_path)
+    places = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 11 or parts[6] != "P":
+                continue
+            country = parts[8]
+            if GEOCODER_COUNTRIES and country not in GEOCODER_COUNTRIES:
+                continue
+            try:
+                x, y, z = _to_xyz(float(parts[4]), float(parts[5]))
+            except ValueError:
+                continue
+            admin1 = admin1_names.get(f"{country}.{parts[10]}", "")
+            places.append((x, y, z, f"{parts[1]}\t{admin1}"))
+    return places
+
+
+def _kd_order(places, lo, hi, depth):
+    # Lays the points out as an implicit balanced KD-tree: the median of
+    # every [lo, hi) range sits at (lo + hi) // 2 and splits on axis
+    # depth % 3, so the tree needs no child pointers.
+    if hi - lo <= 0:
+        return
+    axis = depth % 3
+    places[lo:hi] = sorted(places[lo:hi], key=lambda p: p[axis])
+    mid = (lo + hi) // 2
+    _kd_order(places, lo, mid, depth + 1)
+    _kd_order(places, mid + 1, hi, depth + 1)
+
+
+def build_index(places_path: str, admin1_path: str, index_path: str) -> str:
+    """
+    Builds the binary KD-tree file: header, n*3 doubles (x, y, z in tree
+    order), n+1 uint32 label offsets and the UTF-8 "name\\tadmin1" labels.
+    """
+    places = _load_places(places_path, admin1_path)
+    _kd_order(places, 0, len(places), 0)
+
+    coordinates = array("d")
+    offsets = array("I", [0])
+    labels = bytearray()
+    for x, y, z, label in places:
+        coordinates.extend((x, y, z))
+        labels += label.encode("utf-8")
+        offsets.append(len(labels))
+
+    stat = os.stat(places_path)
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    # A private temporary file per builder, renamed into place, so processes
+    # building at the same time never write into each other's file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(places), stat.st_size, stat.st_mtime_ns))
+            coordinates.tofile(f)
+            offsets.tofile(f)
+            f.write(labels)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.info(f"Geocoder index built with {len(places)} places: {index_path}")
+    return index_path
+
+
+class ReverseGeocoder:
+    """
+    Nearest-place lookups over a memory-mapped, array-backed KD-tree. The
+    index is built from the places file on first use and rebuilt only when
+    that file changes; every process maps the same file read-only, so the
+    OS shares its pages.
+    """
+
+    def __init__(self, places_path=GEOCODER_PLACES_FILE, admin1_path=GEOCODER_ADMIN1_FILE,
+                 index_dir=GEOCODER_INDEX_DIR):
+        name = os.path.splitext(os.path.basename(places_path))[0]
+        self.index_path = os.path.join(index_dir, f"{name}.kdtree")
+        if not self._index_is_current(places_path):
+            build_index(places_path, admin1_path, self.index_path)
+        self._file = open(self.index_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, self.size, _, _ = _HEADER.unpack_from(self._map, 0)
+        view = memoryview(self._map)
+        start = _HEADER.size
+        end = start + self.size * 3 * 8
+        self._coordinates = view[start:end].cast("d")
+        self._offsets = view[end:end + (self.size + 1) * 4].cast("I")
+        self._labels_start = end + (self.size + 1) * 4
+
+    def _index_is_current(self, places_path):
+        try:
+            stat = os.stat(places_path)
+            with open(self.index_path, "rb") as f:
+                magic, _, size, mtime_ns = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return magic == _MAGIC and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+    def _label(self, index):
+        start = self._labels_start + self._offsets[index]
+        end = self._labels_start + self._offsets[index + 1]
+        name, admin1 = self._map[start:end].decode("utf-8").split("\t")
+        return name, admin1 or None
+
+    def nearest(self, lat: float, lon: float) -> Optional[Place]:
+        if not self.size:
+            return None
+        coords = self._coordinates
+        qx, qy, qz = _to_xyz(lat, lon)
+        query = (qx, qy, qz)
+        best, best_index = float("inf"), -1
+        # (lo, hi, depth, squared distance to the splitting plane that led here)
+        stack = [(0, self.size, 0, 0.0)]
+        while stack:
+            lo, hi, depth, plane = stack.pop()
+            if lo >= hi or plane >= best:
+                continue
+            mid = (lo + hi) // 2
+            base = mid * 3
+            dx, dy, dz = coords[base] - qx, coords[base + 1] - qy, coords[base + 2] - qz
+            distance = dx * dx + dy * dy + dz * dz
+            if distance < best:
+                best, best_index = distance, mid
+            axis = depth % 3
+            diff = query[axis] - coords[base + axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # The far side is pushed first so it is popped after the near
+            # side, when `best` is tighter and it can usually be skipped.
+            stack.append((far[0], far[1], depth + 1, diff * diff))
+            stack.append((near[0], near[1], depth + 1, 0.0))
+        name, admin1 = self._label(best_index)
+        chord = math.sqrt(best)
+        return Place(name, admin1, 2 * math.asin(min(1.0, chord / 2)) * EARTH_RADIUS_KM)
+
+    def nearest_many(self, points: Iterable[Tuple[float, float]]) -> List[Optional[Place]]:
+        return [self.nearest(lat, lon) for lat, lon in points]
+
+    def close(self):
+        self._coordinates.release()
+        self._offsets.release()
+        self._map.close()
+        self._file.close()
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> ReverseGeocoder:
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = ReverseGeocoder()
+        return _geocoder
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fill_location_fields(records: List[dict], city_key="nearest_city_name") -> List[dict]:
+    """
+    Sets the nearest place as `city_key` on every record with usable
+    coordinates, in one batch. A value the page gave is kept unless
+    GEOCODER_MODE is "replace"; when no place lies within
+    GEOCODER_MAX_DISTANCE_KM the record is left as scraped. The page's
+    administrative_area (a forest, park, ...) is never touched.
+    """
+    if GEOCODER_MODE == "off" or not records:
+        return records
+    replace = GEOCODER_MODE == "replace"
+    targets = []
+    for record in records:
+        if not replace and record.get(city_key) not in UNKNOWN_VALUES:
+            continue
+        lat, lon = _coordinate(record.get("latitude")), _coordinate(record.get("longitude"))
+        if lat is not None and lon is not None:
+            targets.append((record, lat, lon))
+    if not targets:
+        return records
+
+    try:
+        geocoder = get_geocoder()
+    except Exception as e:
+        logger.error(f"Geocoder unavailable, location fields left as scraped: {e}")
+        return records
+    places = geocoder.nearest_many((lat, lon) for _, lat, lon in targets)
+    too_far = 0
+    for (record, _, _), place in zip(targets, places):
+        if place is None:
+            continue
+        if place.distance_km > GEOCODER_MAX_DISTANCE_KM:
+            too_far += 1
+            continue
+        record[city_key] = place.name
+    if too_far:
+        logger.debug("%d of %d records had no place within %s km.", too_far, len(targets), GEOCODER_MAX_DISTANCE_KM)
+    return records
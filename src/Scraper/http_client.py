@@ -0,0 +1,362 @@
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Per-host request rate (requests/second) and burst size; 0 disables the limit.
+HTTP_RATE_LIMIT = float(os.getenv("HTTP_RATE_LIMIT", "10"))
+HTTP_BURST = int(os.getenv("HTTP_BURST", "20"))
+# Bounds of the per-host AIMD concurrency limit.
+HTTP_MIN_CONCURRENCY = int(os.getenv("HTTP_MIN_CONCURRENCY", "1"))
+HTTP_INITIAL_CONCURRENCY = int(os.getenv("HTTP_INITIAL_CONCURRENCY", "4"))
+HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "32"))
+# A response slower than this multiple of the host's average latency counts
+# as congestion, like a 429; 0 turns latency-based backoff off.
+HTTP_LATENCY_SPIKE_FACTOR = float(os.getenv("HTTP_LATENCY_SPIKE_FACTOR", "3"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+# Consecutive failures that open a host's circuit, and how long it stays open.
+HTTP_BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "10"))
+HTTP_BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", "30"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Exceptions that say something about the host's health; anything else
+# (redirect loops, bad URLs, caller bugs) does not move the breaker.
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+_LATENCY_WARMUP = 10
+_LATENCY_SMOOTHING = 0.1
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by one slot per window of successful
+    requests and halves on congestion. Halving happens at most once per
+    round trip (`window` seconds, the host's average latency), so a burst
+    of failures from requests that were already in flight does not
+    collapse the limit to the minimum.
+    """
+
+    def __init__(self, initial, minimum, maximum, cooldown=0.1):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.cooldown = cooldown
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, congested=False, window=None):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if congested:
+                if now - self._last_decrease >= (window or self.cooldown):
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+            elif self.in_flight + 1 >= int(self.limit):
+                # Only grow while the limit is what holds callers back.
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures. While open every
+    call is rejected; after `reset_timeout` one probe is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = max(1, threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def release_probe(self):
+        """
+        Gives the half-open probe slot back without a verdict, so the next
+        call probes again instead of the circuit staying half-open.
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class HostState:
+    def __init__(self, host):
+        self.host = host
+        self.bucket = TokenBucket(HTTP_RATE_LIMIT, HTTP_BURST)
+        self.limiter = AIMDLimiter(HTTP_INITIAL_CONCURRENCY, HTTP_MIN_CONCURRENCY, HTTP_MAX_CONCURRENCY)
+        # Browser page loads get their own limit, starting at the maximum:
+        # the WebDriverPool size is what bounds them until the host pushes
+        # back, and they never take slots from the HTTP fetchers.
+        self.page_limiter = AIMDLimiter(HTTP_MAX_CONCURRENCY, HTTP_MIN_CONCURRENCY, HTTP_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(HTTP_BREAKER_THRESHOLD, HTTP_BREAKER_RESET)
+        self.latency = None
+        self.samples = 0
+        self.counts = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def is_latency_spike(self, elapsed):
+        with self._lock:
+            spike = (
+                HTTP_LATENCY_SPIKE_FACTOR > 0 and self.samples >= _LATENCY_WARMUP
+                and elapsed > self.latency * HTTP_LATENCY_SPIKE_FACTOR
+            )
+            if not spike:
+                self.latency = elapsed if self.latency is None else (
+                    self.latency + _LATENCY_SMOOTHING * (elapsed - self.latency)
+                )
+                self.samples += 1
+            return spike
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def snapshot(self):
+        return {
+            **self.counts,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "page_concurrency_limit": round(self.page_limiter.limit, 2),
+            "page_in_flight": self.page_limiter.in_flight,
+            "avg_latency": round(self.latency, 4) if self.latency is not None else None,
+            "circuit": self.breaker.state,
+        }
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, response=None):
+    # Full jitter: uniform in [0, base * 2^attempt], capped; Retry-After wins
+    # when the server sends one.
+    retry_after = _retry_after(response)
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+class OutboundClient:
+    """
+    Shared front door for every outbound request the scraper makes. Each
+    host gets its own token bucket, AIMD concurrency limit and circuit
+    breaker, so one slow or blocking host never throttles another.
+    Thread-safe; the callers keep their own requests sessions.
+    """
+
+    def __init__(self, max_retries=HTTP_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def host_state(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = HostState(host)
+            return state
+
+    def call(self, url, fn, is_failure=None):
+        """
+        Runs fn() under the host's rate limit, circuit breaker and page-load
+        concurrency limit (HostState.page_limiter, separate from the one
+        requests go through) without retrying. Used to throttle page loads
+        that do not go through requests (Selenium). Only exceptions for which
+        is_failure(exc) is true (NETWORK_ERRORS by default) count as host
+        failures; others are re-raised without touching the breaker.
+        """
+        is_failure = is_failure or (lambda exc: isinstance(exc, NETWORK_ERRORS))
+        state = self.host_state(url)
+        if not state.breaker.allow():
+            state.count("rejected")
+            raise CircuitOpenError(f"Circuit open for {state.host}")
+        state.bucket.acquire()
+        state.page_limiter.acquire()
+        state.count("requests")
+        started = time.monotonic()
+        congested = False
+        try:
+            result = fn()
+            congested = state.is_latency_spike(time.monotonic() - started)
+            state.breaker.record_success()
+            return result
+        except Exception as e:
+            if is_failure(e):
+                congested = True
+                state.count("failures")
+                state.breaker.record_failure()
+            else:
+                state.breaker.release_probe()
+            raise
+        finally:
+            state.page_limiter.release(congested, state.latency)
+
+    def _send(self, state, session, method, url, kwargs):
+        if not state.breaker.allow():
+            state.count("rejected")
+            raise CircuitOpenError(f"Circuit open for {state.host}")
+        state.bucket.acquire()
+        state.limiter.acquire()
+        state.count("requests")
+        started = time.monotonic()
+        congested = True
+        try:
+            response = session.request(method, url, **kwargs)
+        except NETWORK_ERRORS:
+            state.count("failures")
+            state.breaker.record_failure()
+            state.limiter.release(True, state.latency)
+            raise
+        except Exception:
+            # Not a host failure, but a half-open probe must still end.
+            state.breaker.release_probe()
+            state.limiter.release(False)
+            raise
+        # For streamed responses this is the time to headers; the body is
+        # read after the slot is released.
+        elapsed = time.monotonic() - started
+        if response.status_code == 429:
+            # The host is up and asking for less traffic: back off, but do
+            # not count it towards the circuit breaker.
+            state.count("throttled")
+            state.breaker.record_success()
+        elif response.status_code in RETRY_STATUSES:
+            state.count("failures")
+            state.breaker.record_failure()
+        else:
+            state.breaker.record_success()
+            congested = state.is_latency_spike(elapsed)
+        state.limiter.release(congested, state.latency)
+        return response
+
+    def request(self, method, url, session=None, **kwargs):
+        """
+        Sends the request with up to max_retries retries on connection
+        errors, timeouts and 429/5xx responses, sleeping with exponential
+        full-jitter backoff in between. The last response is returned even
+        if its status is still an error; callers raise_for_status as before.
+        """
+        session = session or self._session
+        state = self.host_state(url)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self._send(state, session, method, url, kwargs)
+            except CircuitOpenError:
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s.")
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                delay = backoff_delay(attempt, response)
+                response.close()
+                logger.warning(
+                    f"{method} {url} returned {response.status_code}, "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s."
+                )
+            state.count("retries")
+            time.sleep(delay)
+
+    def get(self, url, session=None, **kwargs):
+        return self.request("GET", url, session=session, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {state.host: state.snapshot() for state in hosts}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OutboundClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OutboundClient()
+        return _client
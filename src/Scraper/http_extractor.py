@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+import requests
+from requests.adapters import HTTPAdapter
+from .scraper import update_names_for_urls
+from .http_client import get_client
+from .metrics import timed
+from .progress import ScrapeProgress
+from .utils import administrative_area_from_address, campground_type_label, get_nearest_city
+
+logger = logging.getLogger(__name__)
+
+HTTP_WORKERS = int(os.getenv("SCRAPER_HTTP_WORKERS", "16"))
+HTTP_TIMEOUT = float(os.getenv("SCRAPER_HTTP_TIMEOUT", "15"))
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# Fields without which a record is not worth storing; pages missing any of
+# them are sent to the Selenium path instead.
+REQUIRED_FIELDS = ("name", "latitude", "longitude")
+# __NEXT_DATA__ keys (any one per group) the HTTP path needs to fill type,
+# rating and price. A page whose data lacks one goes to Selenium instead of
+# being stored with a made-up type or a price of 0.
+DETAIL_KEYS = (("campground-type", "type"), ("rating",), ("price-low", "price-high"))
+
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+
+
+def create_session(pool_size=HTTP_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html"})
+    return session
+
+
+class _PageTextParser(HTMLParser):
+    """
+    Collects the text of the elements the Selenium path reads directly (the
+    first h1, #coordinates, #address, the type label and drive times) and the "Visit
+    Website" link, so both engines store the same values for them. Line
+    breaks are kept, as in Selenium's element.text.
+    """
+
+    TARGET_IDS = {"coordinates", "address"}
+    TARGET_CLASSES = {
+        "CampgroundDetails_header__title-label__B27_R": "type",
+        "DriveTimeWidget_drive-time__links__WwTS5": "drive_time",
+    }
+    WEBSITE_TEXT = "Visit Website"
+
+    def __init__(self):
+        super().__init__()
+        self.texts = {}
+        self.website = None
+        self._stack = []
+        self._link = None
+
+    def _key(self, tag, attrs):
+        element_id = attrs.get("id")
+        if element_id in self.TARGET_IDS:
+            return element_id
+        for name in (attrs.get("class") or "").split():
+            if name in self.TARGET_CLASSES:
+                return self.TARGET_CLASSES[name]
+        return "h1" if tag == "h1" else None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and self.website is None:
+            self._link = [attrs.get("href"), []]
+        key = self._key(tag, attrs)
+        if key and key not in self.texts and not any(entry[0] == key for entry in self._stack):
+            self._stack.append([key, tag, 0, []])
+        elif self._stack and tag == self._stack[-1][1]:
+            self._stack[-1][2] += 1
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link is not None:
+            href, parts = self._link
+            if " ".join("".join(parts).split()) == self.WEBSITE_TEXT:
+                self.website = href
+            self._link = None
+        if not self._stack or tag != self._stack[-1][1]:
+            return
+        if self._stack[-1][2]:
+            self._stack[-1][2] -= 1
+            return
+        key, _, _, parts = self._stack.pop()
+        lines = (" ".join(line.split()) for line in "".join(parts).splitlines())
+        self.texts[key] = "\n".join(line for line in lines if line)
+
+    def handle_data(self, data):
+        for entry in self._stack:
+            entry[3].append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+
+
+def _load_next_data(html):
+    match = NEXT_DATA_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError as e:
+        logger.warning(f"Could not decode __NEXT_DATA__: {e}")
+        return None
+
+
+def _find_campground_attributes(next_data, slug):
+    # Walk the Next.js blob iteratively and return the first JSON:API style
+    # attribute dict that belongs to this campground.
+    stack = [next_data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            attributes = node.get("attributes")
+            if isinstance(attributes, dict) and attributes.get("slug") == slug:
+                return attributes
+            if node.get("slug") == slug and "latitude" in node:
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return {}
+
+
+def extract_campground_from_html(html, url, data):
+    """
+    Builds the record from the page's __NEXT_DATA__ and, for the fields the
+    Selenium path reads from the page (name, type label, address, nearest
+    city, website), from
+    the same elements, so a page gets the same record from either engine.
+    Returns None when the data lacks any DETAIL_KEYS group, so the caller
+    uses Selenium.
+    """
+    parts = url.split("/")
+    slug = parts[-1]
+    next_data = _load_next_data(html)
+    attributes = _find_campground_attributes(next_data, slug) if next_data else {}
+    missing = [group[0] for group in DETAIL_KEYS if not any(key in attributes for key in group)]
+    if missing:
+        logger.debug("No %s in __NEXT_DATA__ of %s, leaving it to Selenium.", ", ".join(missing), url)
+        return None
+
+    parser = _PageTextParser()
+    parser.feed(html)
+    page_text = parser.texts
+
+    coordinates = page_text.get("coordinates", "").split()
+    latitude = attributes.get("latitude")
+    longitude = attributes.get("longitude")
+    if (latitude is None or longitude is None) and len(coordinates) > 2:
+        latitude, longitude = coordinates[0], coordinates[2]
+
+    return {
+        **data,
+        "links": url,
+        "name": page_text.get("h1") or attributes.get("name") or "",
+        "region-name": parts[4],
+        "administrative_area": administrative_area_from_address(page_text.get("address"))
+        or attributes.get("administrative-area") or "",
+        "latitude": latitude,
+        "longitude": longitude,
+        "nearest_city_name": (get_nearest_city(page_text["drive_time"])[0] if page_text.get("drive_time") else "")
+        or attributes.get("nearest-city-name") or "",
+        "type": page_text.get("type") or campground_type_label(attributes.get("campground-type") or attributes.get("type")),
+        "accommodation_type_names": attributes.get("accommodation-type-names") or [],
+        "camper_types": attributes.get("camper-types") or [],
+        "bookable": bool(attributes.get("bookable", False)),
+        "operator": parser.website or "*",
+        "rating": attributes.get("rating"),
+        "reviews_count": attributes.get("reviews-count") or 0,
+        "price_low": attributes.get("price-low"),
+        "price_high": attributes.get("price-high"),
+        "slug": attributes.get("slug") or slug,
+    }
+
+
+def has_required_fields(record):
+    return all(record.get(field) not in (None, "") for field in REQUIRED_FIELDS)
+
+
+def fetch_campground(session, url, data):
+    with timed("page_fetch"):
+        response = get_client().get(url, session=session, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        html = response.text
+    with timed("html_extract"):
+        return extract_campground_from_html(html, url, data)
+
+
+def update_names_via_http(updated_data, workers=None, fallback=update_names_for_urls, progress=None):
+    logger.info("Starting update_names_via_http function.")
+    workers = workers or HTTP_WORKERS
+    progress = progress or ScrapeProgress()
+    session = create_session(workers)
+    results = {}
+    needs_browser = {}
+
+    def extract(item):
+        url, data = item
+        if progress.cancelled:
+            return url, None
+        try:
+            return url, fetch_campground(session, url, data)
+        except Exception as e:
+            logger.warning(f"HTTP extraction failed for {url}: {e}")
+            return url, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, (url, record) in enumerate(executor.map(extract, updated_data.items()), start=1):
+                if record is not None and has_required_fields(record):
+                    results[url] = record
+                    progress.page_done()
+                    logger.debug("[%d/%d] Extracted without browser: %s", index, len(updated_data), url)
+                elif not progress.cancelled:
+                    needs_browser[url] = updated_data[url]
+    finally:
+        session.close()
+
+    logger.info(f"HTTP extraction finished: {len(results)} pages extracted, {len(needs_browser)} sent to Selenium.")
+    if needs_browser and fallback and not progress.cancelled:
+        results.update(fallback(needs_browser, progress=progress))
+
+    updated_data_with_names = {url: results[url] for url in updated_data if url in results}
+    logger.info("update_names_via_http function completed.")
+    return updated_data_with_names
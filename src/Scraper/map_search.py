@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+from pydantic import ValidationError
+from src.models.campground import Campground
+from src.db.db_methods import CampgroundBatchWriter
+from .http_extractor import create_session, HTTP_TIMEOUT
+from .http_client import get_client
+from .pipeline import campground_to_db_record
+from .progress import ScrapeProgress
+from .geocoder import fill_location_fields
+from .utils import campground_type_label
+
+logger = logging.getLogger(__name__)
+
+# The search endpoint behind the map on thedyrt.com/search. Point it at a
+# local stub server to run the crawler offline.
+MAP_SEARCH_URL = os.getenv("MAP_SEARCH_URL", "https://thedyrt.com/api/v6/locations/search-results")
+CAMPGROUND_BASE_URL = os.getenv("CAMPGROUND_BASE_URL", "https://thedyrt.com/camping/")
+# The endpoint never returns more than this many results for one box; a box
+# that comes back full is split into quadrants.
+MAP_SEARCH_RESULT_CAP = int(os.getenv("MAP_SEARCH_RESULT_CAP", "500"))
+MAP_SEARCH_CONCURRENCY = int(os.getenv("MAP_SEARCH_CONCURRENCY", "8"))
+# Boxes this deep are paged through instead of split again, which happens
+# when more than a cap's worth of campgrounds share almost the same point.
+MAP_SEARCH_MAX_DEPTH = int(os.getenv("MAP_SEARCH_MAX_DEPTH", "12"))
+
+# (west, south, east, north)
+Bbox = Tuple[float, float, float, float]
+US_BOUNDING_BOXES: List[Bbox] = [
+    (-125.0, 24.0, -66.0, 50.0),    # contiguous states
+    (-180.0, 51.0, -129.0, 72.0),   # Alaska
+    (-161.0, 18.5, -154.0, 22.5),   # Hawaii
+    (-68.0, 17.5, -64.5, 18.6),     # Puerto Rico and the Virgin Islands
+]
+
+
+def split_bbox(bbox: Bbox) -> List[Bbox]:
+    west, south, east, north = bbox
+    mid_lon = (west + east) / 2
+    mid_lat = (south + north) / 2
+    return [
+        (west, south, mid_lon, mid_lat),
+        (mid_lon, south, east, mid_lat),
+        (west, mid_lat, mid_lon, north),
+        (mid_lon, mid_lat, east, north),
+    ]
+
+
+def _search_params(bbox: Bbox, page: int, page_size: int) -> dict:
+    return {
+        "filter[search][bbox]": ",".join(f"{value:.6f}" for value in bbox),
+        "filter[search][drive_time]": "any",
+        "filter[search][air_quality]": "any",
+        "filter[search][electric_amperage]": "any",
+        "filter[search][max_vehicle_length]": "any",
+        "filter[search][price]": "any",
+        "filter[search][rating]": "any",
+        "sort": "recommended",
+        "page[number]": page,
+        "page[size]": page_size,
+    }
+
+
+class MapSearchCrawler:
+    """
+    Covers the given bounding boxes with a quadtree of search requests: a
+    box whose response is full (MAP_SEARCH_RESULT_CAP results) is split into
+    four quadrants, any other box is a leaf. Boxes are fetched concurrently
+    on asyncio, at most `concurrency` at a time, and results are
+    deduplicated by id since a campground on a tile edge can be returned by
+    two neighbouring boxes.
+    """
+
+    def __init__(self, url=None, result_cap=None, concurrency=None, max_depth=None, session=None, progress=None):
+        self.url = url or MAP_SEARCH_URL
+        self.result_cap = result_cap or MAP_SEARCH_RESULT_CAP
+        self.concurrency = concurrency or MAP_SEARCH_CONCURRENCY
+        self.max_depth = MAP_SEARCH_MAX_DEPTH if max_depth is None else max_depth
+        self.session = session
+        self.progress = progress or ScrapeProgress()
+        self.results: Dict[str, dict] = {}
+        self.stats = {"requests": 0, "splits": 0, "leaves": 0, "failed_tiles": 0, "duplicates": 0}
+
+    def _get_page(self, bbox, page):
+        response = get_client().get(
+            self.url,
+            session=self.session,
+            params=_search_params(bbox, page, self.result_cap),
+            headers={"Accept": "application/vnd.api+json"},
+            timeout=HTTP_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json().get("data") or []
+
+    async def _fetch(self, semaphore, bbox, page=1):
+        async with semaphore:
+            self.stats["requests"] += 1
+            return await asyncio.to_thread(self._get_page, bbox, page)
+
+    def _collect(self, items):
+        for item in items:
+            item_id = str(item.get("id"))
+            if item_id in self.results:
+                self.stats["duplicates"] += 1
+                continue
+            self.results[item_id] = item
+            self.progress.add_discovered()
+
+    async def _crawl_tile(self, semaphore, bbox, depth):
+        if self.progress.cancelled:
+            return
+        try:
+            items = await self._fetch(semaphore, bbox)
+            self._collect(items)
+            if len(items) < self.result_cap:
+                self.stats["leaves"] += 1
+                return
+            if depth < self.max_depth:
+                self.stats["splits"] += 1
+                await asyncio.gather(*(self._crawl_tile(semaphore, quadrant, depth + 1) for quadrant in split_bbox(bbox)))
+                return
+            page = 1
+            while len(items) >= self.result_cap and not self.progress.cancelled:
+                page += 1
+                items = await self._fetch(semaphore, bbox, page)
+                self._collect(items)
+            self.stats["leaves"] += 1
+        except Exception as e:
+            self.stats["failed_tiles"] += 1
+            logger.warning(f"Map search failed for bbox {bbox}: {e}")
+
+    async def crawl(self, bboxes: Iterable[Bbox] = US_BOUNDING_BOXES) -> Dict[str, dict]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        owns_session = self.session is None
+        if owns_session:
+            self.session = create_session(self.concurrency)
+        try:
+            await asyncio.gather(*(self._crawl_tile(semaphore, bbox, 0) for bbox in bboxes))
+        finally:
+            if owns_session:
+                self.session.close()
+                self.session = None
+        logger.info(f"Map search finished: {len(self.results)} campgrounds, {self.stats}.")
+        return self.results
+
+
+def crawl_map_search(bboxes: Iterable[Bbox] = US_BOUNDING_BOXES, **kwargs) -> Dict[str, dict]:
+    return asyncio.run(MapSearchCrawler(**kwargs).crawl(bboxes))
+
+
+def campground_url(attributes: dict) -> Optional[str]:
+    """
+    The campground page URL, <base>/<region>/<slug>, built the way the site
+    builds it. None when the result has no slug or region to build it from.
+    """
+    region = (attributes.get("region-name") or "").strip().lower().replace(" ", "-")
+    slug = (attributes.get("slug") or "").strip()
+    if not region or not slug:
+        return None
+    return urljoin(CAMPGROUND_BASE_URL, f"{region}/{slug}")
+
+
+def build_db_record_from_search(item: dict) -> dict:
+    """
+    Validates one search result (a JSON:API resource whose attributes use
+    the model's aliases) and returns the campgrounds row. The link is the
+    campground page URL, the same key the sitemap crawl upserts on. The
+    type comes from the campground's category attribute, not the JSON:API
+    resource type; it is only stored for new rows (see
+    upsert_search_results). Raises ValidationError, or ValueError when no
+    page URL can be built.
+    """
+    attributes = item.get("attributes") or {}
+    url = campground_url(attributes)
+    if url is None:
+        raise ValueError("missing slug or region-name, page URL unknown")
+    campground = Campground(**{
+        **attributes,
+        "id": str(uuid.uuid4()),
+        "type": campground_type_label(attributes.get("campground-type")),
+        "links": {"self": url},
+    })
+    return campground_to_db_record(campground)
+
+
+def run_map_crawl(progress: ScrapeProgress = None, bboxes: Iterable[Bbox] = US_BOUNDING_BOXES, **crawler_options) -> dict:
+    """
+    Crawls the map search endpoint and writes every campground it returns.
+    Much faster than the sitemap crawl, but only carries the search fields:
+    new campgrounds are inserted, existing ones only get those fields merged
+    (see upsert_search_results), so a full page scrape is never clobbered.
+    """
+    progress = progress or ScrapeProgress()
+    crawler = MapSearchCrawler(progress=progress, **crawler_options)
+    results = asyncio.run(crawler.crawl(bboxes))
+    fill_location_fields(
+        [item.setdefault("attributes", {}) for item in results.values()],
+        city_key="nearest-city-name",
+    )
+
+    with CampgroundBatchWriter(partial=True) as writer:
+        for item_id, item in results.items():
+            try:
+                writer.add(build_db_record_from_search(item))
+                progress.page_done()
+            except (ValidationError, ValueError) as e:
+                progress.record_invalid(url=item_id, reason=str(e))
+                logger.warning(f"Validation error for map search result {item_id}: {e}")
+    return {"message": "Completed.", "crawl": crawler.stats, "written": writer.stats}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Map crawl finished: {run_map_crawl()}")
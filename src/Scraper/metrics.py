@@ -0,0 +1,100 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from .http_client import get_client
+
+# Page loads behind a browser regularly take several seconds, so the
+# default buckets (which stop at 10s) are stretched at the top.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# sitemap_download: time to the sitemap response headers.
+# sitemap_parse: reading, decompressing and parsing the body, not counting
+#   the time the pipeline spends on the entries in between.
+# page_fetch / page_load: HTTP GET / Selenium driver.get of one page.
+# html_extract / dom_extract: turning that page into a record.
+# geocode, validate: per record. db_write: one batch upsert.
+STAGE_SECONDS = Histogram(
+    "scraper_stage_seconds", "Time spent in each scrape stage.", ["stage"], buckets=LATENCY_BUCKETS,
+)
+FIELD_SECONDS = Histogram(
+    "scraper_field_extraction_seconds", "Time to read one field on the Selenium path.", ["field"],
+    buckets=LATENCY_BUCKETS,
+)
+PAGE_SECONDS = Histogram(
+    "scraper_page_seconds", "End-to-end time to turn one URL into a record.", ["engine"], buckets=LATENCY_BUCKETS,
+)
+PAGES = Counter("scraper_pages_total", "Pages processed, by engine and result.", ["engine", "result"])
+FAILURES = Counter("scraper_failures_total", "Failures by stage and exception type.", ["stage", "error"])
+SITEMAP_ENTRIES = Counter("scraper_sitemap_entries_total", "<url> entries parsed from sitemaps.")
+DB_ROWS = Counter("scraper_db_rows_total", "Rows handed to the batch writer, by upsert result.", ["result"])
+
+
+def record_failure(stage: str, error) -> None:
+    name = error if isinstance(error, str) else type(error).__name__
+    FAILURES.labels(stage, name).inc()
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Observes the block's duration in scraper_stage_seconds, also when it
+    raises.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def stage_totals() -> dict:
+    """
+    {stage: (count, seconds)} so far in this process. Diff two snapshots to
+    get the stage timings of one run.
+    """
+    totals = {}
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_count"):
+                totals[stage] = (int(sample.value), totals.get(stage, (0, 0.0))[1])
+            elif sample.name.endswith("_sum"):
+                totals[stage] = (totals.get(stage, (0, 0.0))[0], sample.value)
+    return totals
+
+
+def stage_delta(before: dict, after: dict) -> dict:
+    delta = {}
+    for stage, (count, seconds) in after.items():
+        previous_count, previous_seconds = before.get(stage, (0, 0.0))
+        if count > previous_count:
+            delta[stage] = {"count": count - previous_count, "seconds": round(seconds - previous_seconds, 3)}
+    return delta
+
+
+class HttpClientCollector:
+    """
+    Exposes the shared outbound client's per-host counters (requests,
+    retries, throttled, failures, rejected) and its current concurrency,
+    read from OutboundClient.stats() at scrape time.
+    """
+
+    def collect(self):
+        requests = CounterMetricFamily(
+            "http_client_events", "Outbound HTTP events per host.", labels=["host", "event"],
+        )
+        limit = GaugeMetricFamily("http_client_concurrency_limit", "Current AIMD concurrency limit.", labels=["host"])
+        in_flight = GaugeMetricFamily("http_client_in_flight", "Requests currently in flight.", labels=["host"])
+        circuit_open = GaugeMetricFamily("http_client_circuit_open", "1 while the host's circuit is open or half-open.",
+                                         labels=["host"])
+        for host, stats in get_client().stats().items():
+            for event in ("requests", "retries", "throttled", "failures", "rejected"):
+                requests.add_metric([host, event], stats[event])
+            limit.add_metric([host], stats["concurrency_limit"])
+            in_flight.add_metric([host], stats["in_flight"])
+            circuit_open.add_metric([host], 0 if stats["circuit"] == "closed" else 1)
+        return [requests, limit, in_flight, circuit_open]
+
+
+REGISTRY.register(HttpClientCollector())
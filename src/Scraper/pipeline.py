@@ -0,0 +1,347 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from pydantic import ValidationError
+from src.models.campground import Campground, CampgroundLinks
+from src.db.db_methods import CampgroundBatchWriter, load_lastmod_index
+from src.db import run_store
+from .sitemap_handler import SitemapDelta, iter_updated_entries
+from .scraper import WebDriverPool, STOP, POOL_SIZE
+from .http_extractor import create_session, fetch_campground, has_required_fields, HTTP_WORKERS
+from .progress import ScrapeProgress
+from .geocoder import fill_location_fields
+from .metrics import PAGE_SECONDS, PAGES, record_failure, stage_delta, stage_totals, timed
+from .profiler import maybe_profile
+from .utils import to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_URL = "https://thedyrt.com/sitemaps/campgrounds.xml.gz"
+# "http" tries the browserless extractor first and only falls back to Selenium
+# for pages missing required fields; "selenium" renders every page.
+SCRAPER_ENGINE = os.getenv("SCRAPER_ENGINE", "http")
+
+# Every stage hands work to the next through a queue of at most this many
+# items, so a slow stage blocks the ones before it instead of buffering.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+PIPELINE_FETCH_WORKERS = int(os.getenv("PIPELINE_FETCH_WORKERS", str(HTTP_WORKERS)))
+PIPELINE_BROWSER_WORKERS = int(os.getenv("PIPELINE_BROWSER_WORKERS", str(POOL_SIZE)))
+PIPELINE_VALIDATE_WORKERS = int(os.getenv("PIPELINE_VALIDATE_WORKERS", "2"))
+# The writer flushes a partial batch once it is this many seconds old.
+PIPELINE_FLUSH_INTERVAL = float(os.getenv("PIPELINE_FLUSH_INTERVAL", "2"))
+
+
+def build_db_record(campground_data: dict) -> dict:
+    """
+    Validates one scraped record with the Campground model and returns the
+    row written to the campgrounds table. Raises ValidationError.
+    """
+    corrected_data = {
+        "id": str(uuid.uuid4()),
+        "type": campground_data.get('type'),
+        "links": CampgroundLinks(self=campground_data.get('links')),
+        "name": campground_data.get('name'),
+        "latitude": campground_data.get('latitude'),
+        "longitude": campground_data.get('longitude'),
+        "region-name": campground_data.get('region-name', 'Unknown'),
+        "administrative-area": campground_data.get('administrative_area'),
+        "nearest-city-name": campground_data.get('nearest_city_name'),
+        "accommodation-type-names": campground_data.get('accommodation_type_names', []),
+        "bookable": campground_data.get('bookable', False),
+        "camper-types": campground_data.get('camper_types', []),
+        "operator": campground_data.get('operator'),
+        "photo-url": campground_data.get('photo_url'),
+        "photo-urls": campground_data.get('photo_urls', []),
+        "photos-count": campground_data.get('image_count', 0),
+        "rating": campground_data.get('rating'),
+        "reviews-count": campground_data.get('reviews_count', 0),
+        "slug": campground_data.get('slug'),
+        "price-low": campground_data.get('price_low'),
+        "price-high": campground_data.get('price_high'),
+        "availability-updated-at": campground_data.get('availability_updated_at'),
+    }
+
+    return campground_to_db_record(Campground(**corrected_data))
+
+
+def campground_to_db_record(campground: Campground) -> dict:
+    return {
+        "id": campground.id,
+        "type": campground.type,
+        "links": campground.links.self,
+        "name": campground.name,
+        "latitude": campground.latitude,
+        "longitude": campground.longitude,
+        "region_name": campground.region_name,
+        "administrative_area": campground.administrative_area,
+        "nearest_city_name": campground.nearest_city_name,
+        "accommodation_type_names": campground.accommodation_type_names,
+        "bookable": campground.bookable,
+        "camper_types": campground.camper_types,
+        "operator": campground.operator,
+        "photo_url": str(campground.photo_url) if campground.photo_url else None,
+        "photo_urls": [str(u) for u in campground.photo_urls],
+        "photos_count": campground.photos_count,
+        "rating": campground.rating,
+        "reviews_count": campground.reviews_count,
+        "slug": campground.slug,
+        "price_low": campground.price_low,
+        "price_high": campground.price_high,
+        "availability_updated_at": to_utc_naive(campground.availability_updated_at) if campground.availability_updated_at else None,
+    }
+
+
+class ScrapePipeline:
+    """
+    Staged sitemap -> fetch/extract -> validate -> DB write pipeline.
+
+        sitemap entries --fetch_queue--> HTTP fetchers --browser_queue--> WebDriverPool
+                                              |                               |
+                                              +--------validate_queue---------+
+                                                            |
+                                         validators --write_queue--> batch writer
+
+    With SCRAPER_ENGINE=selenium the WebDriverPool reads fetch_queue
+    directly. All queues are bounded, every consumer drains its queue until
+    it receives STOP (also after a cancel), and rows are written in batches
+    while scraping is still going on.
+    """
+
+    def __init__(self, progress=None, engine=None, queue_size=PIPELINE_QUEUE_SIZE,
+                 fetch_workers=PIPELINE_FETCH_WORKERS, browser_workers=PIPELINE_BROWSER_WORKERS,
+                 validate_workers=PIPELINE_VALIDATE_WORKERS, journal=None):
+        self.progress = progress or ScrapeProgress()
+        self.journal = journal
+        if journal is not None:
+            self.progress.on_failure = journal.mark_failed
+        self.engine = engine or SCRAPER_ENGINE
+        self.fetch_workers = max(1, fetch_workers) if self.engine == "http" else 0
+        self.validate_workers = max(1, validate_workers)
+        self.browser_pool = WebDriverPool(size=browser_workers, progress=self.progress)
+        self.fetch_queue = queue.Queue(maxsize=queue_size)
+        self.browser_queue = self.fetch_queue if self.engine != "http" else queue.Queue(maxsize=queue_size)
+        self.validate_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.writer_stats = None
+        self.errors = []
+
+    def _guard(self, stage, target, source, *args):
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                logger.exception(f"Pipeline stage {stage} failed.")
+                self.errors.append(e)
+                self.progress.cancel()
+                # Keep consuming until our STOP so upstream stages never block.
+                while source is not None and source.get() is not STOP:
+                    pass
+        return run
+
+    def _start(self, stage, target, source, count=1, *args):
+        threads = [
+            threading.Thread(target=self._guard(stage, target, source, *args), name=f"{stage}-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    @staticmethod
+    def _close(threads, downstream, consumers):
+        for thread in threads:
+            thread.join()
+        for _ in range(consumers):
+            downstream.put(STOP)
+
+    def _produce(self, entries):
+        try:
+            for url, data in entries:
+                if self.progress.cancelled:
+                    break
+                self.progress.add_discovered()
+                self.fetch_queue.put((url, data))
+        finally:
+            consumers = self.fetch_workers or self.browser_pool.size
+            for _ in range(consumers):
+                self.fetch_queue.put(STOP)
+
+    def _fetch(self):
+        session = create_session(1)
+        try:
+            while True:
+                item = self.fetch_queue.get()
+                if item is STOP:
+                    break
+                if self.progress.cancelled:
+                    continue
+                url, data = item
+                started = time.perf_counter()
+                try:
+                    record = fetch_campground(session, url, data)
+                except Exception as e:
+                    logger.warning(f"HTTP extraction failed for {url}: {e}")
+                    record_failure("http_fetch", e)
+                    record = None
+                if record is not None and has_required_fields(record):
+                    PAGE_SECONDS.labels("http").observe(time.perf_counter() - started)
+                    PAGES.labels("http", "done").inc()
+                    self.progress.page_done()
+                    self.validate_queue.put((url, record))
+                else:
+                    PAGES.labels("http", "fallback").inc()
+                    self.browser_queue.put(item)
+        finally:
+            session.close()
+
+    def _browse(self):
+        self.browser_pool.run(
+            self.browser_queue,
+            lambda url, record: self.validate_queue.put((url, record)),
+        )
+
+    def _validate(self):
+        while True:
+            item = self.validate_queue.get()
+            if item is STOP:
+                break
+            url, campground_data = item
+            with timed("geocode"):
+                fill_location_fields([campground_data])
+            try:
+                with timed("validate"):
+                    record = build_db_record(campground_data)
+            except ValidationError as e:
+                record_failure("validate", e)
+                self.progress.record_invalid(url=url, reason=str(e))
+                logger.warning(f"Validation error for URL {url}: {e}")
+            else:
+                self.write_queue.put(record)
+
+    def _journal_flush(self, batch, error):
+        links = [data["links"] for data in batch]
+        if error is None:
+            self.journal.mark_done(links)
+        else:
+            self.journal.mark_failed(links, str(error))
+
+    def _write(self):
+        on_flush = self._journal_flush if self.journal is not None else None
+        with CampgroundBatchWriter(on_flush=on_flush) as writer:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    item = self.write_queue.get(timeout=PIPELINE_FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = None
+                if item is STOP:
+                    break
+                if item is not None:
+                    writer.add(item)
+                if time.monotonic() - last_flush >= PIPELINE_FLUSH_INTERVAL:
+                    writer.flush()
+                    last_flush = time.monotonic()
+        self.writer_stats = writer.stats
+
+    def run(self, entries):
+        writer = self._start("writer", self._write, self.write_queue)
+        validators = self._start("validate", self._validate, self.validate_queue, self.validate_workers)
+        browser = self._start("browser", self._browse, None)
+        fetchers = self._start("fetch", self._fetch, self.fetch_queue, self.fetch_workers)
+        producer = self._start("sitemap", self._produce, None, 1, entries)
+
+        # Shut the stages down front to back: each one is told to stop only
+        # after everything that feeds it has finished.
+        for thread in producer:
+            thread.join()
+        if self.engine == "http":
+            self._close(fetchers, self.browser_queue, self.browser_pool.size)
+        self._close(browser, self.validate_queue, self.validate_workers)
+        self._close(validators, self.write_queue, 1)
+        for thread in writer:
+            thread.join()
+        if self.journal is not None:
+            self.journal.flush()
+
+        if self.errors:
+            raise self.errors[0]
+        return self.writer_stats
+
+
+def _journaled_entries(entries, journal):
+    for url, data in entries:
+        journal.add_pending(url, data)
+        yield url, data
+    journal.flush()
+    run_store.mark_sitemap_complete(journal.run_id)
+
+
+def run_scrape(progress: ScrapeProgress = None, profile: bool = None) -> dict:
+    """
+    Full sitemap -> scrape -> validate -> upsert cycle on a ScrapePipeline.
+
+    Every item's status is journaled in scrape_run_items as it finishes. If
+    the last run did not complete (crash, deploy, cancel, error, or failed
+    items left with attempts to spare), only its pending and failed items
+    are processed instead of scanning the sitemap.
+    Returns a summary dict; stage errors propagate to the caller. When
+    `progress` is cancelled the pages scraped so far are still written, but
+    the sitemap cache is not committed so the next run picks the rest up.
+
+    The summary includes the time spent in every stage during this run.
+    With `profile` (default SCRAPER_PROFILE) the run is sampled by a
+    SamplingProfiler and its stacks are written to SCRAPER_PROFILE_DIR.
+    """
+    progress = progress or ScrapeProgress()
+    stages_before = stage_totals()
+    logger.info("Starting to fetch updated campgrounds.")
+
+    sitemap_delta = None
+    run_id = run_store.find_resumable_run()
+    if run_id:
+        logger.info(f"Resuming unfinished scrape run {run_id}.")
+        journal = run_store.RunJournal(run_id)
+        entries = run_store.iter_unfinished_items(run_id)
+    else:
+        previous_index = load_lastmod_index()
+        logger.debug(f"Loaded {len(previous_index)} previous campground entries from DB.")
+
+        sitemap_delta = SitemapDelta(SITEMAP_URL)
+        if not sitemap_delta.fetch():
+            logger.info("Sitemap not modified since the last run, nothing to update.")
+            return {"message": "Sitemap not modified."}
+
+        run_store.abandon_unfinished_runs()
+        run_id = run_store.start_run()
+        journal = run_store.RunJournal(run_id)
+        entries = _journaled_entries(iter_updated_entries(sitemap_delta, previous_index), journal)
+
+    pipeline = ScrapePipeline(progress=progress, journal=journal)
+    try:
+        with maybe_profile(f"scrape-{run_id}", profile):
+            written = pipeline.run(entries)
+    except Exception:
+        run_store.finish_run(run_id, "failed")
+        raise
+
+    stages = stage_delta(stages_before, stage_totals())
+    logger.info(f"Stage timings: {stages}")
+    summary = {"run_id": run_id, "resumed": sitemap_delta is None, "written": written, "stages": stages}
+    if progress.cancelled:
+        run_store.finish_run(run_id, "cancelled")
+        logger.info("Scrape cancelled, sitemap cache left uncommitted.")
+        return {"message": "Cancelled.", **summary}
+
+    # A run with failed items left to retry stays resumable: the next run
+    # processes just those until they succeed or run out of attempts.
+    retryable = run_store.count_retryable_items(run_id)
+    run_store.finish_run(run_id, "incomplete" if retryable else "completed")
+    summary["retryable"] = retryable
+    if sitemap_delta is not None:
+        # Failed, invalid and unwritten pages stay "changed" for the next scan.
+        sitemap_delta.commit(exclude=run_store.failed_links(run_id))
+    logger.info("All updated campgrounds processed successfully.")
+    return {"message": "Completed.", **summary}
@@ -0,0 +1,100 @@
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: SCRAPER_PROFILE=1 samples every thread's stack for the whole run.
+SCRAPER_PROFILE = os.getenv("SCRAPER_PROFILE", "0") == "1"
+PROFILE_INTERVAL = float(os.getenv("SCRAPER_PROFILE_INTERVAL", "0.01"))
+PROFILE_DIR = os.getenv("SCRAPER_PROFILE_DIR", "profiles")
+PROFILE_MAX_DEPTH = 64
+PROFILE_TOP = 15
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a whole process. A background thread
+    reads every other thread's current stack through sys._current_frames()
+    each `interval` seconds and counts the collapsed stacks, so threads that
+    wait on the network or a lock show up as well as the ones burning CPU.
+    Nothing is traced, so the cost is one stack walk per thread per sample.
+
+    stop() writes the samples in collapsed-stack format ("thread;outer;...;
+    inner count" per line), which flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, name, interval=PROFILE_INTERVAL, output_dir=PROFILE_DIR):
+        self.name = name
+        self.interval = max(0.001, interval)
+        self.output_dir = output_dir
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        logger.info(f"Sampling profiler started for {self.name} every {self.interval * 1000:.0f} ms.")
+        self._thread.start()
+        return self
+
+    def top_functions(self, count=PROFILE_TOP):
+        # Innermost frame of every sampled stack: where the threads were.
+        leaves = Counter()
+        for stack, hits in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += hits
+        return leaves.most_common(count)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.name}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, hits in self.stacks.most_common():
+                f.write(f"{stack} {hits}\n")
+        total = sum(self.stacks.values()) or 1
+        summary = "\n".join(f"  {hits / total:6.1%}  {label}" for label, hits in self.top_functions())
+        logger.info(f"Profile written to {path} ({self.samples} samples). Top frames:\n{summary}")
+        return path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def maybe_profile(name, enabled=None):
+    """
+    A SamplingProfiler for `name` when profiling is enabled (SCRAPER_PROFILE
+    by default), otherwise a no-op context manager.
+    """
+    enabled = SCRAPER_PROFILE if enabled is None else enabled
+    return SamplingProfiler(name) if enabled else nullcontext()
@@ -0,0 +1,68 @@
+import threading
+import time
+
+
+class ScrapeProgress:
+    """
+    Thread-safe counters for one scrape run, shared by the sitemap scan, the
+    page extractors and the DB writer. Also carries the cancel flag that the
+    workers check between pages.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.started_at = time.time()
+        self.discovered = 0
+        self.done = 0
+        self.failed = 0
+        self.invalid = 0
+        # Optional callable(urls, reason) told about every failed or invalid page.
+        self.on_failure = None
+
+    def add_discovered(self, count=1):
+        with self._lock:
+            self.discovered += count
+
+    def page_done(self, count=1):
+        with self._lock:
+            self.done += count
+
+    def page_failed(self, count=1, url=None, reason=None):
+        with self._lock:
+            self.failed += count
+        self._notify_failure(url, reason)
+
+    def record_invalid(self, count=1, url=None, reason=None):
+        # Pages that were scraped but rejected by validation.
+        with self._lock:
+            self.invalid += count
+        self._notify_failure(url, reason)
+
+    def _notify_failure(self, url, reason):
+        if url is not None and self.on_failure is not None:
+            self.on_failure([url], reason)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def snapshot(self, now=None):
+        with self._lock:
+            discovered, done, failed, invalid = self.discovered, self.done, self.failed, self.invalid
+        elapsed = (now or time.time()) - self.started_at
+        finished = done + failed
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        remaining = max(discovered - finished, 0)
+        return {
+            "discovered": discovered,
+            "done": done,
+            "failed": failed,
+            "invalid": invalid,
+            "elapsed_seconds": round(elapsed, 1),
+            "pages_per_second": round(rate, 3),
+            "eta_seconds": round(remaining / rate, 1) if rate else None,
+        }
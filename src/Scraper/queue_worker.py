@@ -0,0 +1,151 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from src.db import scrape_queue
+from src.db.db_methods import load_lastmod_index
+from .pipeline import ScrapePipeline, SITEMAP_URL
+from .progress import ScrapeProgress
+from .sitemap_handler import SitemapDelta, iter_updated_entries
+
+logger = logging.getLogger(__name__)
+
+# "local" runs scrape jobs inside the API process; "queue" only scans the
+# sitemap and enqueues changed campgrounds for worker.py processes.
+SCRAPE_JOB_MODE = os.getenv("SCRAPE_JOB_MODE", "local")
+WORKER_CLAIM_BATCH = int(os.getenv("WORKER_CLAIM_BATCH", "20"))
+WORKER_IDLE_SLEEP = float(os.getenv("WORKER_IDLE_SLEEP", "5"))
+WORKER_REQUEUE_INTERVAL = float(os.getenv("WORKER_REQUEUE_INTERVAL", "30"))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def enqueue_updated_entries(progress: ScrapeProgress = None, sitemap_url: str = SITEMAP_URL) -> dict:
+    """
+    Scans the sitemap like run_scrape does but, instead of scraping, puts
+    every new or changed campground on scrape_queue. The sitemap cache is
+    committed once everything is enqueued, since the queue now owns the
+    work: items that run out of attempts are retried by the workers after
+    QUEUE_FAILED_COOLDOWN_HOURS (see scrape_queue.rearm_failed).
+    """
+    progress = progress or ScrapeProgress()
+    previous_index = load_lastmod_index()
+    sitemap_delta = SitemapDelta(sitemap_url)
+    if not sitemap_delta.fetch():
+        logger.info("Sitemap not modified since the last run, nothing to enqueue.")
+        return {"message": "Sitemap not modified.", "enqueued": 0}
+
+    def counted(entries):
+        for entry in entries:
+            if progress.cancelled:
+                break
+            progress.add_discovered()
+            yield entry
+
+    enqueued = scrape_queue.enqueue(counted(iter_updated_entries(sitemap_delta, previous_index)))
+    if progress.cancelled:
+        return {"message": "Cancelled.", "enqueued": enqueued}
+    sitemap_delta.commit()
+    return {"message": "Completed.", "enqueued": enqueued}
+
+
+class QueueWorker:
+    """
+    Scrapes campgrounds claimed from scrape_queue on a ScrapePipeline.
+
+    Items are claimed in batches of `claim_batch` as the pipeline has room
+    for them, and the worker doubles as the pipeline's journal: an item is
+    completed in the queue once its row is written and failed (retried or
+    given up) when its page or validation fails. A heartbeat thread renews
+    the leases of everything the worker holds, so only a dead or stalled
+    worker's items are requeued by requeue_expired(); the same periodic
+    check re-arms failed items after their cool-down and prunes old done
+    items. Items still held when the run ends
+    (cancel, error) are released unchanged.
+
+    With exit_when_empty the worker stops once no pending items are left;
+    otherwise it polls every `idle_sleep` seconds until cancelled.
+    """
+
+    def __init__(self, worker_id=None, claim_batch=WORKER_CLAIM_BATCH, lease_seconds=scrape_queue.QUEUE_LEASE_SECONDS,
+                 idle_sleep=WORKER_IDLE_SLEEP, exit_when_empty=False, progress=None, **pipeline_options):
+        self.worker_id = worker_id or default_worker_id()
+        self.claim_batch = max(1, claim_batch)
+        self.lease_seconds = lease_seconds
+        self.idle_sleep = idle_sleep
+        self.exit_when_empty = exit_when_empty
+        self.progress = progress or ScrapeProgress()
+        self.pipeline_options = pipeline_options
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop_heartbeat = threading.Event()
+
+    def mark_done(self, links):
+        scrape_queue.complete(self.worker_id, links)
+        self._forget(links)
+
+    def mark_failed(self, links, error=None):
+        scrape_queue.fail(self.worker_id, links, error)
+        self._forget(links)
+
+    def flush(self):
+        # Statuses are written as they arrive; nothing is buffered.
+        pass
+
+    def _forget(self, links):
+        with self._lock:
+            self._held.difference_update(links)
+
+    def _claimed_entries(self):
+        last_requeue = 0.0
+        while not self.progress.cancelled:
+            if time.monotonic() - last_requeue >= WORKER_REQUEUE_INTERVAL:
+                scrape_queue.requeue_expired()
+                scrape_queue.rearm_failed()
+                scrape_queue.prune_done()
+                last_requeue = time.monotonic()
+            rows = scrape_queue.claim(self.worker_id, self.claim_batch, self.lease_seconds)
+            if not rows:
+                if self.exit_when_empty and not scrape_queue.requeue_expired():
+                    break
+                self.progress.cancel_event.wait(self.idle_sleep)
+                continue
+            with self._lock:
+                self._held.update(links for links, _ in rows)
+            for links, data in rows:
+                yield links, data
+
+    def _heartbeat(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop_heartbeat.wait(interval):
+            with self._lock:
+                links = list(self._held)
+            try:
+                held = scrape_queue.heartbeat(self.worker_id, links, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed: {e}")
+                continue
+            if held < len(links):
+                logger.warning(f"{len(links) - held} of {len(links)} leases were lost before the heartbeat.")
+
+    def run(self) -> dict:
+        logger.info(f"Queue worker {self.worker_id} started.")
+        heartbeat = threading.Thread(target=self._heartbeat, name="queue-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            pipeline = ScrapePipeline(progress=self.progress, journal=self, **self.pipeline_options)
+            written = pipeline.run(self._claimed_entries())
+        finally:
+            self._stop_heartbeat.set()
+            heartbeat.join()
+            with self._lock:
+                leftover, self._held = list(self._held), set()
+            if leftover:
+                scrape_queue.release(self.worker_id, leftover)
+                logger.info(f"Released {len(leftover)} unfinished items back to the queue.")
+        logger.info(f"Queue worker {self.worker_id} stopped: {written}")
+        return {"worker_id": self.worker_id, "written": written, **self.progress.snapshot()}
@@ -0,0 +1,191 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from operator import itemgetter
+from src.db import refresh_stats, scrape_queue
+from .pipeline import ScrapePipeline, SITEMAP_URL
+from .progress import ScrapeProgress
+from .queue_worker import SCRAPE_JOB_MODE
+from .sitemap_handler import SitemapDelta, SITEMAP_CACHE_DIR
+from .utils import normalize_timestamp
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_MINUTES = int(os.getenv("REFRESH_INTERVAL_MINUTES", "60"))
+# Pages scraped (or enqueued) per cycle at most.
+REFRESH_PAGE_BUDGET = int(os.getenv("REFRESH_PAGE_BUDGET", "500"))
+# Campgrounds whose score is below this are not refreshed even when the
+# budget has room; this is what lets quiet records go unscraped.
+REFRESH_MIN_SCORE = float(os.getenv("REFRESH_MIN_SCORE", "0.1"))
+# Campgrounds whose sitemap lastmod is younger than this many days get up
+# to REFRESH_RECENCY_WEIGHT extra score, fading out exponentially.
+REFRESH_RECENCY_DAYS = float(os.getenv("REFRESH_RECENCY_DAYS", "7"))
+REFRESH_RECENCY_WEIGHT = float(os.getenv("REFRESH_RECENCY_WEIGHT", "1"))
+# Prior for the change-rate estimate: one change per this many days until
+# a campground has been observed for a while.
+REFRESH_PRIOR_DAYS = float(os.getenv("REFRESH_PRIOR_DAYS", "14"))
+REFRESH_HISTORY_SIZE = 24
+
+DAY = 86400.0
+
+
+def change_rate(change_count, first_scraped, last_scraped):
+    """
+    Changes per day, estimated from the changes seen between the first and
+    the last scrape, smoothed towards one change per REFRESH_PRIOR_DAYS.
+    """
+    observed_days = max(0.0, (last_scraped - first_scraped) / DAY) if first_scraped is not None else 0.0
+    return (change_count + 1) / (observed_days + REFRESH_PRIOR_DAYS)
+
+
+def change_probability(now, lastmod, first_scraped, last_scraped, change_count):
+    """
+    Probability that the stored record is out of date: 1 when it was never
+    scraped or the sitemap lastmod is newer than the last scrape, otherwise
+    1 - exp(-rate * days since the last scrape) for a Poisson change
+    process with the campground's estimated rate.
+    """
+    if last_scraped is None or (lastmod is not None and lastmod > last_scraped):
+        return 1.0
+    rate = change_rate(change_count, first_scraped, last_scraped)
+    return 1.0 - math.exp(-rate * max(0.0, now - last_scraped) / DAY)
+
+
+def refresh_score(now, lastmod, first_scraped, last_scraped, change_count):
+    probability = change_probability(now, lastmod, first_scraped, last_scraped, change_count)
+    recency = math.exp(-max(0.0, now - lastmod) / DAY / REFRESH_RECENCY_DAYS) if lastmod is not None else 0.0
+    return probability, probability * (1.0 + REFRESH_RECENCY_WEIGHT * recency)
+
+
+class RefreshScheduler:
+    """
+    Replaces the fixed full refresh with a budgeted one. Every cycle:
+
+    1. the sitemap delta updates each changed campground's lastmod and
+       sitemap data in campground_refresh_stats (the DB writer keeps the
+       scrape and change counts there up to date);
+    2. every known campground is scored by refresh_score: how likely its
+       stored price/availability is stale, weighted up for a recent lastmod;
+    3. the `budget` best candidates at or above `min_score` are taken from a
+       bounded heap and scraped (SCRAPE_JOB_MODE=local) or enqueued for the
+       workers (queue). With a `jobs` manager (the API's JobManager) the
+       local scrape is submitted as a job, so it never runs next to another
+       scrape job; when one is already running the scrape is skipped for
+       this cycle.
+
+    The planning stats of the last cycles are kept for GET /refresh-plans.
+    """
+
+    def __init__(self, budget=REFRESH_PAGE_BUDGET, min_score=REFRESH_MIN_SCORE, mode=None, sitemap_url=SITEMAP_URL,
+                 jobs=None):
+        self.budget = max(0, budget)
+        self.min_score = min_score
+        self.mode = mode or SCRAPE_JOB_MODE
+        self.sitemap_url = sitemap_url
+        self.jobs = jobs
+        self.history = deque(maxlen=REFRESH_HISTORY_SIZE)
+        self._lock = threading.Lock()
+
+    def update_from_sitemap(self) -> int:
+        # Own cache, so the scheduler's deltas do not hide changes from a
+        # manual full scrape and vice versa.
+        delta = SitemapDelta(self.sitemap_url, cache_dir=os.path.join(SITEMAP_CACHE_DIR, "refresh"))
+        if not delta.fetch():
+            return 0
+        entries = (
+            (loc, {
+                "availability_updated_at": lastmod,
+                "image_count": len(image_urls),
+                "photo_url": image_urls[0] if image_urls else None,
+                "photo_urls": image_urls,
+            }, normalize_timestamp(lastmod))
+            for loc, lastmod, image_urls in delta
+        )
+        changed = refresh_stats.record_sitemap_entries(entries)
+        delta.commit()
+        return changed
+
+    def plan(self, candidates, now=None):
+        """
+        Returns (selected, stats); selected is a list of (links, data) in
+        priority order.
+        """
+        now = now or time.time()
+        counts = {"candidates": 0, "eligible": 0, "never_scraped": 0, "sitemap_changed": 0}
+        expected_total = 0.0
+
+        def eligible():
+            nonlocal expected_total
+            for links, data, lastmod, first_scraped, last_scraped, change_count in candidates:
+                counts["candidates"] += 1
+                probability, score = refresh_score(now, lastmod, first_scraped, last_scraped, change_count)
+                expected_total += probability
+                if score < self.min_score:
+                    continue
+                counts["eligible"] += 1
+                if last_scraped is None:
+                    counts["never_scraped"] += 1
+                elif probability == 1.0:
+                    counts["sitemap_changed"] += 1
+                yield score, probability, links, data
+
+        # nlargest keeps a heap of `budget` items, not every candidate.
+        best = heapq.nlargest(self.budget, eligible(), key=itemgetter(0))
+        expected_selected = sum(probability for _, probability, _, _ in best)
+        stats = {
+            **counts,
+            "budget": self.budget,
+            "selected": len(best),
+            "min_score": self.min_score,
+            "selected_score_range": [round(best[-1][0], 4), round(best[0][0], 4)] if best else None,
+            "expected_changes_selected": round(expected_selected, 1),
+            "expected_changes_total": round(expected_total, 1),
+            # Share of the likely-stale records this cycle refreshes.
+            "expected_coverage": round(expected_selected / expected_total, 3) if expected_total else None,
+        }
+        return [(links, data) for _, _, links, data in best], stats
+
+    def run_cycle(self, progress: ScrapeProgress = None) -> dict:
+        if not self._lock.acquire(blocking=False):
+            logger.info("Refresh cycle already running, skipped.")
+            return {"skipped": True}
+        try:
+            started = time.time()
+            cycle = {"started_at": started, "mode": self.mode}
+            try:
+                cycle["seeded"] = refresh_stats.seed_from_campgrounds()
+                cycle["sitemap_updates"] = self.update_from_sitemap()
+                selected, stats = self.plan(refresh_stats.iter_refresh_candidates(), now=started)
+                cycle.update(stats)
+                cycle["planning_seconds"] = round(time.time() - started, 3)
+                logger.info(f"Refresh plan: {stats}")
+                if selected and self.mode == "queue":
+                    cycle["enqueued"] = scrape_queue.enqueue(selected)
+                elif selected and self.jobs is not None:
+                    job, created = self.jobs.submit(
+                        lambda job_progress: ScrapePipeline(progress=job_progress).run(iter(selected)), kind="refresh")
+                    cycle["job_id"] = job.id
+                    if not created:
+                        cycle["scrape_skipped"] = f"{job.kind} job {job.id} is {job.status}"
+                        logger.info(f"Refresh scrape skipped, {cycle['scrape_skipped']}.")
+                elif selected:
+                    pipeline = ScrapePipeline(progress=progress or ScrapeProgress())
+                    cycle["written"] = pipeline.run(iter(selected))
+            except Exception as e:
+                logger.exception("Refresh cycle failed.")
+                cycle["error"] = str(e)
+            cycle["seconds"] = round(time.time() - started, 3)
+            self.history.appendleft(cycle)
+            return cycle
+        finally:
+            self._lock.release()
+
+    def plans(self) -> list:
+        return list(self.history)
+
+
+refresh_scheduler = RefreshScheduler()
@@ -1,14 +1,69 @@
 import logging
+import os
+import queue
+import threading
+import time
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, WebDriverException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from .utils import get_nearest_city, extract_prices
+from .utils import get_nearest_city, extract_prices, administrative_area_from_address
+from .progress import ScrapeProgress
+from .http_client import get_client
+from .metrics import FIELD_SECONDS, PAGE_SECONDS, PAGES, record_failure, timed
 
 logger = logging.getLogger(__name__)
 
+POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "1"))
+PAGES_PER_DRIVER = int(os.getenv("SCRAPER_PAGES_PER_DRIVER", "200"))
+MAX_DRIVER_START_FAILURES = 3
+# "script" waits once for the page and reads every field in a single
+# execute_script call; "waits" keeps one WebDriverWait per field.
+EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "script")
+PAGE_READY_TIMEOUT = 10
+# Blocks images, media, fonts and trackers and returns from driver.get at
+# DOMContentLoaded; the extraction waits for the elements it needs anyway.
+LEAN_PROFILE = os.getenv("SCRAPER_LEAN_PROFILE", "1") == "1"
+# A driver whose chromedriver + Chrome process tree uses more than this much
+# RSS is recycled; checked every RSS_CHECK_INTERVAL pages. 0 disables it.
+MAX_DRIVER_RSS_MB = int(os.getenv("SCRAPER_MAX_DRIVER_RSS_MB", "1024"))
+RSS_CHECK_INTERVAL = max(1, int(os.getenv("SCRAPER_RSS_CHECK_INTERVAL", "10")))
+
+# Photo URLs come from the sitemap, so nothing here is needed for extraction.
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.m3u8",
+    "*/_next/image*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+    "*facebook.com/tr*", "*hotjar.com*", "*segment.io*", "*segment.com*",
+    "*sentry.io*", "*newrelic.com*", "*nr-data.net*", "*amplitude.com*",
+    "*branch.io*", "*intercom.io*", "*fullstory.com*", "*mapbox.com*",
+    "*tiles.mapbox.com*", "*maps.googleapis.com*", "*maps.gstatic.com*",
+] + [p.strip() for p in os.getenv("SCRAPER_EXTRA_BLOCKED_URLS", "").split(",") if p.strip()]
+
+# Sentinel that tells a pool worker there is no more work in the queue.
+STOP = object()
+
+def _apply_lean_profile(options):
+    options.page_load_strategy = "eager"
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--mute-audio")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-component-update")
+    options.add_argument("--disable-default-apps")
+    options.add_argument("--disable-sync")
+    options.add_argument("--no-first-run")
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.media_stream": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.default_content_setting_values.geolocation": 2,
+    })
+
 def configure_driver():
     options = Options()
     options.add_argument("--disable-extensions")
@@ -16,15 +71,63 @@ def configure_driver():
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
+    if LEAN_PROFILE:
+        _apply_lean_profile(options)
     logger.info("Web driver configured for headless operation.")
     try:
         driver = webdriver.Chrome(options=options)
+        if LEAN_PROFILE:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
         logger.info("Web driver successfully initialized.")
         return driver
     except WebDriverException as e:
         logger.error(f"Web driver initialization failed: {e}")
         raise
 
+def _process_tree_rss(root_pid):
+    """
+    RSS in bytes of root_pid and all of its descendants, read from /proc.
+    Returns None where /proc is not available.
+    """
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; fields after ')' are fixed.
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        return None
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(pid, ()))
+    return total
+
+def driver_rss(driver):
+    """
+    Memory of the chromedriver service and every Chrome process under it.
+    """
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        return None
+    return _process_tree_rss(pid)
+
 def wait_for_element(driver, by, value, timeout=10):
     try:
         return WebDriverWait(driver, timeout).until(
@@ -34,87 +137,333 @@ def wait_for_element(driver, by, value, timeout=10):
         logger.error(f"Element {value} not found after waiting for {timeout} seconds.")
         return None
 
-def update_names_for_urls(updated_data):
-    logger.info("Starting update_names_for_urls function.")
-    driver = configure_driver()
-    updated_data_with_names = {}
+# Reads every field in one round trip; elements that are missing come back as
+# null instead of costing a WebDriverWait timeout each.
+EXTRACT_FIELDS_SCRIPT = """
+const text = (el) => el ? el.innerText : null;
+const byClass = (name) => document.getElementsByClassName(name)[0] || null;
+const website = Array.from(document.querySelectorAll('a'))
+    .find((a) => a.textContent.trim() === 'Visit Website');
+const availability = document.evaluate(
+    "//*[contains(text(), 'Check Availability')]", document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+return {
+    address: text(document.getElementById('address')),
+    name: text(document.querySelector('h1')),
+    type: text(byClass('CampgroundDetails_header__title-label__B27_R')),
+    coordinates: text(document.getElementById('coordinates')),
+    drive_time: text(byClass('DriveTimeWidget_drive-time__links__WwTS5')),
+    site_types: text(byClass('CampgroundSiteTypes_site-types__category__5J51O')),
+    camper_types: Array.from(document.getElementsByClassName('AppAvatar_avatar__level-title__E3GvH'))
+        .map((el) => el.innerText),
+    bookable: availability !== null,
+    website: website ? website.href : null,
+    rating: text(byClass('CampgroundReviews_ratings__total-container__4RpaO')),
+    price: text(byClass('CampgroundStickyBar_sticky-bar__price-container__vJ2er')),
+};
+"""
+
+PAGE_READY_SCRIPT = "return !!(document.querySelector('h1') && document.getElementById('coordinates'));"
 
-    for url_index, (url, data) in enumerate(updated_data.items()):
-        logger.info(f"[{url_index+1}/{len(updated_data)}] Processing URL: {url}")
+def _element_text(element):
+    return element.text if element else None
+
+def _read_field(driver, field, by, value):
+    with FIELD_SECONDS.labels(field).time():
+        return _element_text(wait_for_element(driver, by, value))
+
+def read_fields_with_waits(driver):
+    # Use waits for elements instead of direct access to avoid race conditions
+    fields = {
+        "address": _read_field(driver, "address", By.ID, "address"),
+        "name": _read_field(driver, "name", By.CSS_SELECTOR, "h1"),
+        "type": _read_field(driver, "type", By.CLASS_NAME, "CampgroundDetails_header__title-label__B27_R"),
+        "coordinates": _read_field(driver, "coordinates", By.ID, "coordinates"),
+        "drive_time": _read_field(driver, "drive_time", By.CLASS_NAME, "DriveTimeWidget_drive-time__links__WwTS5"),
+        "site_types": _read_field(driver, "site_types", By.CLASS_NAME, "CampgroundSiteTypes_site-types__category__5J51O"),
+    }
+    with FIELD_SECONDS.labels("camper_types").time():
+        fields["camper_types"] = [el.text for el in driver.find_elements(By.CLASS_NAME, "AppAvatar_avatar__level-title__E3GvH")]
+
+    with FIELD_SECONDS.labels("bookable").time():
         try:
-            driver.get(url)
-            parts = url.split("/")
-            region_name = parts[4]
-        except Exception as e:
-            logger.error(f"Failed to load URL {url}: {e}")
-            continue
+            driver.find_element(By.XPATH, "//*[contains(text(), 'Check Availability')]")
+            fields["bookable"] = True
+        except NoSuchElementException:
+            fields["bookable"] = False
+
+    with FIELD_SECONDS.labels("website").time():
+        href_element = wait_for_element(driver, By.LINK_TEXT, "Visit Website")
+        fields["website"] = href_element.get_attribute('href') if href_element else None
+    fields["rating"] = _read_field(driver, "rating", By.CLASS_NAME, "CampgroundReviews_ratings__total-container__4RpaO")
+    fields["price"] = _read_field(driver, "price", By.CLASS_NAME, "CampgroundStickyBar_sticky-bar__price-container__vJ2er")
+    return fields
 
-        # Use waits for elements instead of direct access to avoid race conditions
-        administrative_area_element = wait_for_element(driver, By.ID, "address")
-        administrative_area = administrative_area_element.text.split(',')[0].split('\n')[-1].strip() if administrative_area_element else ""
+def read_fields_with_script(driver, timeout=PAGE_READY_TIMEOUT):
+    # Every field comes back from one script call, so the per-field
+    # histogram only has "page_ready" and "script" here.
+    with FIELD_SECONDS.labels("page_ready").time():
+        try:
+            WebDriverWait(driver, timeout).until(lambda d: d.execute_script(PAGE_READY_SCRIPT))
+        except TimeoutException:
+            logger.error(f"Page not ready after waiting for {timeout} seconds.")
+    with FIELD_SECONDS.labels("script").time():
+        return driver.execute_script(EXTRACT_FIELDS_SCRIPT) or {}
 
-        campground_name_element = wait_for_element(driver, By.CSS_SELECTOR, "h1")
-        campground_name = campground_name_element.text if campground_name_element else ""
+def build_record(url, data, fields):
+    parts = url.split("/")
+    region_name = parts[4]
 
-        type_name_element = wait_for_element(driver, By.CLASS_NAME, "CampgroundDetails_header__title-label__B27_R")
-        type_name = type_name_element.text if type_name_element else ""
+    address = fields.get("address")
+    administrative_area = administrative_area_from_address(address)
 
-        coordinates_element = wait_for_element(driver, By.ID, "coordinates")
-        coordinates = coordinates_element.text.split() if coordinates_element else ["", "", ""]
+    coordinates = fields["coordinates"].split() if fields.get("coordinates") else ["", "", ""]
 
-        nearest_info_element = wait_for_element(driver, By.CLASS_NAME, "DriveTimeWidget_drive-time__links__WwTS5")
-        nearest_city = get_nearest_city(nearest_info_element.text)[0] if nearest_info_element else ""
+    drive_time = fields.get("drive_time")
+    nearest_city = get_nearest_city(drive_time)[0] if drive_time else ""
 
-        accommodation_type_names_element = wait_for_element(driver, By.CLASS_NAME, "CampgroundSiteTypes_site-types__category__5J51O")
-        accommodation_type_names = [s.strip() for s in accommodation_type_names_element.text.split("\n")] if accommodation_type_names_element else []
+    site_types = fields.get("site_types")
+    accommodation_type_names = [s.strip() for s in site_types.split("\n")] if site_types else []
 
-        camper_type_elements = driver.find_elements(By.CLASS_NAME, "AppAvatar_avatar__level-title__E3GvH")
-        camper_types = list(dict.fromkeys([el.text for el in camper_type_elements]))
+    camper_types = list(dict.fromkeys(fields.get("camper_types") or []))
 
-        try:
-            driver.find_element(By.XPATH, "//*[contains(text(), 'Check Availability')]")
-            bookable = True
-        except NoSuchElementException:
-            bookable = False
+    rating_text = fields.get("rating")
+    if rating_text:
+        rating, reviews_count = rating_text.split()[0], rating_text.split()[4]
+    else:
+        rating, reviews_count = None, 0
 
-        href_element = wait_for_element(driver, By.LINK_TEXT, "Visit Website")
-        href = href_element.get_attribute('href') if href_element else "*"
+    # No price on the page is an unknown price, not a free one.
+    price_text = fields.get("price")
+    price = extract_prices(price_text) if price_text else [None, None]
+
+    slug = parts[-1]
 
-        rating_elements = wait_for_element(driver, By.CLASS_NAME, "CampgroundReviews_ratings__total-container__4RpaO")
-        if rating_elements:
-            rating, reviews_count = rating_elements.text.split()[0], rating_elements.text.split()[4]
+    return {
+        **data,
+        "links": url,
+        "name": fields.get("name") or "",
+        "region-name": region_name,
+        "administrative_area": administrative_area,
+        "latitude": coordinates[0],
+        "longitude": coordinates[2],
+        "nearest_city_name": nearest_city,
+        "type": fields.get("type") or "",
+        "accommodation_type_names": accommodation_type_names,
+        "camper_types": camper_types,
+        "bookable": bool(fields.get("bookable")),
+        "operator": fields.get("website") or "*",
+        "rating": rating,
+        "reviews_count": reviews_count,
+        "price_low": price[0],
+        "price_high": price[1],
+        "slug": slug
+    }
+
+def is_network_error(exc) -> bool:
+    # Page-load timeouts and Chrome's net::ERR_* pages say the host is in
+    # trouble; other WebDriver errors (crashed tab, script errors) do not.
+    return isinstance(exc, TimeoutException) or (
+        isinstance(exc, WebDriverException) and "net::ERR_" in (exc.msg or "")
+    )
+
+def scrape_campground_page(driver, url, data, mode=None):
+    # Page loads share the per-host limits of the HTTP fetchers.
+    with timed("page_load"):
+        get_client().call(url, lambda: driver.get(url), is_failure=is_network_error)
+    with timed("dom_extract"):
+        if (mode or EXTRACTION_MODE) == "script":
+            fields = read_fields_with_script(driver)
         else:
-            rating, reviews_count = 0, 0
-
-        price_element = wait_for_element(driver, By.CLASS_NAME, "CampgroundStickyBar_sticky-bar__price-container__vJ2er")
-        price = extract_prices(price_element.text) if price_element else [0, 0]
-
-        slug = parts[-1]
-
-        updated_data_with_names[url] = {
-            **data,
-            "links": url,
-            "name": campground_name,
-            "region-name": region_name,
-            "administrative_area": administrative_area,
-            "latitude": coordinates[0],
-            "longitude": coordinates[2],
-            "nearest_city_name": nearest_city,
-            "type": type_name,
-            "accommodation_type_names": accommodation_type_names,
-            "camper_types": camper_types,
-            "bookable": bookable,
-            "operator": href,
-            "rating": rating,
-            "reviews_count": reviews_count,
-            "price_low": price[0],
-            "price_high": price[1],
-            "slug": slug
-        }
-
-        logger.info(f"Data extracted and updated for: {campground_name or slug}")
-
-    driver.quit()
-    logger.info("Driver session closed.")
+            fields = read_fields_with_waits(driver)
+        return build_record(url, data, fields)
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class WebDriverPool:
+    """
+    Runs `size` worker threads, each owning one headless Chrome, that pull
+    (url, data) tasks from a shared queue until they receive STOP. Once the
+    pool is stopped, workers keep draining the queue without scraping so
+    producers blocked on a bounded queue are never stuck.
+
+    A driver is recycled after `pages_per_driver` pages, when its process
+    tree grows past `max_rss_mb`, or as soon as it raises a
+    WebDriverException; the page that hit the crash is retried once on the
+    fresh driver.
+    """
+
+    def __init__(self, size=POOL_SIZE, pages_per_driver=PAGES_PER_DRIVER, driver_factory=configure_driver, progress=None,
+                 max_rss_mb=MAX_DRIVER_RSS_MB, memory_probe=driver_rss):
+        self.size = max(1, size)
+        self.pages_per_driver = max(1, pages_per_driver)
+        self.driver_factory = driver_factory
+        self.progress = progress or ScrapeProgress()
+        self.stop_event = self.progress.cancel_event
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.memory_probe = memory_probe
+        self._lock = threading.Lock()
+        self._processed = 0
+        self.latencies = []
+        # worker id -> highest driver RSS seen, bytes
+        self.peak_rss = {}
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self, tasks, on_result, total=None):
+        workers = [
+            threading.Thread(target=self._worker, args=(i, tasks, on_result, total), name=f"webdriver-{i}", daemon=True)
+            for i in range(self.size)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        logger.info(f"WebDriver pool finished, {self._processed} pages processed.")
+        if self.latencies:
+            logger.info(
+                f"Per-page latency ({EXTRACTION_MODE} mode): "
+                f"p50={_percentile(self.latencies, 0.5):.2f}s p95={_percentile(self.latencies, 0.95):.2f}s"
+            )
+        if self.peak_rss:
+            logger.info(f"Peak driver RSS per worker: {max(self.peak_rss.values()) / 2**20:.0f} MB max, "
+                        f"{sum(self.peak_rss.values()) / len(self.peak_rss) / 2**20:.0f} MB mean.")
+
+    def _over_memory_limit(self, worker_id, driver):
+        rss = self.memory_probe(driver)
+        if rss is None:
+            return False
+        with self._lock:
+            self.peak_rss[worker_id] = max(rss, self.peak_rss.get(worker_id, 0))
+        if self.max_rss and rss > self.max_rss:
+            logger.info(f"[worker {worker_id}] Recycling driver at {rss / 2**20:.0f} MB RSS.")
+            return True
+        return False
+
+    def _start_driver(self, worker_id):
+        for attempt in range(1, MAX_DRIVER_START_FAILURES + 1):
+            try:
+                return self.driver_factory()
+            except WebDriverException as e:
+                logger.error(f"[worker {worker_id}] Driver start failed ({attempt}/{MAX_DRIVER_START_FAILURES}): {e}")
+        return None
+
+    def _quit_driver(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Driver quit failed: {e}")
+
+    def _worker(self, worker_id, tasks, on_result, total):
+        driver = None
+        pages = 0
+        broken = False
+        try:
+            while True:
+                task = tasks.get()
+                if task is STOP:
+                    break
+                if self.stop_event.is_set():
+                    if driver is not None:
+                        self._quit_driver(driver)
+                        driver = None
+                    continue
+                url, data = task
+                if broken:
+                    record_failure("selenium", "NoDriverAvailable")
+                    PAGES.labels("selenium", "failed").inc()
+                    self.progress.page_failed(url=url, reason="no driver available")
+                    continue
+
+                with self._lock:
+                    self._processed += 1
+                    index = self._processed
+                logger.info(f"[{index}/{total or '?'}] Processing URL: {url}")
+
+                for attempt in (1, 2):
+                    if driver is None:
+                        driver = self._start_driver(worker_id)
+                        pages = 0
+                        if driver is None:
+                            logger.error(f"[worker {worker_id}] Giving up, no driver available.")
+                            record_failure("selenium", "NoDriverAvailable")
+                            PAGES.labels("selenium", "failed").inc()
+                            self.progress.page_failed(url=url, reason="no driver available")
+                            broken = True
+                            break
+                    try:
+                        started = time.perf_counter()
+                        record = scrape_campground_page(driver, url, data)
+                        elapsed = time.perf_counter() - started
+                        pages += 1
+                        with self._lock:
+                            self.latencies.append(elapsed)
+                        PAGE_SECONDS.labels("selenium").observe(elapsed)
+                        PAGES.labels("selenium", "done").inc()
+                        self.progress.page_done()
+                        on_result(url, record)
+                        logger.info(f"Data extracted and updated for: {record['name'] or record['slug']} ({elapsed:.2f}s)")
+                        break
+                    except WebDriverException as e:
+                        logger.error(f"[worker {worker_id}] Driver error on {url} (attempt {attempt}): {e}")
+                        record_failure("selenium", e)
+                        self._quit_driver(driver)
+                        driver = None
+                        if attempt == 2:
+                            PAGES.labels("selenium", "failed").inc()
+                            self.progress.page_failed(url=url, reason=str(e))
+                    except Exception as e:
+                        logger.error(f"Failed to load URL {url}: {e}")
+                        record_failure("selenium", e)
+                        PAGES.labels("selenium", "failed").inc()
+                        self.progress.page_failed(url=url, reason=str(e))
+                        break
+
+                if driver is not None and pages >= self.pages_per_driver:
+                    logger.info(f"[worker {worker_id}] Recycling driver after {pages} pages.")
+                    self._quit_driver(driver)
+                    driver = None
+                elif driver is not None and pages and pages % RSS_CHECK_INTERVAL == 0 \
+                        and self._over_memory_limit(worker_id, driver):
+                    self._quit_driver(driver)
+                    driver = None
+        finally:
+            if driver is not None:
+                self._quit_driver(driver)
+            logger.info(f"[worker {worker_id}] Driver session closed.")
+
+def update_names_for_urls(updated_data, pool_size=None, pages_per_driver=None, pool=None, progress=None):
+    logger.info("Starting update_names_for_urls function.")
+    pool = pool or WebDriverPool(
+        size=pool_size or POOL_SIZE,
+        pages_per_driver=pages_per_driver or PAGES_PER_DRIVER,
+        progress=progress,
+    )
+    results = {}
+    results_lock = threading.Lock()
+
+    def collect(url, record):
+        with results_lock:
+            results[url] = record
+
+    tasks = queue.Queue()
+    for url, data in updated_data.items():
+        tasks.put((url, data))
+    for _ in range(pool.size):
+        tasks.put(STOP)
+
+    try:
+        pool.run(tasks, collect, total=len(updated_data))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, stopping WebDriver pool.")
+        pool.stop()
+        raise
+
+    # Keep the sitemap order so callers see the same dict as the sequential run.
+    updated_data_with_names = {url: results[url] for url in updated_data if url in results}
     logger.info("update_names_for_urls function completed.")
     return updated_data_with_names
@@ -1,10 +1,18 @@
-import requests
 import gzip
 import xml.etree.ElementTree as ET
-from io import BytesIO
+from io import BytesIO, BufferedReader, RawIOBase
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+import hashlib
 import os
 import json
 import logging
+import queue
+import threading
+import time
+from .utils import normalize_timestamp
+from .http_client import get_client
+from .metrics import SITEMAP_ENTRIES, STAGE_SECONDS, record_failure, timed
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +21,18 @@ NAMESPACE = {
     'image': 'http://www.google.com/schemas/sitemap-image/1.1'
 }
 
+URL_TAG = f"{{{NAMESPACE['ns']}}}url"
+SITEMAP_TAG = f"{{{NAMESPACE['ns']}}}sitemap"
+
+SITEMAP_FETCH_WORKERS = int(os.getenv("SITEMAP_FETCH_WORKERS", "4"))
+SITEMAP_TIMEOUT = 60
+# Upper bound on parsed entries buffered between child sitemap threads and
+# the consumer, so a slow consumer never lets memory grow.
+ENTRY_BUFFER_SIZE = 1000
+_DONE = object()
+
+SITEMAP_CACHE_DIR = os.getenv("SITEMAP_CACHE_DIR", ".sitemap_cache")
+
 def load_previous_data(file_path: str) -> dict:
     if os.path.exists(file_path):
         try:
@@ -28,7 +48,7 @@ def load_previous_data(file_path: str) -> dict:
 
 def download_and_parse_sitemap(url: str) -> ET.Element:
     logger.info(f"Downloading sitemap from {url}")
-    response = requests.get(url)
+    response = get_client().get(url, timeout=SITEMAP_TIMEOUT)
     if response.status_code == 200:
         with gzip.GzipFile(fileobj=BytesIO(response.content)) as gz_file:
             logger.info("Sitemap downloaded and decompressed successfully.")
@@ -36,31 +56,356 @@ def download_and_parse_sitemap(url: str) -> ET.Element:
     logger.error(f"Failed to download sitemap: {response.status_code}")
     raise Exception("Sitemap indirilemedi.")
 
-def get_updated_entries(root: ET.Element, previous_data: dict) -> dict:
-    updated = {}
-    logger.info("Scanning sitemap for updates...")
+def _parse_url_element(url_elem: ET.Element):
+    loc_elem = url_elem.find('ns:loc', NAMESPACE)
+    lastmod_elem = url_elem.find('ns:lastmod', NAMESPACE)
+
+    if loc_elem is None or lastmod_elem is None:
+        return None
+
+    image_locs = url_elem.findall('image:image', NAMESPACE)
+    image_urls = [img.find('image:loc', NAMESPACE).text for img in image_locs if img.find('image:loc', NAMESPACE) is not None]
+    return loc_elem.text, lastmod_elem.text, image_urls
+
+def iter_tree_entries(root: ET.Element):
     for url_elem in root.findall('ns:url', NAMESPACE):
-        loc_elem = url_elem.find('ns:loc', NAMESPACE)
-        lastmod_elem = url_elem.find('ns:lastmod', NAMESPACE)
+        entry = _parse_url_element(url_elem)
+        if entry:
+            yield entry
+
+class _TeeReader(RawIOBase):
+    """
+    Raw stream that copies every chunk it reads into `sink`, so a response
+    can be parsed and written to the cache in a single pass.
+    """
+
+    def __init__(self, source, sink):
+        self.source = source
+        self.sink = sink
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.source.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        self.sink.write(chunk)
+        return len(chunk)
 
-        if loc_elem is None or lastmod_elem is None:
-            continue
+def _decompressing_stream(stream):
+    stream = BufferedReader(stream)
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=stream)
+    return stream
 
-        loc = loc_elem.text
-        lastmod = lastmod_elem.text
+def _open_sitemap_stream(url: str, headers: dict = None, sink=None):
+    try:
+        with timed("sitemap_download"):
+            response = get_client().get(url, stream=True, timeout=SITEMAP_TIMEOUT, headers=headers)
+    except Exception as e:
+        record_failure("sitemap_download", e)
+        raise
+    if response.status_code == 304:
+        response.close()
+        return response, None
+    if response.status_code != 200:
+        response.close()
+        record_failure("sitemap_download", f"HTTP {response.status_code}")
+        logger.error(f"Failed to download sitemap: {response.status_code}")
+        raise Exception("Sitemap indirilemedi.")
+    response.raw.decode_content = True
+    response.raw.auto_close = False
+    source = _TeeReader(response.raw, sink) if sink else response.raw
+    return response, _decompressing_stream(source)
+
+def _iterparse_sitemap(stream):
+    """
+    Yields ("url", (loc, lastmod, image_urls)) and ("sitemap", loc) items
+    while the stream is being read. Every element is cleared from the root
+    once it is handled, so memory does not grow with the sitemap size.
 
-        image_locs = url_elem.findall('image:image', NAMESPACE)
-        image_urls = [img.find('image:loc', NAMESPACE).text for img in image_locs if img.find('image:loc', NAMESPACE) is not None]
+    The time spent here between yields (reading, decompressing, parsing) is
+    recorded as the sitemap_parse stage; the consumer's time is not.
+    """
+    root = None
+    entries = 0
+    parsing = 0.0
+    started = time.perf_counter()
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == URL_TAG:
+                entry = _parse_url_element(elem)
+                root.clear()
+                if entry:
+                    entries += 1
+                    parsing += time.perf_counter() - started
+                    yield "url", entry
+                    started = time.perf_counter()
+            elif elem.tag == SITEMAP_TAG:
+                loc_elem = elem.find('ns:loc', NAMESPACE)
+                root.clear()
+                if loc_elem is not None and loc_elem.text:
+                    parsing += time.perf_counter() - started
+                    yield "sitemap", loc_elem.text.strip()
+                    started = time.perf_counter()
+        parsing += time.perf_counter() - started
+    finally:
+        STAGE_SECONDS.labels("sitemap_parse").observe(parsing)
+        SITEMAP_ENTRIES.inc(entries)
+
+def _iter_single_sitemap(url: str, child_sitemaps: list = None):
+    logger.info(f"Streaming sitemap from {url}")
+    response, stream = _open_sitemap_stream(url)
+    try:
+        for kind, item in _iterparse_sitemap(stream):
+            if kind == "url":
+                yield item
+            elif child_sitemaps is not None:
+                child_sitemaps.append(item)
+            else:
+                # Nested index inside a child sitemap, follow it in place.
+                yield from _iter_single_sitemap(item)
+    finally:
+        response.close()
+
+def _iter_child_sitemaps(urls: list, workers: int, iter_child=None):
+    iter_child = iter_child or _iter_single_sitemap
+    entries = queue.Queue(maxsize=ENTRY_BUFFER_SIZE)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                entries.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(child_url):
+        try:
+            for entry in iter_child(child_url):
+                if not put(entry):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
 
-        previous_lastmod = previous_data.get(loc, {}).get("availability_updated_at")
-        if previous_lastmod != lastmod:
-            logger.debug(f"Updated entry found: {loc}")
-            updated[loc] = {
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        for child_url in urls:
+            executor.submit(produce, child_url)
+        remaining = len(urls)
+        while remaining:
+            item = entries.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def iter_sitemap_entries(url: str, workers: int = SITEMAP_FETCH_WORKERS):
+    """
+    Lazily yields (loc, lastmod, image_urls) for every entry of a sitemap,
+    decompressing and parsing while downloading. Sitemap index files are
+    followed and their child sitemaps are fetched concurrently.
+    """
+    child_sitemaps = []
+    yield from _iter_single_sitemap(url, child_sitemaps)
+    if child_sitemaps:
+        logger.info(f"Sitemap index with {len(child_sitemaps)} child sitemaps found.")
+        yield from _iter_child_sitemaps(child_sitemaps, workers)
+
+class SitemapDelta:
+    """
+    Conditional, cached sitemap fetch that yields only the entries whose
+    (loc, lastmod) pair was not seen in the last committed run.
+
+    Each sitemap file is kept on disk under `cache_dir` with its ETag and
+    Last-Modified headers and a compact digest: a sorted array of 64-bit
+    hashes of its (loc, lastmod) pairs. Nothing is promoted until commit()
+    is called, so a failed run is retried in full on the next call; locs
+    passed to commit(exclude=...) stay "changed" for the next run too, and
+    a file that answers 304 while it still has such entries is re-read
+    from the cached body instead of being skipped.
+
+        delta = SitemapDelta(SITEMAP_URL)
+        if delta.fetch():
+            for loc, lastmod, image_urls in delta: ...
+            delta.commit(exclude=failed_locs)
+    """
+
+    def __init__(self, url: str, cache_dir: str = SITEMAP_CACHE_DIR, workers: int = SITEMAP_FETCH_WORKERS):
+        self.url = url
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.changed_count = 0
+        self.unchanged_count = 0
+        # loc -> entry hash of every changed entry, for commit(exclude=...).
+        self._changed = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._root = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url: str) -> dict:
+        key = hashlib.sha1(url.encode()).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, key)
+        return {"body": f"{base}.body", "meta": f"{base}.json", "digest": f"{base}.digest"}
+
+    @staticmethod
+    def _entry_hash(loc: str, lastmod: str) -> int:
+        digest = hashlib.blake2b(f"{loc}\x00{lastmod}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _load_digest(self, path: str) -> set:
+        digest = array("Q")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.frombytes(f.read())
+        return set(digest)
+
+    def _conditional_open(self, url: str):
+        paths = self._paths(url)
+        meta = load_previous_data(paths["meta"]) if os.path.exists(paths["body"]) else {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        sink = open(f"{paths['body']}.part", "wb")
+        try:
+            response, stream = _open_sitemap_stream(url, headers=headers, sink=sink)
+        except Exception:
+            sink.close()
+            raise
+        if stream is not None:
+            validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            return response, stream, sink, validators
+        if not meta.get("excluded"):
+            sink.close()
+            os.remove(sink.name)
+            logger.info(f"Sitemap not modified: {url}")
+            return None
+        # Unchanged, but the last commit left entries out of the digest:
+        # replay the cached copy so they are yielded again.
+        logger.info(f"Sitemap not modified, re-reading the cached copy for {meta['excluded']} excluded entries: {url}")
+        body = open(paths["body"], "rb")
+        validators = {"etag": meta.get("etag"), "last_modified": meta.get("last_modified")}
+        return body, _decompressing_stream(_TeeReader(body, sink)), sink, validators
+
+    def fetch(self) -> bool:
+        """
+        Sends the conditional request for the top-level sitemap. Returns
+        False on 304, in which case there is nothing to iterate.
+        """
+        self._root = self._conditional_open(self.url)
+        return self._root is not None
+
+    def _iter_file(self, url: str, opened=None, child_sitemaps: list = None):
+        opened = opened or self._conditional_open(url)
+        if opened is None:
+            return
+        source, stream, sink, validators = opened
+        paths = self._paths(url)
+        previous = self._load_digest(paths["digest"])
+        current = array("Q")
+        try:
+            for kind, item in _iterparse_sitemap(stream):
+                if kind == "sitemap":
+                    if child_sitemaps is not None:
+                        child_sitemaps.append(item)
+                    else:
+                        yield from self._iter_file(item)
+                    continue
+                loc, lastmod, _ = item
+                entry_hash = self._entry_hash(loc, lastmod)
+                current.append(entry_hash)
+                if entry_hash in previous:
+                    with self._lock:
+                        self.unchanged_count += 1
+                    continue
+                with self._lock:
+                    self.changed_count += 1
+                    self._changed[loc] = entry_hash
+                yield item
+            # Drain whatever the parser did not need so the cached copy is complete.
+            while stream.read(64 * 1024):
+                pass
+        finally:
+            source.close()
+            sink.close()
+
+        current = array("Q", sorted(current))
+        with self._lock:
+            self._pending[url] = {"digest": current, "meta": {"url": url, **validators}}
+
+    def __iter__(self):
+        if self._root is None and not self.fetch():
+            return
+        root, self._root = self._root, None
+        child_sitemaps = []
+        yield from self._iter_file(self.url, opened=root, child_sitemaps=child_sitemaps)
+        if child_sitemaps:
+            logger.info(f"Sitemap index with {len(child_sitemaps)} child sitemaps found.")
+            yield from _iter_child_sitemaps(child_sitemaps, self.workers, iter_child=self._iter_file)
+        logger.info(f"Sitemap delta: {self.changed_count} changed, {self.unchanged_count} unchanged entries.")
+
+    def commit(self, exclude=()):
+        """
+        Promotes the downloaded files, headers and digests of this run. The
+        changed entries of the locs in `exclude` (pages that failed, were
+        invalid or could not be written) are left out of the digests, so the
+        next run sees them as changed again.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            changed, self._changed = self._changed, {}
+        dropped = {changed[loc] for loc in exclude if loc in changed}
+        for url, state in pending.items():
+            paths = self._paths(url)
+            digest = state["digest"]
+            if dropped:
+                digest = array("Q", (entry_hash for entry_hash in digest if entry_hash not in dropped))
+            os.replace(f"{paths['body']}.part", paths["body"])
+            with open(f"{paths['digest']}.part", "wb") as f:
+                digest.tofile(f)
+            os.replace(f"{paths['digest']}.part", paths["digest"])
+            save_data(paths["meta"], {**state["meta"], "excluded": len(state["digest"]) - len(digest)})
+        logger.info(f"Sitemap cache committed for {len(pending)} file(s), {len(dropped)} failed entries left out.")
+
+def iter_updated_entries(source, previous_index: dict):
+    """
+    Lazily yields (loc, data) for entries whose lastmod differs from
+    `previous_index`, which maps links to their stored lastmod as returned
+    by normalize_timestamp (see db_methods.load_lastmod_index). `source` is
+    either a parsed sitemap root or an iterable of (loc, lastmod, image_urls)
+    entries such as iter_sitemap_entries().
+    """
+    entries = iter_tree_entries(source) if isinstance(source, ET.Element) else source
+    for loc, lastmod, image_urls in entries:
+        if previous_index.get(loc) != normalize_timestamp(lastmod):
+            logger.debug("Updated entry found: %s", loc)
+            yield loc, {
                 "availability_updated_at": lastmod,
                 "image_count": len(image_urls),
                 "photo_url": image_urls[0] if image_urls else None,
                 "photo_urls": image_urls
             }
+
+def get_updated_entries(source, previous_index: dict) -> dict:
+    logger.info("Scanning sitemap for updates...")
+    updated = dict(iter_updated_entries(source, previous_index))
     logger.info(f"Total updated entries: {len(updated)}")
     return updated
 
@@ -1,5 +1,6 @@
 import re
 import logging
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +12,13 @@ def extract_prices(price_text: str) -> list:
     if match:
         price_low = float(match.group(1))
         price_high = float(match.group(2))
-        logger.debug(f"Price range extracted: low={price_low}, high={price_high}")
+        logger.debug("Price range extracted: low=%s, high=%s", price_low, price_high)
         return [price_low, price_high]
 
     match = re.search(single_price_pattern, price_text)
     if match:
         price = float(match.group(1))
-        logger.debug(f"Single price extracted: {price}")
+        logger.debug("Single price extracted: %s", price)
         return [price, price]
 
     logger.warning(f"No price found in text: {price_text}")
@@ -32,12 +33,50 @@ def get_nearest_city(text: str) -> tuple:
         min_ = int(min_) if min_ else 0
         total_minutes = hr * 60 + min_
         city_distance_with_minutes.append((city.strip(), total_minutes))
-        logger.debug(f"Parsed city: {city.strip()}, travel time: {total_minutes} min")
+        logger.debug("Parsed city: %s, travel time: %s min", city.strip(), total_minutes)
 
     if city_distance_with_minutes:
         nearest_city = min(city_distance_with_minutes, key=lambda x: x[1])
-        logger.info(f"Nearest city identified: {nearest_city[0]} ({nearest_city[1]} min)")
+        logger.debug("Nearest city identified: %s (%s min)", nearest_city[0], nearest_city[1])
         return nearest_city[0], nearest_city[1]
 
     logger.warning("No nearest city found.")
     return "Bilinmiyor", None
+
+
+def administrative_area_from_address(address: str) -> str:
+    # "<label>\n<area>, <state>" -> "<area>"; shared by the Selenium and
+    # HTTP extractors so both store the same value.
+    return address.split(',')[0].split('\n')[-1].strip() if address else ""
+
+
+def campground_type_label(value: str) -> str:
+    # "rv-park" -> "Rv Park": the visible label's shape, for pages where
+    # only the __NEXT_DATA__ slug is available.
+    return " ".join(word.capitalize() for word in re.split(r"[-_\s]+", value or "") if word)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    # The campgrounds table stores TIMESTAMP without time zone, always in UTC.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def normalize_timestamp(value) -> int:
+    """
+    Turns a sitemap lastmod string or a DB datetime into UTC epoch seconds
+    so both sides of the change check compare equal when they should.
+    Naive values are taken as UTC. Returns None for empty or bad input.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            logger.warning(f"Unparseable timestamp: {value}")
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
@@ -1,107 +1,225 @@
-from flask import Flask, jsonify
-from pydantic import ValidationError
-from src.Scraper.sitemap_handler import download_and_parse_sitemap, get_updated_entries
-from src.Scraper.scraper import update_names_for_urls
-from src.models.campground import Campground, CampgroundLinks
-from src.db.db_methods import insert_campground, load_previous_urls_from_db
-import uuid, logging
-from typing import Dict
-from pydantic import HttpUrl
+import itertools
+from flask import Flask, Response, jsonify, request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from psycopg2.pool import PoolError
+from src.Scraper.pipeline import run_scrape
+from src.db.db_methods import pool_metrics
+from src.db.campground_queries import search_campgrounds, nearby_campgrounds, get_campground, iter_campground_batches
+from src.db.change_history import campground_history, recent_price_changes
+from src.db.scrape_queue import queue_stats
+from src.Scraper.http_client import get_client
+from src.Scraper.queue_worker import SCRAPE_JOB_MODE, enqueue_updated_entries
+from src.Scraper.refresh_scheduler import refresh_scheduler
+from src.api.jobs import JobManager
+from src.api.cache import cached_response, response_cache
+from src.api import export
+import logging
 
 app = Flask(__name__)
 
 logger = logging.getLogger(__name__)
 
-SITEMAP_URL = "https://thedyrt.com/sitemaps/campgrounds.xml.gz"
+# In queue mode a scrape job only enqueues the changed campgrounds; worker.py
+# processes scrape them.
+job_manager = JobManager(enqueue_updated_entries if SCRAPE_JOB_MODE == "queue" else run_scrape)
+# Local refresh scrapes go through the same single-job manager.
+refresh_scheduler.jobs = job_manager
+
+def _submit_scrape_job():
+    job, created = job_manager.submit()
+    body = {"job_id": job.id, "status": job.status, "deduplicated": not created}
+    return jsonify(body), 202 if created else 200
+
+@app.route("/scrape-jobs", methods=["POST"])
+def create_scrape_job():
+    return _submit_scrape_job()
+
+@app.route("/scrape-jobs/<job_id>", methods=["GET"])
+def get_scrape_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/scrape-jobs/<job_id>/cancel", methods=["POST"])
+def cancel_scrape_job(job_id):
+    job, requested = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    if not requested:
+        return jsonify({"error": f"Job already {job.status}.", "job_id": job.id, "status": job.status}), 409
+    return jsonify({"job_id": job.id, "status": job.status, "cancel_requested": True}), 202
 
 @app.route("/updated-campgrounds", methods=["GET"])
 def get_updated_campgrounds():
+    # Kept for existing callers; the scrape now runs as a background job.
+    logger.info("Scrape triggered through /updated-campgrounds.")
+    return _submit_scrape_job()
+
+
+def _float_arg(name, required=False):
+    value = request.args.get(name)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"'{name}' is required.")
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number.")
+
+def _bool_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(f"'{name}' must be true or false.")
+
+def _int_arg(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    if not value.isdigit():
+        raise ValueError(f"'{name}' must be a non-negative integer.")
+    return int(value)
+
+def _bbox_arg():
+    value = request.args.get("bbox")
+    if not value:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("'bbox' must be west,south,east,north.")
+    # west > east is a box crossing the antimeridian.
+    if south > north:
+        raise ValueError("'bbox' must be west,south,east,north with south <= north.")
+    return west, south, east, north
+
+def _filter_args():
+    return {
+        "bookable": _bool_arg("bookable"),
+        "min_price": _float_arg("min_price"),
+        "max_price": _float_arg("max_price"),
+        "min_rating": _float_arg("min_rating"),
+    }
+
+@app.route("/campgrounds", methods=["GET"])
+@cached_response
+def list_campgrounds():
+    try:
+        rows = search_campgrounds(
+            bbox=_bbox_arg(), limit=_int_arg("limit", 100), offset=_int_arg("offset", 0), **_filter_args()
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"count": len(rows), "campgrounds": rows})
+
+@app.route("/campgrounds/near", methods=["GET"])
+@cached_response
+def list_nearby_campgrounds():
+    try:
+        lat, lon = _float_arg("lat", required=True), _float_arg("lon", required=True)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("'lat'/'lon' out of range.")
+        rows = nearby_campgrounds(
+            lat, lon, radius_km=_float_arg("radius"), limit=_int_arg("limit", 20), **_filter_args()
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"count": len(rows), "campgrounds": rows})
+
+@app.route("/campgrounds/export", methods=["GET"])
+def export_campgrounds():
+    # Streamed straight from a server-side cursor, so never cached.
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in export.EXPORT_FORMATS:
+        return jsonify({"error": f"'format' must be one of {', '.join(export.EXPORT_FORMATS)}."}), 400
+    if fmt == "parquet" and export.pa is None:
+        return jsonify({"error": "Parquet export is not available: pyarrow is not installed."}), 501
     try:
-        logger.info("Starting to fetch updated campgrounds.")
-        
-        previous_data = load_previous_urls_from_db()
-        logger.debug(f"Loaded {len(previous_data)} previous campground entries from DB.")
-
-        root = download_and_parse_sitemap(SITEMAP_URL)
-        updated_data = get_updated_entries(root, previous_data)
-        logger.debug(f"Found {len(updated_data)} updated entries in sitemap.")
-
-        updated_data_with_names = update_names_for_urls(updated_data)
-        logger.info("Updated campground names fetched.")
-
-        formatted_data = {}
-        for url, campground_data in updated_data_with_names.items():
-            try:
-                corrected_data = {
-                    "id": str(uuid.uuid4()),
-                    "type": campground_data.get('type'),
-                    "links": CampgroundLinks(self=campground_data.get('links')),
-                    "name": campground_data.get('name'),
-                    "latitude": campground_data.get('latitude'),
-                    "longitude": campground_data.get('longitude'),
-                    "region-name": campground_data.get('region-name', 'Unknown'),
-                    "administrative_area": campground_data.get('administrative-area'),
-                    "nearest_city_name": campground_data.get('nearest-city-name'),
-                    "accommodation_type_names": campground_data.get('accommodation-type-names', []),
-                    "bookable": campground_data.get('bookable', False),
-                    "camper_types": campground_data.get('camper-types', []),
-                    "operator": campground_data.get('operator'),
-                    "photo_url": campground_data.get('photo-url'),
-                    "photo_urls": campground_data.get('photo-urls', []),
-                    "photos_count": campground_data.get('photos-count', 0),
-                    "rating": campground_data.get('rating'),
-                    "reviews_count": campground_data.get('reviews-count', 0),
-                    "slug": campground_data.get('slug'),
-                    "price_low": campground_data.get('price-low'),
-                    "price_high": campground_data.get('price-high'),
-                    "availability_updated_at": campground_data.get('availability-updated-at'),
-                }
-
-                campground = Campground(**corrected_data)
-
-                db_data = {
-                    "id": campground.id,
-                    "type": campground.type,
-                    "links": campground.links.self,
-                    "name": campground.name,
-                    "latitude": campground.latitude,
-                    "longitude": campground.longitude,
-                    "region_name": campground.region_name,
-                    "administrative_area": campground.administrative_area,
-                    "nearest_city_name": campground.nearest_city_name,
-                    "accommodation_type_names": campground.accommodation_type_names,
-                    "bookable": campground.bookable,
-                    "camper_types": campground.camper_types,
-                    "operator": campground.operator,
-                    "photo_url": str(campground.photo_url) if campground.photo_url else None,
-                    "photo_urls": [str(u) for u in campground.photo_urls],
-                    "photos_count": campground.photos_count,
-                    "rating": campground.rating,
-                    "reviews_count": campground.reviews_count,
-                    "slug": campground.slug,
-                    "price_low": campground.price_low,
-                    "price_high": campground.price_high,
-                    "availability_updated_at": campground.availability_updated_at,
-                }
-
-                try:
-                    insert_campground(db_data)
-                    logger.info(f"Inserted campground into DB: {campground.name}")
-                except Exception as db_err:
-                    logger.error(f"DB insert error for {campground.name}: {db_err}")
-
-                formatted_data[f"links: {url}"] = {
-                    key: str(value) if isinstance(value, HttpUrl) else value 
-                    for key, value in campground.dict().items()
-                }
-
-            except ValidationError as e:
-                logger.warning(f"Validation error for URL {url}: {e}")
-                continue
-
-        logger.info("All updated campgrounds processed successfully.")
-        return jsonify({"status": 200})
-
-    except Exception as e:
-        logger.exception("An error occurred in get_updated_campgrounds.")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        bbox, filters = _bbox_arg(), _filter_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    mimetype, extension = export.EXPORT_FORMATS[fmt]
+    batches = iter_campground_batches(bbox=bbox, **filters)
+    # Run the query before the 200 goes out, so a busy or failing database
+    # is still reported with a status code.
+    try:
+        first = next(batches, [])
+    except PoolError as e:
+        return jsonify({"error": str(e)}), 503
+    records = export.iter_export_records(itertools.chain([first], batches))
+    response = Response(export.SERIALIZERS[fmt](records), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=campgrounds.{extension}"
+    # Keeps reverse proxies from buffering the whole body.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/campgrounds/history", methods=["GET"])
+@cached_response
+def get_campground_history():
+    slug = request.args.get("slug")
+    if not slug:
+        return jsonify({"error": "'slug' is required."}), 400
+    fields = [field for field in request.args.get("fields", "").split(",") if field]
+    try:
+        rows = campground_history(slug, fields=fields, limit=_int_arg("limit", 100))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"count": len(rows), "changes": rows})
+
+@app.route("/campgrounds/price-changes", methods=["GET"])
+@cached_response
+def list_price_changes():
+    try:
+        days = _float_arg("days")
+        if days is not None and days <= 0:
+            raise ValueError("'days' must be positive.")
+        rows = recent_price_changes(days=days or 7, limit=_int_arg("limit", 100))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"count": len(rows), "changes": rows})
+
+@app.route("/campgrounds/<uuid:campground_id>", methods=["GET"])
+@cached_response
+def get_campground_detail(campground_id):
+    row = get_campground(str(campground_id))
+    if row is None:
+        return jsonify({"error": "Campground not found."}), 404
+    return jsonify(row)
+
+@app.route("/cache-stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@app.route("/db-pool-stats", methods=["GET"])
+def get_db_pool_stats():
+    return jsonify(pool_metrics())
+
+
+@app.route("/http-client-stats", methods=["GET"])
+def get_http_client_stats():
+    return jsonify(get_client().stats())
+
+
+@app.route("/scrape-queue", methods=["GET"])
+def get_scrape_queue_stats():
+    return jsonify(queue_stats())
+
+
+@app.route("/refresh-plans", methods=["GET"])
+def get_refresh_plans():
+    # Planning stats of the recent refresh cycles, newest first.
+    return jsonify(refresh_scheduler.plans())
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    # Prometheus text format: per-stage timings, page and failure counters,
+    # per-page latency histograms and the outbound client's counters.
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response
+from src.db.db_methods import dataset_version
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Entries also expire after this many seconds, as a safety net for changes
+# that do not go through the batch writer (manual SQL, restores).
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+
+
+class CacheEntry:
+    __slots__ = ("body", "mimetype", "etag", "expires_at", "size")
+
+    def __init__(self, body, mimetype, etag, expires_at):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.expires_at = expires_at
+        self.size = len(body)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of serialized response bodies, bounded by entry count
+    and total body bytes, with a TTL. Keys carry the dataset version, so a
+    committed write makes every older entry unreachable; those are evicted
+    by LRU order rather than scanned for.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype, version):
+        etag = f"{version}-{hashlib.blake2b(body, digest_size=12).hexdigest()}"
+        entry = CacheEntry(body, mimetype, etag, time.monotonic() + self.ttl)
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(view):
+    """
+    Serves successful responses of a read-only view from response_cache,
+    keyed on (dataset version, path, query args), with a strong ETag so
+    clients can revalidate with If-None-Match and get a 304.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = dataset_version()
+        key = (version, request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(key)
+        status = "HIT"
+        if entry is None:
+            status = "MISS"
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.put(key, response.get_data(), response.mimetype, version)
+
+        response = make_response(entry.body)
+        response.mimetype = entry.mimetype
+        response.set_etag(entry.etag)
+        # Clients may keep the body but must revalidate before reusing it.
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Cache"] = status
+        return response.make_conditional(request)
+
+    return wrapper
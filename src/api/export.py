@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Iterable, Iterator, List
+from pydantic import ValidationError
+from src.models.campground import Campground
+from src.db.db_methods import CAMPGROUND_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet export is optional
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ["id"] + CAMPGROUND_COLUMNS
+LIST_COLUMNS = {"accommodation_type_names", "camper_types", "photo_urls"}
+# Rows per parquet row group; a group is buffered until it is written.
+PARQUET_ROW_GROUP_SIZE = 10000
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _row_to_model_input(row: dict) -> dict:
+    # The model only accepts its aliases (see pipeline.build_db_record).
+    return {
+        "id": str(row["id"]),
+        "type": row["type"],
+        "links": {"self": row["links"]},
+        "name": row["name"],
+        "latitude": row["latitude"],
+        "longitude": row["longitude"],
+        "region-name": row["region_name"],
+        "administrative-area": row["administrative_area"],
+        "nearest-city-name": row["nearest_city_name"],
+        "accommodation-type-names": row["accommodation_type_names"] or [],
+        "bookable": bool(row["bookable"]),
+        "camper-types": row["camper_types"] or [],
+        "operator": row["operator"],
+        "photo-url": row["photo_url"],
+        "photo-urls": row["photo_urls"] or [],
+        "photos-count": row["photos_count"] or 0,
+        "rating": row["rating"],
+        "reviews-count": row["reviews_count"] or 0,
+        "slug": row["slug"],
+        "price-low": row["price_low"],
+        "price-high": row["price_high"],
+        "availability-updated-at": row["availability_updated_at"],
+    }
+
+
+def export_record(campground: Campground) -> dict:
+    """
+    Flat, snake_case export row in EXPORT_COLUMNS order: links is the URL
+    string, URLs are plain strings and datetimes are left to the serializer.
+    """
+    record = campground.model_dump()
+    record["links"] = str(campground.links.self)
+    record["photo_url"] = str(campground.photo_url) if campground.photo_url else None
+    record["photo_urls"] = [str(url) for url in campground.photo_urls]
+    return {column: record[column] for column in EXPORT_COLUMNS}
+
+
+def iter_export_records(batches: Iterable[List[dict]]) -> Iterator[List[dict]]:
+    """
+    Validates every DB row through the Campground model, batch by batch.
+    Rows the model rejects are logged and skipped so one bad row does not
+    cut a long export short.
+    """
+    for rows in batches:
+        records = []
+        for row in rows:
+            try:
+                records.append(export_record(Campground.model_validate(_row_to_model_input(row))))
+            except ValidationError as e:
+                logger.warning(f"Export skipped campground {row.get('id')}: {e.error_count()} validation errors.")
+        yield records
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[str]:
+    for records in batches:
+        if records:
+            yield "".join(json.dumps(record, default=_json_default) + "\n" for record in records)
+
+
+def csv_chunks(batches: Iterable[List[dict]]) -> Iterator[str]:
+    # List columns are written as JSON arrays, timestamps as ISO 8601.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for records in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for record in records:
+            writer.writerow([
+                json.dumps(record[column]) if column in LIST_COLUMNS
+                else record[column].isoformat() if isinstance(record[column], datetime)
+                else record[column]
+                for column in EXPORT_COLUMNS
+            ])
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that keeps what pyarrow writes until drain().
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def parquet_schema():
+    string_list = pa.list_(pa.string())
+    return pa.schema([
+        ("id", pa.string()), ("type", pa.string()), ("links", pa.string()), ("name", pa.string()),
+        ("latitude", pa.float64()), ("longitude", pa.float64()), ("region_name", pa.string()),
+        ("administrative_area", pa.string()), ("nearest_city_name", pa.string()),
+        ("accommodation_type_names", string_list), ("bookable", pa.bool_()), ("camper_types", string_list),
+        ("operator", pa.string()), ("photo_url", pa.string()), ("photo_urls", string_list),
+        ("photos_count", pa.int64()), ("rating", pa.float64()), ("reviews_count", pa.int64()),
+        ("slug", pa.string()), ("price_low", pa.float64()), ("price_high", pa.float64()),
+        ("availability_updated_at", pa.timestamp("us")),
+    ])
+
+
+def parquet_chunks(batches: Iterable[List[dict]], row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """
+    Writes one row group per `row_group_size` records and yields the bytes
+    as soon as each group is written; the footer comes with the last chunk.
+    """
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    pending = []
+
+    def write_group():
+        writer.write_table(pa.Table.from_pylist(pending, schema=schema))
+        pending.clear()
+        return sink.drain()
+
+    try:
+        for records in batches:
+            pending.extend(records)
+            if len(pending) >= row_group_size:
+                yield write_group()
+        if pending:
+            yield write_group()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+SERIALIZERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "parquet": parquet_chunks}
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.Scraper.progress import ScrapeProgress
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+# Finished jobs kept around for GET /scrape-jobs/<id>.
+MAX_FINISHED_JOBS = 50
+
+
+class ScrapeJob:
+    def __init__(self, runner, kind="scrape"):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.runner = runner
+        self.status = "queued"
+        self.progress = ScrapeProgress()
+        self.created_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress.snapshot(now=self.finished_at),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs scrape jobs on a single background thread. Only one job is active
+    at a time: submitting while a job is queued or running returns that job
+    instead of starting a second full scrape. The refresh scheduler submits
+    its scrapes here too (with its own runner), so a refresh never runs next
+    to a full scrape.
+    """
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.jobs = {}
+        self._active = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-job")
+
+    def submit(self, runner=None, kind="scrape"):
+        """
+        Returns (job, created). `runner` (called with the job's progress)
+        defaults to the manager's own.
+        """
+        with self._lock:
+            if self._active is not None and not self._active.finished:
+                return self._active, False
+            job = ScrapeJob(runner or self.runner, kind)
+            self.jobs[job.id] = job
+            self._active = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        logger.info(f"Scrape job {job.id} ({kind}) queued.")
+        return job, True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Returns (job, requested); requested is False when the job had
+        already finished, and job is None when there is no such job.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return job, False
+            job.progress.cancel()
+        logger.info(f"Cancel requested for scrape job {job_id}.")
+        return job, True
+
+    def _run(self, job):
+        with self._lock:
+            if job.progress.cancelled:
+                self._finish(job, "cancelled")
+                return
+            job.status = "running"
+            job.progress.started_at = time.time()
+        try:
+            result = job.runner(job.progress)
+            with self._lock:
+                job.result = result
+                self._finish(job, "cancelled" if job.progress.cancelled else "succeeded")
+        except Exception as e:
+            logger.exception(f"Scrape job {job.id} failed.")
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, "failed")
+
+    def _finish(self, job, status):
+        # Callers hold self._lock, so cancel() never sees a job between its
+        # last check and its final status.
+        job.status = status
+        job.finished_at = time.time()
+        logger.info(f"Scrape job {job.id} {status}.")
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda j: j.created_at)[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job.id]
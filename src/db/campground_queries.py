@@ -0,0 +1,223 @@
+import math
+from typing import Iterator, List, Optional, Tuple
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from .db_methods import dedicated_connection, get_cursor, CAMPGROUND_COLUMNS
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_QUERY_LIMIT = 1000
+# The KNN scan orders by planar distance in degrees, which stretches
+# east-west distances by 1/cos(latitude); fetch this many times `limit`
+# candidates and re-rank them by great-circle distance. When the candidates
+# cannot be shown to hold the true nearest ones, the search is redone as a
+# radius search (see nearby_campgrounds).
+KNN_CANDIDATE_FACTOR = 4
+# Rows fetched per round trip by the export's server-side cursor.
+EXPORT_BATCH_SIZE = 2000
+
+LOCATION = sql.SQL("point(longitude, latitude)")
+SELECT_COLUMNS = sql.SQL(", ").join(map(sql.Identifier, ["id"] + CAMPGROUND_COLUMNS))
+HAVERSINE_KM = sql.SQL(
+    "2 * {radius} * asin(sqrt("
+    "power(sin(radians(latitude - %(lat)s) / 2), 2) + "
+    "cos(radians(%(lat)s)) * cos(radians(latitude)) * power(sin(radians(longitude - %(lon)s) / 2), 2)"
+    "))"
+).format(radius=sql.Literal(EARTH_RADIUS_KM))
+
+Bbox = Tuple[float, float, float, float]
+
+
+def _filters(bookable: Optional[bool], min_price: Optional[float], max_price: Optional[float],
+             min_rating: Optional[float]) -> Tuple[List[sql.Composable], dict]:
+    clauses, params = [], {}
+    if bookable is not None:
+        clauses.append(sql.SQL("bookable = %(bookable)s"))
+        params["bookable"] = bookable
+    if min_price is not None:
+        clauses.append(sql.SQL("price_high >= %(min_price)s"))
+        params["min_price"] = min_price
+    if max_price is not None:
+        clauses.append(sql.SQL("price_low <= %(max_price)s"))
+        params["max_price"] = max_price
+    if min_rating is not None:
+        clauses.append(sql.SQL("rating >= %(min_rating)s"))
+        params["min_rating"] = min_rating
+    return clauses, params
+
+
+def _where(clauses: List[sql.Composable]) -> sql.Composable:
+    if not clauses:
+        return sql.SQL("")
+    return sql.SQL("WHERE ") + sql.SQL(" AND ").join(clauses)
+
+
+def _add_bbox(clauses: List[sql.Composable], params: dict, bbox: Bbox) -> None:
+    # west > east means the box crosses the antimeridian; it is searched as
+    # two boxes, one on each side, which the GiST index serves as a BitmapOr.
+    west, south, east, north = bbox
+    boxes = [(west, south, east, north)] if west <= east else [(west, south, 180.0, north), (-180.0, south, east, north)]
+    parts = []
+    for index, box in enumerate(boxes):
+        names = [f"{side}{index}" for side in ("west", "south", "east", "north")]
+        parts.append(sql.SQL("{location} <@ box(point({}, {}), point({}, {}))").format(
+            *map(sql.Placeholder, names), location=LOCATION))
+        params.update(zip(names, box))
+    clauses.insert(0, sql.SQL("(") + sql.SQL(" OR ").join(parts) + sql.SQL(")"))
+
+
+def _radius_deltas(lat: float, radius_km: float) -> Optional[Tuple[float, float]]:
+    """
+    Half-height and half-width in degrees of the box around a circle of
+    `radius_km` centred at latitude `lat`, or None when the circle covers a
+    pole and so spans every longitude.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angle)
+    if abs(lat) + lat_delta >= 90.0:
+        return None
+    lon_delta = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(lat)))))
+    return lat_delta, lon_delta
+
+
+def _radius_bbox(lat: float, lon: float, radius_km: float) -> Bbox:
+    """
+    The box holding every point within `radius_km` of (lat, lon). Its west
+    edge is east of its east edge when it crosses the antimeridian.
+    """
+    deltas = _radius_deltas(lat, radius_km)
+    if deltas is None:
+        lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+        return -180.0, max(-90.0, lat - lat_delta), 180.0, min(90.0, lat + lat_delta)
+    lat_delta, lon_delta = deltas
+    if lon_delta >= 180.0:
+        return -180.0, lat - lat_delta, 180.0, lat + lat_delta
+    west, east = lon - lon_delta, lon + lon_delta
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return west, lat - lat_delta, east, lat + lat_delta
+
+
+def _knn_is_exact(lat: float, lon: float, kth_km: float, searched_deg: float) -> bool:
+    # Every campground left out of the KNN candidates is at least
+    # `searched_deg` away in planar degrees. If the whole circle of radius
+    # `kth_km` lies closer than that, no campground missed by the scan can be
+    # nearer than the k-th one found.
+    deltas = _radius_deltas(lat, kth_km)
+    if deltas is None:
+        return False
+    lat_delta, lon_delta = deltas
+    if abs(lon) + lon_delta > 180.0:
+        return False
+    return math.hypot(lat_delta, lon_delta) < searched_deg
+
+
+def search_campgrounds(bbox: Optional[Bbox] = None, bookable: Optional[bool] = None,
+                       min_price: Optional[float] = None, max_price: Optional[float] = None,
+                       min_rating: Optional[float] = None, limit: int = 100, offset: int = 0) -> List[dict]:
+    """
+    Campgrounds inside bbox (west, south, east, north) that match the
+    filters, ordered by id for stable paging.
+    """
+    clauses, params = _filters(bookable, min_price, max_price, min_rating)
+    if bbox is not None:
+        _add_bbox(clauses, params, bbox)
+    params.update(limit=min(limit, MAX_QUERY_LIMIT), offset=offset)
+    query = sql.SQL("SELECT {columns} FROM campgrounds {where} ORDER BY id LIMIT %(limit)s OFFSET %(offset)s").format(
+        columns=SELECT_COLUMNS, where=_where(clauses))
+    with get_cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def nearby_campgrounds(lat: float, lon: float, radius_km: Optional[float] = None,
+                       bookable: Optional[bool] = None, min_price: Optional[float] = None,
+                       max_price: Optional[float] = None, min_rating: Optional[float] = None,
+                       limit: int = 20) -> List[dict]:
+    """
+    Nearest campgrounds to (lat, lon), closest first, with distance_km.
+
+    With a radius the GiST index narrows the search to the radius' bounding
+    box (split at the antimeridian) and the haversine distance does the
+    exact cut. Without one, a KNN index scan (<->) returns the nearest
+    candidates, which are re-ranked by haversine distance; when the planar
+    scan may have missed a closer campground (high latitudes, near the
+    antimeridian or a pole), the query is redone as a radius search out to
+    the k-th distance found, so the result is always exact.
+    """
+    limit = min(limit, MAX_QUERY_LIMIT)
+    clauses, params = _filters(bookable, min_price, max_price, min_rating)
+    params.update(lat=lat, lon=lon, limit=limit)
+
+    if radius_km is not None:
+        _add_bbox(clauses, params, _radius_bbox(lat, lon, radius_km))
+        params["radius_km"] = radius_km
+        query = sql.SQL("""
+            SELECT * FROM (
+                SELECT {columns}, {distance} AS distance_km FROM campgrounds {where}
+            ) AS candidates
+            WHERE distance_km <= %(radius_km)s
+            ORDER BY distance_km LIMIT %(limit)s
+        """)
+    else:
+        params["candidates"] = limit * KNN_CANDIDATE_FACTOR
+        query = sql.SQL("""
+            SELECT *, max(planar_distance) OVER () AS searched_deg, count(*) OVER () AS candidate_count FROM (
+                SELECT {columns}, {distance} AS distance_km, {location} <-> point(%(lon)s, %(lat)s) AS planar_distance
+                FROM campgrounds {where}
+                ORDER BY planar_distance LIMIT %(candidates)s
+            ) AS candidates
+            ORDER BY distance_km LIMIT %(limit)s
+        """)
+
+    query = query.format(columns=SELECT_COLUMNS, distance=HAVERSINE_KM, where=_where(clauses), location=LOCATION)
+    with get_cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    if radius_km is not None or not rows:
+        return rows
+
+    searched_deg, candidate_count = rows[0]["searched_deg"], rows[0]["candidate_count"]
+    for row in rows:
+        del row["planar_distance"], row["searched_deg"], row["candidate_count"]
+    # Fewer candidates than asked for means every matching row was ranked.
+    if candidate_count < params["candidates"] or _knn_is_exact(lat, lon, rows[-1]["distance_km"], searched_deg):
+        return rows
+    return nearby_campgrounds(lat, lon, radius_km=rows[-1]["distance_km"], bookable=bookable, min_price=min_price,
+                              max_price=max_price, min_rating=min_rating, limit=limit)
+
+
+def get_campground(campground_id: str) -> Optional[dict]:
+    query = sql.SQL("SELECT {columns} FROM campgrounds WHERE id = %(id)s").format(columns=SELECT_COLUMNS)
+    with get_cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, {"id": campground_id})
+        return cur.fetchone()
+
+
+def iter_campground_batches(bbox: Optional[Bbox] = None, bookable: Optional[bool] = None,
+                            min_price: Optional[float] = None, max_price: Optional[float] = None,
+                            min_rating: Optional[float] = None,
+                            batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[dict]]:
+    """
+    Every matching campground, ordered by id, as lists of at most
+    `batch_size` rows read through a named (server-side) cursor, so memory
+    stays flat however large the table is. The cursor runs on a dedicated
+    connection (see dedicated_connection), held until the iterator is
+    exhausted or closed; PoolError is raised by the first next() when too
+    many exports are already running.
+    """
+    clauses, params = _filters(bookable, min_price, max_price, min_rating)
+    if bbox is not None:
+        _add_bbox(clauses, params, bbox)
+    query = sql.SQL("SELECT {columns} FROM campgrounds {where} ORDER BY id").format(
+        columns=SELECT_COLUMNS, where=_where(clauses))
+    with dedicated_connection() as conn:
+        with conn.cursor(name="campground_export", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
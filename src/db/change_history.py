@@ -0,0 +1,68 @@
+from typing import List, Optional
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from .db_methods import get_cursor, CHANGE_COLUMNS
+from .campground_queries import MAX_QUERY_LIMIT
+
+PRICE_COLUMNS = ["price_low", "price_high"]
+# Must stay identical to the campground_changes_price index predicate, or
+# the planner cannot use the partial index.
+PRICE_CHANGED = sql.SQL("ch.changes ?| array['price_low', 'price_high']")
+
+
+def _changed_fields(fields: Optional[List[str]]) -> sql.Composable:
+    unknown = set(fields or []) - set(CHANGE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    if not fields:
+        return sql.SQL("TRUE")
+    if sorted(fields) == sorted(PRICE_COLUMNS):
+        return PRICE_CHANGED
+    return sql.SQL("ch.changes ?| %(fields)s")
+
+
+def campground_history(slug: str, fields: Optional[List[str]] = None, limit: int = 100) -> List[dict]:
+    """
+    Changes of the campground(s) with `slug`, newest first. Each row has
+    the campground id, changed_at and the changed fields as
+    {"field": [old, new]}; `fields` keeps only rows (and keys) touching
+    those fields. A slug shared by several campgrounds returns all of them.
+    """
+    query = sql.SQL("""
+        SELECT ch.campground_id AS id, ch.changed_at, ch.changes
+        FROM campgrounds c
+        JOIN campground_changes ch ON ch.campground_id = c.id
+        WHERE c.slug = %(slug)s AND {changed}
+        ORDER BY ch.changed_at DESC
+        LIMIT %(limit)s
+    """).format(changed=_changed_fields(fields))
+    params = {"slug": slug, "fields": fields, "limit": min(max(limit, 1), MAX_QUERY_LIMIT)}
+    with get_cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    if fields:
+        for row in rows:
+            row["changes"] = {field: change for field, change in row["changes"].items() if field in fields}
+    return rows
+
+
+def recent_price_changes(days: float = 7, limit: int = 100) -> List[dict]:
+    """
+    Price changes of the last `days` days, newest first, with the
+    campground's current name and slug. Only the partitions covering the
+    window are scanned, through the campground_changes_price index.
+    """
+    query = sql.SQL("""
+        SELECT c.id, c.name, c.slug, ch.changed_at,
+               ch.changes -> 'price_low' AS price_low, ch.changes -> 'price_high' AS price_high
+        FROM campground_changes ch
+        JOIN campgrounds c ON c.id = ch.campground_id
+        WHERE ch.changed_at >= (now() AT TIME ZONE 'utc') - make_interval(secs => %(seconds)s)
+          AND {changed}
+        ORDER BY ch.changed_at DESC
+        LIMIT %(limit)s
+    """).format(changed=PRICE_CHANGED)
+    params = {"seconds": days * 86400, "limit": min(max(limit, 1), MAX_QUERY_LIMIT)}
+    with get_cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
@@ -1,30 +1,64 @@
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import parse_dsn
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from pydantic import HttpUrl
+from contextlib import contextmanager
+import hashlib
+import json
 import logging
 import os
-from typing import Dict
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+from src.Scraper.utils import normalize_timestamp
+from src.Scraper.metrics import DB_ROWS, record_failure, timed
 
 logger = logging.getLogger(__name__)
 
 
+DB_URL = os.getenv("DB_URL")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
+DB_NAME = os.getenv("DB_NAME") or (parse_dsn(DB_URL).get("dbname") if DB_URL else None)
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# psycopg2 pools close connections returned above minconn. One stays open
+# by default; raise this towards DB_POOL_MAX if reconnects show up under a
+# steady load.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections idle for longer than this are pinged with SELECT 1 on checkout.
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+# Connections opened outside the pool for long-held work (streamed exports),
+# so it cannot starve scrapes and API reads of pooled connections.
+DB_DEDICATED_MAX = int(os.getenv("DB_DEDICATED_MAX", "2"))
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "500"))
+# Bumps made by this process are seen immediately; bumps by other processes
+# (e.g. a separate scraper) are picked up within this many seconds.
+DATASET_VERSION_CHECK_INTERVAL = float(os.getenv("DATASET_VERSION_CHECK_INTERVAL", "1"))
 
+CAMPGROUND_COLUMNS = [
+    "type", "links", "name", "latitude", "longitude", "region_name", "administrative_area",
+    "nearest_city_name", "accommodation_type_names", "bookable", "camper_types", "operator",
+    "photo_url", "photo_urls", "photos_count", "rating", "reviews_count", "slug", "price_low",
+    "price_high", "availability_updated_at",
+]
+
+
+def _connection_params(dbname=None) -> dict:
+    # DB_URL (as set in docker-compose.yml) wins; DB_* variables override its parts.
+    params = parse_dsn(DB_URL) if DB_URL else {}
+    overrides = {"dbname": dbname or DB_NAME, "user": DB_USER, "password": DB_PASSWORD, "host": DB_HOST, "port": DB_PORT}
+    params.update({key: value for key, value in overrides.items() if value})
+    return params
 
 def create_connection():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
+        conn = psycopg2.connect(**_connection_params())
         logging.info("Veritabanına bağlantı başarılı.")
         return conn
     except Exception as e:
@@ -33,13 +67,7 @@ def create_connection():
 
 def create_database():
     try:
-        conn = psycopg2.connect(
-            dbname="postgres",
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
+        conn = psycopg2.connect(**_connection_params(dbname="postgres"))
         conn.autocommit = True
         cur = conn.cursor()
         create_db_query = sql.SQL("CREATE DATABASE {dbname};").format(
@@ -52,6 +80,147 @@ def create_database():
     except Exception as e:
         logging.warning(f"{DB_NAME} veritabanı oluşturulamadı (belki zaten var?): {e}")
 
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_dedicated_slots = threading.BoundedSemaphore(DB_DEDICATED_MAX)
+_last_used = {}
+_metrics = {
+    "checkouts": 0,
+    "checkout_timeouts": 0,
+    "checkout_wait_seconds": 0.0,
+    "max_checkout_wait_seconds": 0.0,
+    "health_check_failures": 0,
+    "in_use": 0,
+}
+
+def get_pool() -> ThreadedConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **_connection_params())
+                logging.info(f"Veritabanı bağlantı havuzu oluşturuldu ({DB_POOL_MIN}-{DB_POOL_MAX}).")
+    return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
+def _is_healthy(conn) -> bool:
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0.0) < DB_POOL_HEALTHCHECK_IDLE:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def _checkout(pool):
+    # After a database restart every idle connection may be dead, so keep
+    # discarding until a healthy or freshly opened one comes back.
+    for _ in range(DB_POOL_MAX):
+        conn = pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        with _pool_lock:
+            _metrics["health_check_failures"] += 1
+        logging.warning("Havuzdaki bozuk bağlantı kapatılıp yenisi açılıyor.")
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    return pool.getconn()
+
+@contextmanager
+def get_connection(timeout: float = DB_POOL_TIMEOUT):
+    """
+    Borrows a connection from the shared pool. The transaction is committed
+    when the block exits cleanly and rolled back otherwise. Blocks up to
+    `timeout` seconds when all DB_POOL_MAX connections are in use.
+    """
+    started = time.monotonic()
+    if not _pool_slots.acquire(timeout=timeout):
+        with _pool_lock:
+            _metrics["checkout_timeouts"] += 1
+        raise PoolError(f"No database connection available after {timeout} seconds.")
+    pool = None
+    conn = None
+    try:
+        pool = get_pool()
+        conn = _checkout(pool)
+        waited = time.monotonic() - started
+        with _pool_lock:
+            _metrics["checkouts"] += 1
+            _metrics["in_use"] += 1
+            _metrics["checkout_wait_seconds"] += waited
+            _metrics["max_checkout_wait_seconds"] = max(_metrics["max_checkout_wait_seconds"], waited)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+    finally:
+        if conn is not None:
+            with _pool_lock:
+                _metrics["in_use"] -= 1
+            _last_used[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=bool(conn.closed))
+        _pool_slots.release()
+
+@contextmanager
+def dedicated_connection():
+    """
+    A connection of its own, outside the pool, for work that holds it for
+    a long time. Raises PoolError at once when DB_DEDICATED_MAX are already
+    open. Committed on a clean exit and always closed.
+    """
+    if not _dedicated_slots.acquire(blocking=False):
+        raise PoolError(f"All {DB_DEDICATED_MAX} dedicated database connections are in use.")
+    try:
+        conn = psycopg2.connect(**_connection_params())
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+    finally:
+        _dedicated_slots.release()
+
+@contextmanager
+def get_cursor(cursor_factory=None, timeout: float = DB_POOL_TIMEOUT):
+    with get_connection(timeout) as conn:
+        cur = conn.cursor(cursor_factory=cursor_factory)
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+def pool_metrics() -> dict:
+    with _pool_lock:
+        metrics = dict(_metrics)
+        idle = len(_pool._pool) if _pool is not None else 0
+    checkouts = metrics["checkouts"]
+    metrics.update({
+        "min_size": DB_POOL_MIN,
+        "max_size": DB_POOL_MAX,
+        "idle": idle,
+        "avg_checkout_wait_seconds": metrics["checkout_wait_seconds"] / checkouts if checkouts else 0.0,
+    })
+    return metrics
+
 def create_table():
     create_table_query = """
     CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -79,68 +248,429 @@ def create_table():
         price_high DOUBLE PRECISION,
         availability_updated_at TIMESTAMP
     );
+    ALTER TABLE campgrounds ADD COLUMN IF NOT EXISTS content_hash VARCHAR;
+    DO $$
+    BEGIN
+        -- Older runs inserted a new row per scrape; keep the most recently
+        -- updated copy of each link (ctid only breaks ties) so the unique
+        -- index backing the upsert can be built.
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_indexes
+            WHERE schemaname = current_schema() AND indexname = 'campgrounds_links_key'
+        ) THEN
+            DELETE FROM campgrounds c USING (
+                SELECT ctid, row_number() OVER (
+                    PARTITION BY links ORDER BY availability_updated_at DESC NULLS LAST, ctid DESC
+                ) AS copy
+                FROM campgrounds
+            ) ranked
+            WHERE c.ctid = ranked.ctid AND ranked.copy > 1;
+            CREATE UNIQUE INDEX campgrounds_links_key ON campgrounds (links);
+        END IF;
+    END $$;
+    -- Built-in GiST support for points: serves bounding-box containment
+    -- (<@ box) and nearest-neighbour ordering (<->) without an extension.
+    CREATE INDEX IF NOT EXISTS campgrounds_location_gist
+        ON campgrounds USING gist (point(longitude, latitude));
+    CREATE TABLE IF NOT EXISTS dataset_version (
+        id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+    );
+    INSERT INTO dataset_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+    -- Per-campground inputs of the refresh scheduler: the latest sitemap
+    -- lastmod (and the sitemap data needed to scrape it) plus how often a
+    -- scrape found its price or availability changed.
+    CREATE TABLE IF NOT EXISTS campground_refresh_stats (
+        links VARCHAR PRIMARY KEY,
+        data JSONB,
+        lastmod TIMESTAMP,
+        volatile_hash VARCHAR,
+        first_scraped_at TIMESTAMP,
+        last_scraped_at TIMESTAMP,
+        scrape_count INTEGER NOT NULL DEFAULT 0,
+        change_count INTEGER NOT NULL DEFAULT 0
+    );
+    -- Field-level history: one row per campground update holding only the
+    -- fields that changed, as {"field": [old, new]}. Partitioned by month
+    -- so recent-change queries only touch the latest partitions.
+    CREATE TABLE IF NOT EXISTS campground_changes (
+        campground_id UUID NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        changes JSONB NOT NULL
+    ) PARTITION BY RANGE (changed_at);
+    CREATE INDEX IF NOT EXISTS campground_changes_campground
+        ON campground_changes (campground_id, changed_at);
+    CREATE INDEX IF NOT EXISTS campground_changes_price
+        ON campground_changes (changed_at) INCLUDE (campground_id)
+        WHERE changes ?| array['price_low', 'price_high'];
+    CREATE INDEX IF NOT EXISTS campgrounds_slug ON campgrounds (slug);
     """
-    conn = create_connection()
-    if conn:
-        cur = conn.cursor()
-        try:
+    try:
+        with get_cursor() as cur:
             cur.execute(create_table_query)
-            conn.commit()
-            logging.info("Campgrounds tablosu başarıyla oluşturuldu veya zaten mevcut.")
-        except Exception as e:
-            logging.error(f"Tablo oluşturulurken hata oluştu: {e}")
-        finally:
-            cur.close()
-            conn.close()
+            ensure_change_partitions(cur)
+        logging.info("Campgrounds tablosu başarıyla oluşturuldu veya zaten mevcut.")
+    except Exception as e:
+        logging.error(f"Tablo oluşturulurken hata oluştu: {e}")
 
-def insert_campground(data):
-    insert_query = """
-    INSERT INTO campgrounds (
-        type, links, name, latitude, longitude, region_name, administrative_area,
-        nearest_city_name, accommodation_type_names, bookable, camper_types, operator,
-        photo_url, photo_urls, photos_count, rating, reviews_count, slug, price_low, price_high, availability_updated_at
-    ) VALUES (
-        %(type)s, %(links)s, %(name)s, %(latitude)s, %(longitude)s, %(region_name)s, %(administrative_area)s,
-        %(nearest_city_name)s, %(accommodation_type_names)s, %(bookable)s, %(camper_types)s, %(operator)s,
-        %(photo_url)s, %(photo_urls)s, %(photos_count)s, %(rating)s, %(reviews_count)s, %(slug)s, %(price_low)s, %(price_high)s, %(availability_updated_at)s
-    );
-    """
+UPSERT_QUERY = sql.SQL("""
+    INSERT INTO campgrounds ({columns}, content_hash) VALUES %s
+    ON CONFLICT (links) DO UPDATE SET ({columns}, content_hash) = ({excluded}, EXCLUDED.content_hash)
+    WHERE campgrounds.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    RETURNING (xmax = 0) AS inserted
+""").format(
+    columns=sql.SQL(", ").join(map(sql.Identifier, CAMPGROUND_COLUMNS)),
+    excluded=sql.SQL(", ").join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(c)) for c in CAMPGROUND_COLUMNS),
+)
+
+def prepare_campground(data: dict) -> dict:
     if isinstance(data["links"], HttpUrl):
         data["links"] = str(data["links"])
     if isinstance(data["operator"], HttpUrl):
         data["operator"] = str(data["operator"])
     if isinstance(data["photo_urls"], list):
         data["photo_urls"] = [str(url) for url in data["photo_urls"]]
+    data["content_hash"] = content_hash(data)
+    return data
 
-    conn = create_connection()
-    if conn:
-        cur = conn.cursor()
+def content_hash(data: dict) -> str:
+    content = {column: data.get(column) for column in CAMPGROUND_COLUMNS}
+    encoded = json.dumps(content, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+def _campground_row(data: dict) -> tuple:
+    return tuple(data.get(column) for column in CAMPGROUND_COLUMNS) + (data["content_hash"],)
+
+def upsert_campgrounds(records: List[dict], conn=None) -> dict:
+    """
+    Writes prepared records with one INSERT ... ON CONFLICT (links) DO UPDATE.
+    Rows whose content_hash did not change are skipped by the WHERE clause.
+    Without `conn` a pooled connection is used and committed; with `conn`
+    the caller owns the transaction. Returns inserted/updated/unchanged counts.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement.
+    rows = list({data["links"]: _campground_row(data) for data in records}.values())
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return stats
+
+    if conn is None:
+        with get_connection() as conn:
+            return upsert_campgrounds(records, conn=conn)
+
+    with conn.cursor() as cur:
+        result = execute_values(cur, UPSERT_QUERY, rows, page_size=len(rows), fetch=True)
+
+    stats["inserted"] = sum(1 for (inserted,) in result if inserted)
+    stats["updated"] = len(result) - stats["inserted"]
+    stats["unchanged"] = len(rows) - len(result)
+    return stats
+
+# Fields map search results carry. For rows that already exist, a search
+# result only fills these (where it has a value); page-only fields such as
+# operator, photos and availability_updated_at are left alone.
+SEARCH_RESULT_COLUMNS = [
+    "name", "latitude", "longitude", "region_name", "administrative_area", "nearest_city_name",
+    "bookable", "rating", "reviews_count", "slug", "price_low", "price_high",
+]
+
+UPSERT_SEARCH_QUERY = sql.SQL("""
+    INSERT INTO campgrounds AS c ({columns}, content_hash) VALUES %s
+    ON CONFLICT (links) DO UPDATE SET ({search_columns}, content_hash) = ({merged}, NULL)
+    WHERE ({current}) IS DISTINCT FROM ({merged})
+    RETURNING (xmax = 0) AS inserted
+""").format(
+    columns=sql.SQL(", ").join(map(sql.Identifier, CAMPGROUND_COLUMNS)),
+    search_columns=sql.SQL(", ").join(map(sql.Identifier, SEARCH_RESULT_COLUMNS)),
+    current=sql.SQL(", ").join(sql.SQL("c.{}").format(sql.Identifier(c)) for c in SEARCH_RESULT_COLUMNS),
+    merged=sql.SQL(", ").join(
+        sql.SQL("coalesce(EXCLUDED.{0}, c.{0})").format(sql.Identifier(c)) for c in SEARCH_RESULT_COLUMNS
+    ),
+)
+
+def upsert_search_results(records: List[dict], conn) -> dict:
+    """
+    Like upsert_campgrounds, for partial rows from the map search: new
+    links are inserted whole, existing rows only get their search fields
+    merged in. A merged row's content_hash is cleared, so the next page
+    scrape rewrites it in full.
+    """
+    rows = list({data["links"]: _campground_row(data) for data in records}.values())
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return stats
+    with conn.cursor() as cur:
+        result = execute_values(cur, UPSERT_SEARCH_QUERY, rows, page_size=len(rows), fetch=True)
+    stats["inserted"] = sum(1 for (inserted,) in result if inserted)
+    stats["updated"] = len(result) - stats["inserted"]
+    stats["unchanged"] = len(rows) - len(result)
+    return stats
+
+# Fields whose changes drive the refresh scheduler's change-rate estimate.
+VOLATILE_COLUMNS = ["price_low", "price_high", "bookable", "availability_updated_at"]
+
+REFRESH_STATS_QUERY = """
+    INSERT INTO campground_refresh_stats AS s
+        (links, volatile_hash, first_scraped_at, last_scraped_at, scrape_count)
+    VALUES %s
+    ON CONFLICT (links) DO UPDATE SET
+        change_count = s.change_count
+            + (s.volatile_hash IS NOT NULL AND s.volatile_hash IS DISTINCT FROM EXCLUDED.volatile_hash)::int,
+        volatile_hash = EXCLUDED.volatile_hash,
+        first_scraped_at = coalesce(s.first_scraped_at, EXCLUDED.first_scraped_at),
+        last_scraped_at = EXCLUDED.last_scraped_at,
+        scrape_count = s.scrape_count + 1
+"""
+
+def volatile_hash(data: dict) -> str:
+    content = [data.get(column) for column in VOLATILE_COLUMNS]
+    encoded = json.dumps(content, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+def record_refresh_stats(records: List[dict], conn) -> None:
+    """
+    Counts one scrape for every record, and one change when its price or
+    availability differs from the previous scrape.
+    """
+    rows = list({data["links"]: (data["links"], volatile_hash(data)) for data in records}.values())
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        execute_values(
+            cur, REFRESH_STATS_QUERY, rows, page_size=len(rows),
+            template="(%s, %s, (now() AT TIME ZONE 'utc'), (now() AT TIME ZONE 'utc'), 1)",
+        )
+
+# Business fields kept in the change history. Photos and
+# availability_updated_at (a scrape timestamp that moves on almost every
+# rescrape) are left out to keep the history small.
+CHANGE_COLUMNS = [
+    "type", "name", "bookable", "accommodation_type_names", "camper_types", "operator",
+    "rating", "reviews_count", "price_low", "price_high", "slug",
+]
+
+PREVIOUS_VERSIONS_QUERY = sql.SQL("""
+    SELECT c.id, c.links, {columns} FROM campgrounds c
+    JOIN (VALUES %s) AS i (links, content_hash) ON c.links = i.links
+    WHERE c.content_hash IS DISTINCT FROM i.content_hash
+    FOR UPDATE OF c
+""").format(columns=sql.SQL(", ").join(sql.SQL("c.{}").format(sql.Identifier(c)) for c in CHANGE_COLUMNS))
+
+_change_partition_month = None
+_change_partition_lock = threading.Lock()
+
+def _month_start(year: int, month: int) -> str:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return f"{year:04d}-{month:02d}-01"
+
+def ensure_change_partitions(cur, months_ahead: int = 1) -> None:
+    """
+    Creates the campground_changes partitions of the current UTC month and
+    the next `months_ahead` months. The advisory lock keeps concurrent
+    writers from racing on the same CREATE.
+    """
+    global _change_partition_month
+    today = datetime.now(timezone.utc)
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('campground_changes_partitions'))")
+    for offset in range(months_ahead + 1):
+        month = today.month + offset
+        start = _month_start(today.year, month)
+        cur.execute(sql.SQL(
+            "CREATE TABLE IF NOT EXISTS {partition} PARTITION OF campground_changes "
+            "FOR VALUES FROM ({start}) TO ({end})"
+        ).format(
+            partition=sql.Identifier(f"campground_changes_{start[:7].replace('-', '_')}"),
+            start=sql.Literal(start), end=sql.Literal(_month_start(today.year, month + 1)),
+        ))
+    with _change_partition_lock:
+        _change_partition_month = (today.year, today.month)
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def record_changes(records: List[dict], conn) -> int:
+    """
+    Writes the changed CHANGE_COLUMNS of every record whose content_hash
+    differs from its stored row to campground_changes. Must run before the upsert,
+    in the same transaction: it reads (and locks) the versions the upsert
+    is about to overwrite. New campgrounds get no row; their history starts
+    with their first change. Returns the number of change rows written.
+    """
+    incoming = {data["links"]: data for data in records}
+    if not incoming:
+        return 0
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        previous = execute_values(
+            cur, PREVIOUS_VERSIONS_QUERY, [(links, data["content_hash"]) for links, data in incoming.items()],
+            page_size=len(incoming), fetch=True,
+        )
+    rows = []
+    for old in previous:
+        new = incoming[old["links"]]
+        changes = {
+            column: [old[column], new.get(column)] for column in CHANGE_COLUMNS if old[column] != new.get(column)
+        }
+        if changes:
+            rows.append((old["id"], json.dumps(changes, default=_json_value)))
+    if not rows:
+        return 0
+    with _change_partition_lock:
+        current = _change_partition_month
+    today = datetime.now(timezone.utc)
+    with conn.cursor() as cur:
+        if current != (today.year, today.month):
+            ensure_change_partitions(cur)
+        execute_values(cur, "INSERT INTO campground_changes (campground_id, changes) VALUES %s", rows,
+                       page_size=len(rows))
+    return len(rows)
+
+def insert_campground(data):
+    data = prepare_campground(data)
+    try:
+        upsert_campgrounds([data])
+        logging.info(f"{data.get('name', 'Bilinmeyen')} kamp alanı başarıyla eklendi.")
+    except Exception as e:
+        logging.error(f"Veri eklenirken hata oluştu: {e}")
+
+_dataset_version = None
+_dataset_version_checked = 0.0
+_dataset_version_lock = threading.Lock()
+
+def _remember_dataset_version(version: int):
+    global _dataset_version, _dataset_version_checked
+    with _dataset_version_lock:
+        _dataset_version = max(version, _dataset_version or 0)
+        _dataset_version_checked = time.monotonic()
+
+def bump_dataset_version() -> int:
+    """
+    Marks the campgrounds data as changed; read caches key on this version.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            "UPDATE dataset_version SET version = version + 1, updated_at = (now() AT TIME ZONE 'utc') "
+            "WHERE id = 1 RETURNING version"
+        )
+        version = cur.fetchone()[0]
+    _remember_dataset_version(version)
+    return version
+
+def dataset_version() -> int:
+    with _dataset_version_lock:
+        if _dataset_version is not None and time.monotonic() - _dataset_version_checked < DATASET_VERSION_CHECK_INTERVAL:
+            return _dataset_version
+    with get_cursor() as cur:
+        cur.execute("SELECT version FROM dataset_version WHERE id = 1")
+        row = cur.fetchone()
+    _remember_dataset_version(row[0] if row else 0)
+    return _dataset_version
+
+class CampgroundBatchWriter:
+    """
+    Buffers validated campground records and upserts them in batches of
+    `batch_size`, one pooled connection and transaction per batch.
+
+        with CampgroundBatchWriter() as writer:
+            writer.add(db_data)
+
+    With partial=True the records are map search results: they are merged
+    with upsert_search_results and do not count as scrapes in the change
+    history or refresh stats.
+    """
+
+    def __init__(self, batch_size: int = DB_BATCH_SIZE, on_flush=None, partial: bool = False):
+        self.batch_size = batch_size
+        self.partial = partial
+        # Optional callable(batch, error) run after every flush attempt.
+        self.on_flush = on_flush
+        self.buffer = []
+        self.stats = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+        self.elapsed = 0.0
+
+    def add(self, data: dict):
+        self.buffer.append(prepare_campground(data))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        started = time.perf_counter()
         try:
-            cur.execute(insert_query, data)
-            conn.commit()
-            logging.info(f"{data.get('name', 'Bilinmeyen')} kamp alanı başarıyla eklendi.")
+            with timed("db_write"), get_connection() as conn:
+                if self.partial:
+                    changed = 0
+                    batch_stats = upsert_search_results(batch, conn)
+                else:
+                    changed = record_changes(batch, conn)
+                    batch_stats = upsert_campgrounds(batch, conn=conn)
+                    record_refresh_stats(batch, conn)
         except Exception as e:
-            logging.error(f"Veri eklenirken hata oluştu: {e}")
+            self.stats["failed"] += len(batch)
+            record_failure("db_write", e)
+            DB_ROWS.labels("failed").inc(len(batch))
+            logging.error(f"{len(batch)} kayıtlık toplu yazma başarısız oldu: {e}")
+            if self.on_flush:
+                self.on_flush(batch, e)
+            return
         finally:
-            cur.close()
-            conn.close()
+            self.elapsed += time.perf_counter() - started
+        for key, value in batch_stats.items():
+            self.stats[key] += value
+            DB_ROWS.labels(key).inc(value)
+        logging.info(f"{len(batch)} kayıt yazıldı: {batch_stats}, {changed} değişiklik kaydı.")
+        if batch_stats["inserted"] or batch_stats["updated"]:
+            try:
+                bump_dataset_version()
+            except Exception as e:
+                logging.error(f"Veri seti sürümü artırılamadı: {e}")
+        if self.on_flush:
+            self.on_flush(batch, None)
+
+    def close(self):
+        self.flush()
+        written = sum(self.stats[key] for key in ("inserted", "updated", "unchanged"))
+        rate = written / self.elapsed if self.elapsed else 0.0
+        logging.info(f"Toplu yazma tamamlandı: {self.stats}, {rate:.0f} satır/sn.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 def load_previous_urls_from_db() -> Dict[str, dict]:
     query = "SELECT * FROM campgrounds"
-    conn = create_connection()
     result = {}
-    if conn:
-        cur = conn.cursor(cursor_factory=RealDictCursor) 
-        try:
+    try:
+        with get_cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(query)
             rows = cur.fetchall()
             for row in rows:
                 url = row["links"]
                 result[url] = row
-            logging.info(f"Veritabanından {len(result)} kayıt yüklendi.")
-        except Exception as e:
-            logging.error(f"Veriler yüklenirken hata oluştu: {e}")
-        finally:
-            cur.close()
-            conn.close()
+        logging.info(f"Veritabanından {len(result)} kayıt yüklendi.")
+    except Exception as e:
+        logging.error(f"Veriler yüklenirken hata oluştu: {e}")
+    return result
+
+def load_lastmod_index() -> Dict[str, int]:
+    """
+    Compact change-detection index: links -> availability_updated_at as UTC
+    epoch seconds, read with a two-column projection instead of full rows.
+    """
+    query = "SELECT links, availability_updated_at FROM campgrounds WHERE availability_updated_at IS NOT NULL"
+    result = {}
+    try:
+        with get_cursor() as cur:
+            cur.execute(query)
+            for links, availability_updated_at in cur:
+                result[links] = normalize_timestamp(availability_updated_at)
+        logging.info(f"Değişiklik indeksi için {len(result)} kayıt yüklendi.")
+    except Exception as e:
+        logging.error(f"Değişiklik indeksi yüklenirken hata oluştu: {e}")
     return result
@@ -0,0 +1,96 @@
+import json
+import logging
+from typing import Iterable, Iterator, Tuple
+from psycopg2.extras import execute_values
+from .db_methods import get_connection, get_cursor
+
+logger = logging.getLogger(__name__)
+
+REFRESH_STATS_BATCH_SIZE = 1000
+
+
+def seed_from_campgrounds() -> int:
+    """
+    Gives every stored campground without sitemap data in the stats table
+    (rows written before the scheduler existed, or by the map crawl) data
+    rebuilt from its campgrounds row, so the scheduler can plan it.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO campground_refresh_stats AS s (links, data, lastmod)
+            SELECT links,
+                   jsonb_build_object(
+                       'availability_updated_at', availability_updated_at,
+                       'image_count', photos_count,
+                       'photo_url', photo_url,
+                       'photo_urls', to_jsonb(photo_urls)
+                   ),
+                   availability_updated_at
+            FROM campgrounds
+            ON CONFLICT (links) DO UPDATE SET data = EXCLUDED.data, lastmod = coalesce(s.lastmod, EXCLUDED.lastmod)
+            WHERE s.data IS NULL
+            """
+        )
+        seeded = cur.rowcount
+    if seeded:
+        logging.info(f"Yenileme istatistiklerine {seeded} mevcut kayıt eklendi.")
+    return seeded
+
+
+def record_sitemap_entries(entries: Iterable[Tuple[str, dict, int]]) -> int:
+    """
+    Stores the newest lastmod (UTC epoch seconds) and sitemap data of every
+    (links, data, lastmod) entry. Returns the number of entries.
+    """
+    query = """
+        INSERT INTO campground_refresh_stats AS s (links, data, lastmod) VALUES %s
+        ON CONFLICT (links) DO UPDATE SET data = EXCLUDED.data, lastmod = EXCLUDED.lastmod
+    """
+    template = "(%s, %s, (to_timestamp(%s) AT TIME ZONE 'utc'))"
+    total = 0
+    batch = []
+
+    def write():
+        with get_cursor() as cur:
+            execute_values(cur, query, batch, template=template, page_size=REFRESH_STATS_BATCH_SIZE)
+        batch.clear()
+
+    for links, data, lastmod in entries:
+        batch.append((links, json.dumps(data), lastmod))
+        total += 1
+        if len(batch) >= REFRESH_STATS_BATCH_SIZE:
+            write()
+    if batch:
+        write()
+    return total
+
+
+def iter_refresh_candidates() -> Iterator[tuple]:
+    """
+    Streams (links, data, lastmod, first_scraped_at, last_scraped_at,
+    change_count) for every known campground, timestamps as UTC epoch
+    seconds or None.
+    """
+    with get_connection() as conn:
+        with conn.cursor(name="refresh_candidates") as cur:
+            cur.itersize = REFRESH_STATS_BATCH_SIZE
+            cur.execute(
+                """
+                SELECT links, data,
+                       extract(epoch FROM lastmod),
+                       extract(epoch FROM first_scraped_at),
+                       extract(epoch FROM last_scraped_at),
+                       change_count
+                FROM campground_refresh_stats
+                WHERE data IS NOT NULL
+                """
+            )
+            for links, data, lastmod, first_scraped, last_scraped, change_count in cur:
+                yield (
+                    links, data,
+                    float(lastmod) if lastmod is not None else None,
+                    float(first_scraped) if first_scraped is not None else None,
+                    float(last_scraped) if last_scraped is not None else None,
+                    change_count,
+                )
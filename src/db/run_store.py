@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterator, List, Tuple
+from psycopg2.extras import execute_values
+from .db_methods import get_cursor
+
+logger = logging.getLogger(__name__)
+
+# Statuses are journaled at least this often, which bounds the work a crash
+# can lose to a few seconds.
+RUN_JOURNAL_FLUSH_INTERVAL = float(os.getenv("RUN_JOURNAL_FLUSH_INTERVAL", "1"))
+RUN_JOURNAL_BATCH_SIZE = 500
+# Items that failed this many times are not retried on resume.
+RUN_ITEM_MAX_ATTEMPTS = int(os.getenv("RUN_ITEM_MAX_ATTEMPTS", "3"))
+# Runs (whatever their status) and their items are deleted this many days
+# after they finished, or started when they never finished.
+RUN_RETENTION_DAYS = int(os.getenv("RUN_RETENTION_DAYS", "7"))
+
+
+def create_run_tables():
+    create_query = """
+    CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+    CREATE TABLE IF NOT EXISTS scrape_runs (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        status VARCHAR NOT NULL DEFAULT 'running',
+        sitemap_complete BOOLEAN NOT NULL DEFAULT FALSE,
+        started_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        finished_at TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS scrape_run_items (
+        run_id UUID NOT NULL REFERENCES scrape_runs (id) ON DELETE CASCADE,
+        links VARCHAR NOT NULL,
+        data JSONB NOT NULL,
+        status VARCHAR NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        PRIMARY KEY (run_id, links)
+    );
+    CREATE INDEX IF NOT EXISTS scrape_run_items_unfinished
+        ON scrape_run_items (run_id) WHERE status <> 'done';
+    """
+    try:
+        with get_cursor() as cur:
+            cur.execute(create_query)
+        logging.info("scrape_runs ve scrape_run_items tabloları hazır.")
+    except Exception as e:
+        logging.error(f"Tarama geçmişi tabloları oluşturulurken hata oluştu: {e}")
+
+
+def prune_runs(retention_days: float = RUN_RETENTION_DAYS) -> int:
+    """
+    Deletes runs older than `retention_days` with their items: completed
+    ones as well as abandoned, incomplete, cancelled and failed ones, and
+    runs that died without ever finishing. Returns the number deleted.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            "DELETE FROM scrape_runs WHERE coalesce(finished_at, started_at) "
+            "< (now() AT TIME ZONE 'utc') - make_interval(secs => %s)",
+            (retention_days * 86400,),
+        )
+        pruned = cur.rowcount
+    if pruned:
+        logger.info(f"{pruned} old scrape runs pruned.")
+    return pruned
+
+
+def start_run() -> str:
+    prune_runs()
+    with get_cursor() as cur:
+        cur.execute("INSERT INTO scrape_runs DEFAULT VALUES RETURNING id")
+        run_id = str(cur.fetchone()[0])
+    logger.info(f"Scrape run {run_id} started.")
+    return run_id
+
+
+def find_resumable_run() -> str:
+    """
+    Latest unfinished run (running, cancelled, failed, or incomplete: it
+    ended with failed items left to retry) whose sitemap scan completed,
+    i.e. every item it has to process is already in scrape_run_items. Runs that died during the
+    sitemap scan are not resumed: a fresh scan skips the rows they already
+    wrote because those now match the lastmod index.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            "SELECT id FROM scrape_runs WHERE status <> 'completed' AND sitemap_complete "
+            "ORDER BY started_at DESC LIMIT 1"
+        )
+        row = cur.fetchone()
+    return str(row[0]) if row else None
+
+
+def abandon_unfinished_runs():
+    with get_cursor() as cur:
+        cur.execute(
+            "UPDATE scrape_runs SET status = 'abandoned', finished_at = (now() AT TIME ZONE 'utc') "
+            "WHERE status IN ('running', 'cancelled', 'failed') AND NOT sitemap_complete"
+        )
+
+
+def iter_unfinished_items(run_id: str, batch_size: int = RUN_JOURNAL_BATCH_SIZE) -> Iterator[Tuple[str, dict]]:
+    """
+    Items of the run still to process, in links order. Read a batch at a
+    time with keyset queries, each on a short pool checkout, so a long
+    resumed run holds no connection or snapshot between batches.
+    """
+    last = ""
+    while True:
+        with get_cursor() as cur:
+            cur.execute(
+                "SELECT links, data FROM scrape_run_items "
+                "WHERE run_id = %s AND links > %s AND status <> 'done' AND attempts < %s "
+                "ORDER BY links LIMIT %s",
+                (run_id, last, RUN_ITEM_MAX_ATTEMPTS, batch_size),
+            )
+            rows = cur.fetchall()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last = rows[-1][0]
+
+
+def count_retryable_items(run_id: str) -> int:
+    """
+    Items a resume of the run would process: not done and not out of attempts.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            "SELECT count(*) FROM scrape_run_items WHERE run_id = %s AND status <> 'done' AND attempts < %s",
+            (run_id, RUN_ITEM_MAX_ATTEMPTS),
+        )
+        return cur.fetchone()[0]
+
+
+def failed_links(run_id: str) -> List[str]:
+    with get_cursor() as cur:
+        cur.execute("SELECT links FROM scrape_run_items WHERE run_id = %s AND status = 'failed'", (run_id,))
+        return [links for (links,) in cur.fetchall()]
+
+
+def mark_sitemap_complete(run_id: str):
+    with get_cursor() as cur:
+        cur.execute("UPDATE scrape_runs SET sitemap_complete = TRUE WHERE id = %s", (run_id,))
+
+
+def finish_run(run_id: str, status: str):
+    with get_cursor() as cur:
+        cur.execute(
+            "UPDATE scrape_runs SET status = %s, finished_at = (now() AT TIME ZONE 'utc') WHERE id = %s",
+            (status, run_id),
+        )
+    logger.info(f"Scrape run {run_id} {status}.")
+
+
+class RunJournal:
+    """
+    Append-only status journal for one run. Items are recorded as pending
+    when they are discovered and as done/failed when they finish; both are
+    buffered and written in order at most RUN_JOURNAL_FLUSH_INTERVAL seconds
+    apart. Thread-safe.
+    """
+
+    def __init__(self, run_id: str, flush_interval: float = RUN_JOURNAL_FLUSH_INTERVAL):
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._statuses = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add_pending(self, links: str, data: dict):
+        with self._lock:
+            self._pending.append((self.run_id, links, json.dumps(data)))
+        self._maybe_flush()
+
+    def mark_done(self, links: List[str]):
+        self._add_statuses(links, "done", None)
+
+    def mark_failed(self, links: List[str], error: str = None):
+        self._add_statuses(links, "failed", error)
+
+    def _add_statuses(self, links, status, error):
+        with self._lock:
+            self._statuses.extend((self.run_id, link, status, error) for link in links)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        with self._lock:
+            size = len(self._pending) + len(self._statuses)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if size >= RUN_JOURNAL_BATCH_SIZE or (size and due):
+            self.flush()
+
+    def flush(self):
+        # Pending rows go first so a status is never written for an item the
+        # journal has not recorded yet.
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                statuses, self._statuses = self._statuses, []
+                self._last_flush = time.monotonic()
+            if not pending and not statuses:
+                return
+            try:
+                with get_cursor() as cur:
+                    if pending:
+                        execute_values(
+                            cur,
+                            "INSERT INTO scrape_run_items (run_id, links, data) VALUES %s "
+                            "ON CONFLICT (run_id, links) DO NOTHING",
+                            pending,
+                        )
+                    if statuses:
+                        execute_values(
+                            cur,
+                            """
+                            UPDATE scrape_run_items AS i SET
+                                status = s.status,
+                                error = s.error,
+                                attempts = i.attempts + (s.status = 'failed')::int,
+                                updated_at = (now() AT TIME ZONE 'utc')
+                            FROM (VALUES %s) AS s (run_id, links, status, error)
+                            WHERE i.run_id = s.run_id::uuid AND i.links = s.links
+                            """,
+                            statuses,
+                        )
+            except Exception as e:
+                # Put the rows back in front of anything added meanwhile; the
+                # next flush retries them in the same order.
+                with self._lock:
+                    self._pending = pending + self._pending
+                    self._statuses = statuses + self._statuses
+                logging.error(f"Tarama günlüğü yazılamadı ({len(pending)} yeni, {len(statuses)} durum): {e}")
@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+from typing import Iterable, List, Tuple
+from psycopg2.extras import execute_values
+from .db_methods import get_cursor
+
+logger = logging.getLogger(__name__)
+
+# A claimed item belongs to its worker until the lease runs out; workers
+# renew their leases every QUEUE_LEASE_SECONDS / 3 while they hold items.
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "120"))
+# An item that was claimed this many times without finishing is marked failed.
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+# Done items are deleted this many hours after they finished; they are only
+# kept for GET /scrape-queue and enqueue re-inserts them when they change.
+QUEUE_DONE_RETENTION_HOURS = float(os.getenv("QUEUE_DONE_RETENTION_HOURS", "24"))
+# Failed items go back to pending this many hours after they failed, so a
+# page that was down is retried even if its sitemap lastmod never changes.
+QUEUE_FAILED_COOLDOWN_HOURS = float(os.getenv("QUEUE_FAILED_COOLDOWN_HOURS", "6"))
+QUEUE_ENQUEUE_BATCH_SIZE = 1000
+QUEUE_PRUNE_BATCH_SIZE = 10000
+
+_NOW = "(now() AT TIME ZONE 'utc')"
+
+
+def create_queue_table():
+    create_query = f"""
+    CREATE TABLE IF NOT EXISTS scrape_queue (
+        links VARCHAR PRIMARY KEY,
+        data JSONB NOT NULL,
+        status VARCHAR NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        leased_by VARCHAR,
+        lease_expires_at TIMESTAMP,
+        error TEXT,
+        enqueued_at TIMESTAMP NOT NULL DEFAULT {_NOW},
+        updated_at TIMESTAMP NOT NULL DEFAULT {_NOW}
+    );
+    CREATE INDEX IF NOT EXISTS scrape_queue_pending
+        ON scrape_queue (enqueued_at) WHERE status = 'pending';
+    CREATE INDEX IF NOT EXISTS scrape_queue_leased
+        ON scrape_queue (lease_expires_at) WHERE status = 'leased';
+    CREATE INDEX IF NOT EXISTS scrape_queue_done
+        ON scrape_queue (updated_at) WHERE status = 'done';
+    CREATE INDEX IF NOT EXISTS scrape_queue_failed
+        ON scrape_queue (updated_at) WHERE status = 'failed';
+    """
+    try:
+        with get_cursor() as cur:
+            cur.execute(create_query)
+        logging.info("scrape_queue tablosu hazır.")
+    except Exception as e:
+        logging.error(f"scrape_queue tablosu oluşturulurken hata oluştu: {e}")
+
+
+def enqueue(entries: Iterable[Tuple[str, dict]]) -> int:
+    """
+    Adds (links, data) items as pending. Items already in the queue are
+    reset to pending with the new data, except ones a worker currently
+    holds. Returns the number of items added or reset.
+    """
+    query = f"""
+        INSERT INTO scrape_queue (links, data) VALUES %s
+        ON CONFLICT (links) DO UPDATE SET
+            data = EXCLUDED.data,
+            status = 'pending',
+            attempts = 0,
+            error = NULL,
+            enqueued_at = {_NOW},
+            updated_at = {_NOW}
+        WHERE scrape_queue.status <> 'leased'
+    """
+    total = 0
+    batch = []
+
+    def write():
+        nonlocal total
+        with get_cursor() as cur:
+            execute_values(cur, query, batch, page_size=QUEUE_ENQUEUE_BATCH_SIZE)
+            total += cur.rowcount
+        batch.clear()
+
+    for links, data in entries:
+        batch.append((links, json.dumps(data)))
+        if len(batch) >= QUEUE_ENQUEUE_BATCH_SIZE:
+            write()
+    if batch:
+        write()
+    logger.info(f"{total} items enqueued.")
+    return total
+
+
+def claim(worker_id: str, limit: int, lease_seconds: int = QUEUE_LEASE_SECONDS) -> List[Tuple[str, dict]]:
+    """
+    Leases up to `limit` pending items to `worker_id`, oldest first. Rows
+    another worker is claiming at the same moment are skipped rather than
+    waited for, so concurrent workers never receive the same item.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue AS q SET
+                status = 'leased',
+                leased_by = %(worker)s,
+                lease_expires_at = {_NOW} + make_interval(secs => %(lease)s),
+                attempts = q.attempts + 1,
+                updated_at = {_NOW}
+            FROM (
+                SELECT links FROM scrape_queue WHERE status = 'pending'
+                ORDER BY enqueued_at LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            ) AS claimed
+            WHERE q.links = claimed.links
+            RETURNING q.links, q.data
+            """,
+            {"worker": worker_id, "lease": lease_seconds, "limit": limit},
+        )
+        return cur.fetchall()
+
+
+def heartbeat(worker_id: str, links: List[str], lease_seconds: int = QUEUE_LEASE_SECONDS) -> int:
+    """
+    Extends the worker's leases on `links`. Returns how many it still held;
+    fewer than len(links) means some leases expired and were requeued.
+    """
+    if not links:
+        return 0
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue SET lease_expires_at = {_NOW} + make_interval(secs => %s)
+            WHERE links = ANY(%s) AND status = 'leased' AND leased_by = %s
+            """,
+            (lease_seconds, links, worker_id),
+        )
+        return cur.rowcount
+
+
+def complete(worker_id: str, links: List[str]) -> int:
+    if not links:
+        return 0
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue SET
+                status = 'done', leased_by = NULL, lease_expires_at = NULL, error = NULL, updated_at = {_NOW}
+            WHERE links = ANY(%s) AND status = 'leased' AND leased_by = %s
+            """,
+            (links, worker_id),
+        )
+        return cur.rowcount
+
+
+def fail(worker_id: str, links: List[str], error: str = None) -> int:
+    """
+    Puts failed items back as pending, or marks them failed once they were
+    claimed QUEUE_MAX_ATTEMPTS times.
+    """
+    if not links:
+        return 0
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue SET
+                status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                leased_by = NULL, lease_expires_at = NULL, error = %s, updated_at = {_NOW}
+            WHERE links = ANY(%s) AND status = 'leased' AND leased_by = %s
+            """,
+            (QUEUE_MAX_ATTEMPTS, error, links, worker_id),
+        )
+        return cur.rowcount
+
+
+def release(worker_id: str, links: List[str]) -> int:
+    """
+    Hands items a worker claimed but never started back to the queue
+    without counting the claim as an attempt.
+    """
+    if not links:
+        return 0
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue SET
+                status = 'pending', attempts = greatest(attempts - 1, 0),
+                leased_by = NULL, lease_expires_at = NULL, updated_at = {_NOW}
+            WHERE links = ANY(%s) AND status = 'leased' AND leased_by = %s
+            """,
+            (links, worker_id),
+        )
+        return cur.rowcount
+
+
+def requeue_expired() -> int:
+    """
+    Returns items whose lease ran out (the worker died or stalled) to the
+    queue, or marks them failed when they are out of attempts.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue SET
+                status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                error = 'lease expired (held by ' || leased_by || ')',
+                leased_by = NULL, lease_expires_at = NULL, updated_at = {_NOW}
+            WHERE status = 'leased' AND lease_expires_at < {_NOW}
+            """,
+            (QUEUE_MAX_ATTEMPTS,),
+        )
+        requeued = cur.rowcount
+    if requeued:
+        logger.warning(f"{requeued} expired leases requeued.")
+    return requeued
+
+
+def rearm_failed(cooldown_hours: float = QUEUE_FAILED_COOLDOWN_HOURS) -> int:
+    """
+    Puts items that failed more than `cooldown_hours` ago back as pending
+    with a fresh set of attempts. The sitemap delta was committed when they
+    were enqueued, so nothing else would ever retry them. Returns the number
+    re-armed.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE scrape_queue SET status = 'pending', attempts = 0, enqueued_at = {_NOW}, updated_at = {_NOW}
+            WHERE status = 'failed' AND updated_at < {_NOW} - make_interval(secs => %s)
+            """,
+            (cooldown_hours * 3600,),
+        )
+        rearmed = cur.rowcount
+    if rearmed:
+        logger.info(f"{rearmed} failed items re-armed after their cool-down.")
+    return rearmed
+
+
+def prune_done(retention_hours: float = QUEUE_DONE_RETENTION_HOURS) -> int:
+    """
+    Deletes done items that finished more than `retention_hours` ago, in
+    batches so no single statement holds many row locks. Rows another
+    worker is pruning are skipped. Returns the number deleted.
+    """
+    pruned = 0
+    while True:
+        with get_cursor() as cur:
+            cur.execute(
+                f"""
+                DELETE FROM scrape_queue WHERE links IN (
+                    SELECT links FROM scrape_queue
+                    WHERE status = 'done' AND updated_at < {_NOW} - make_interval(secs => %s)
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                """,
+                (retention_hours * 3600, QUEUE_PRUNE_BATCH_SIZE),
+            )
+            deleted = cur.rowcount
+        pruned += deleted
+        if deleted < QUEUE_PRUNE_BATCH_SIZE:
+            break
+    if pruned:
+        logger.info(f"{pruned} done items pruned.")
+    return pruned
+
+
+def queue_stats() -> dict:
+    with get_cursor() as cur:
+        cur.execute("SELECT status, count(*) FROM scrape_queue GROUP BY status")
+        counts = dict(cur.fetchall())
+        cur.execute("SELECT leased_by, count(*) FROM scrape_queue WHERE status = 'leased' GROUP BY leased_by")
+        workers = dict(cur.fetchall())
+    return {
+        "pending": counts.get("pending", 0),
+        "leased": counts.get("leased", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "leased_by_worker": workers,
+    }
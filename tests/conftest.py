@@ -0,0 +1,23 @@
+import os
+
+# The stub server is local; the per-host rate limit would only slow tests down.
+os.environ.setdefault("HTTP_RATE_LIMIT", "0")
+
+import psycopg2
+import pytest
+from src.db import db_methods
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    The configured Postgres (DB_URL / DB_*), with the tables created; tests
+    that need it are skipped when it is not reachable.
+    """
+    try:
+        psycopg2.connect(connect_timeout=3, **db_methods._connection_params()).close()
+    except psycopg2.Error as e:
+        pytest.skip(f"Postgres not reachable: {e}")
+    db_methods.create_table()
+    yield db_methods
+    db_methods.close_pool()
@@ -0,0 +1,82 @@
+"""
+A stand-in for a Selenium WebDriver backed by static HTML, enough for the
+lookups read_fields_with_waits makes, so the Selenium path runs without
+Chrome.
+"""
+import re
+from html.parser import HTMLParser
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+VOID_TAGS = {"meta", "link", "img", "br", "hr", "input"}
+
+
+class HtmlElement:
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.parts = []
+
+    @property
+    def text(self):
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+    def get_attribute(self, name):
+        return self.attrs.get(name)
+
+
+class _DomParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.elements = []
+        self._open = []
+
+    def handle_starttag(self, tag, attrs):
+        element = HtmlElement(tag, dict(attrs))
+        self.elements.append(element)
+        if tag not in VOID_TAGS:
+            self._open.append(element)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index].tag == tag:
+                del self._open[index:]
+                break
+
+    def handle_data(self, data):
+        for element in self._open:
+            element.parts.append(data)
+
+
+class HtmlDriver:
+    def __init__(self, html=""):
+        self.load(html)
+
+    def load(self, html):
+        parser = _DomParser()
+        parser.feed(html)
+        self.elements = parser.elements
+
+    def _matches(self, element, by, value):
+        if by == By.ID:
+            return element.attrs.get("id") == value
+        if by == By.CSS_SELECTOR:
+            return element.tag == value
+        if by == By.CLASS_NAME:
+            return value in (element.attrs.get("class") or "").split()
+        if by == By.LINK_TEXT:
+            return element.tag == "a" and element.text == value
+        if by == By.XPATH:
+            match = re.fullmatch(r"//\*\[contains\(text\(\), '(.*)'\)\]", value)
+            return bool(match) and match.group(1) in "".join(element.parts)
+        raise NotImplementedError(by)
+
+    def find_elements(self, by, value):
+        return [element for element in self.elements if self._matches(element, by, value)]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime
+import pytest
+from src.db import campground_queries
+
+PREFIX = "https://queries.invalid/"
+
+
+def _record(index, latitude, longitude):
+    return {
+        "id": str(uuid.uuid4()), "type": "campground", "links": f"{PREFIX}{index}", "name": f"Query {index}",
+        "latitude": latitude, "longitude": longitude, "region_name": "Test", "administrative_area": None,
+        "nearest_city_name": None, "accommodation_type_names": [], "bookable": True, "camper_types": [],
+        "operator": None, "photo_url": None, "photo_urls": [], "photos_count": 0, "rating": 4.0, "reviews_count": 0,
+        "slug": f"query-test-{index}", "price_low": None, "price_high": None,
+        "availability_updated_at": datetime(2026, 1, 1),
+    }
+
+
+@pytest.fixture
+def campgrounds(database):
+    def write(*points):
+        with database.CampgroundBatchWriter() as writer:
+            for index, (latitude, longitude) in enumerate(points):
+                writer.add(_record(index, latitude, longitude))
+    yield write
+    with database.get_cursor() as cur:
+        cur.execute("DELETE FROM campgrounds WHERE links LIKE %s", (PREFIX + "%",))
+        cur.execute("DELETE FROM campground_refresh_stats WHERE links LIKE %s", (PREFIX + "%",))
+
+
+def test_nearest_at_high_latitude_is_exact(campgrounds):
+    # Due east at 75N is ~290 km away but 10 planar degrees; the decoys due
+    # south are closer in degrees and fill the KNN candidates.
+    campgrounds((75.0, 10.0), *[(66.0 + i * 0.1, 0.0) for i in range(8)])
+    [row] = campground_queries.nearby_campgrounds(75.0, 0.0, limit=1)
+    assert row["slug"] == "query-test-0"
+    assert row["distance_km"] == pytest.approx(288, abs=2)
+
+
+def test_nearest_across_the_antimeridian(campgrounds):
+    campgrounds((-15.0, -179.95), (-15.0, 178.0))
+    [row] = campground_queries.nearby_campgrounds(-15.0, 179.95, limit=1)
+    assert row["slug"] == "query-test-0"
+    assert [row["slug"] for row in campground_queries.nearby_campgrounds(-15.0, 179.95, radius_km=50)] == ["query-test-0"]
+
+
+def test_radius_bbox_splits_at_the_antimeridian():
+    west, south, east, north = campground_queries._radius_bbox(-15.0, 179.95, 50)
+    assert west > east and east < -179.0 and west < 180.0
+    assert campground_queries._radius_bbox(89.9, 0.0, 50)[::2] == (-180.0, 180.0)
+
+
+def test_api_bbox_may_cross_the_antimeridian(campgrounds):
+    from src.api.api import app
+    campgrounds((-15.0, -179.95), (-15.0, 178.0), (-15.0, 0.0))
+    client = app.test_client()
+    response = client.get("/campgrounds", query_string={"bbox": "179,-16,-179,-14", "limit": 1000})
+    assert response.status_code == 200
+    slugs = {row["slug"] for row in response.json["campgrounds"] if row["slug"].startswith("query-test-")}
+    assert slugs == {"query-test-0"}
+    assert client.get("/campgrounds", query_string={"bbox": "179,-14,-179,-16"}).status_code == 400
@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime
+import pytest
+from src.db import change_history
+
+PREFIX = "https://changes.invalid/"
+
+
+def _record(index, **fields):
+    return {
+        "id": str(uuid.uuid4()), "type": "campground", "links": f"{PREFIX}{index}", "name": f"Change {index}",
+        "latitude": 40.0, "longitude": -100.0, "region_name": "Utah", "administrative_area": None,
+        "nearest_city_name": None, "accommodation_type_names": ["Tent"], "bookable": True, "camper_types": ["Tent"],
+        "operator": None, "photo_url": None, "photo_urls": [], "photos_count": 0, "rating": 4.0, "reviews_count": 1,
+        "slug": f"change-test-{index}", "price_low": 10.0, "price_high": 20.0,
+        "availability_updated_at": datetime(2026, 1, 1), **fields,
+    }
+
+
+@pytest.fixture
+def write(database):
+    def write(*records):
+        with database.CampgroundBatchWriter() as writer:
+            for record in records:
+                writer.add(record)
+    yield write
+    with database.get_cursor() as cur:
+        cur.execute(
+            "DELETE FROM campground_changes WHERE campground_id IN (SELECT id FROM campgrounds WHERE links LIKE %s)",
+            (PREFIX + "%",))
+        cur.execute("DELETE FROM campgrounds WHERE links LIKE %s", (PREFIX + "%",))
+        cur.execute("DELETE FROM campground_refresh_stats WHERE links LIKE %s", (PREFIX + "%",))
+
+
+def test_only_tracked_fields_that_changed_are_stored(write):
+    write(_record(1))
+    write(_record(1, photo_urls=["https://images.example.org/1.jpg"], availability_updated_at=datetime(2026, 2, 1)))
+    assert change_history.campground_history("change-test-1") == []
+
+    write(_record(1, price_low=12.0, availability_updated_at=datetime(2026, 3, 1)))
+    [row] = change_history.campground_history("change-test-1")
+    assert row["changes"] == {"price_low": [10.0, 12.0]}
+    assert [change["slug"] for change in change_history.recent_price_changes(days=1)
+            if change["slug"] == "change-test-1"] == ["change-test-1"]
@@ -0,0 +1,39 @@
+import uuid
+from datetime import datetime
+import pytest
+from psycopg2.pool import PoolError
+from src.db import campground_queries
+
+LINK = "https://export.invalid/1"
+
+
+@pytest.fixture
+def campground(database):
+    with database.CampgroundBatchWriter() as writer:
+        writer.add({
+            "id": str(uuid.uuid4()), "type": "campground", "links": LINK, "name": "Export 1",
+            "latitude": 40.0, "longitude": -100.0, "region_name": "Test", "administrative_area": None,
+            "nearest_city_name": None, "accommodation_type_names": [], "bookable": True, "camper_types": [],
+            "operator": None, "photo_url": None, "photo_urls": [], "photos_count": 0, "rating": 4.0,
+            "reviews_count": 0, "slug": "export-test-1", "price_low": None, "price_high": None,
+            "availability_updated_at": datetime(2026, 1, 1),
+        })
+    yield database
+    with database.get_cursor() as cur:
+        cur.execute("DELETE FROM campgrounds WHERE links = %s", (LINK,))
+        cur.execute("DELETE FROM campground_refresh_stats WHERE links = %s", (LINK,))
+
+
+def test_exports_use_dedicated_connections_and_are_capped(campground):
+    running = [campground_queries.iter_campground_batches(batch_size=1) for _ in range(campground.DB_DEDICATED_MAX)]
+    try:
+        for batches in running:
+            assert next(batches)
+        # Suspended exports hold no pooled connection.
+        assert campground.pool_metrics()["in_use"] == 0
+        with pytest.raises(PoolError):
+            next(campground_queries.iter_campground_batches())
+    finally:
+        for batches in running:
+            batches.close()
+    assert next(campground_queries.iter_campground_batches(batch_size=1))
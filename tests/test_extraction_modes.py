@@ -0,0 +1,32 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+from benchmarks.server import FixtureServer
+from src.Scraper.scraper import build_record, configure_driver, read_fields_with_script, read_fields_with_waits
+
+
+@pytest.fixture(scope="module")
+def driver():
+    """A real headless Chrome; skipped where none can be started."""
+    try:
+        driver = configure_driver()
+    except WebDriverException as e:
+        pytest.skip(f"Chrome not available: {e.msg}")
+    yield driver
+    driver.quit()
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FixtureServer(sitemap_urls=20, map_campgrounds=0) as server:
+        yield server
+
+
+def test_script_and_waits_modes_read_the_same_fields(driver, server):
+    # Bookable and non-bookable pages are both among the first few slugs.
+    for url in server.page_urls(6):
+        driver.get(url)
+        by_waits = read_fields_with_waits(driver)
+        by_script = read_fields_with_script(driver)
+
+        assert by_script == by_waits, url
+        assert build_record(url, {}, by_script) == build_record(url, {}, by_waits)
@@ -0,0 +1,85 @@
+import math
+import random
+import pytest
+from src.Scraper import geocoder
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * geocoder.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _write_places(path, places):
+    with open(path, "w", encoding="utf-8") as f:
+        for index, (name, lat, lon) in enumerate(places, start=1):
+            f.write("\t".join([str(index), name, name, "", str(lat), str(lon), "P", "PPL", "US", "", "UT"]
+                              + [""] * 8) + "\n")
+
+
+@pytest.fixture
+def places(tmp_path):
+    rng = random.Random(7)
+    # Includes points on both sides of the antimeridian and near a pole.
+    points = [(f"Place {i}", rng.uniform(-89.0, 89.0), rng.uniform(-180.0, 180.0)) for i in range(2000)]
+    path = tmp_path / "places.txt"
+    _write_places(path, points)
+    admin1 = tmp_path / "admin1.txt"
+    admin1.write_text("US.UT\tUtah\tUtah\t\n", encoding="utf-8")
+    reverse = geocoder.ReverseGeocoder(str(path), str(admin1), str(tmp_path / "index"))
+    yield points, reverse
+    reverse.close()
+
+
+def test_kd_tree_matches_brute_force(places):
+    points, reverse = places
+    rng = random.Random(11)
+    for _ in range(300):
+        lat, lon = rng.uniform(-90.0, 90.0), rng.uniform(-180.0, 180.0)
+        expected = min(points, key=lambda p: _haversine_km(lat, lon, p[1], p[2]))
+        place = reverse.nearest(lat, lon)
+        assert place.name == expected[0]
+        assert place.admin1 == "Utah"
+        assert place.distance_km == pytest.approx(_haversine_km(lat, lon, expected[1], expected[2]), abs=1e-6)
+
+
+def test_index_is_built_without_leftover_temporary_files(places, tmp_path):
+    assert [p.name for p in (tmp_path / "index").iterdir()] == ["places.kdtree"]
+
+
+@pytest.fixture
+def town(tmp_path, monkeypatch):
+    path = tmp_path / "town.txt"
+    _write_places(path, [("Moab", 38.5733, -109.5498)])
+    reverse = geocoder.ReverseGeocoder(str(path), str(tmp_path / "none.txt"), str(tmp_path / "index"))
+    monkeypatch.setattr(geocoder, "_geocoder", reverse)
+    yield
+    reverse.close()
+
+
+def _records():
+    return [
+        {"latitude": 38.60, "longitude": -109.55, "nearest_city_name": "Page City", "administrative_area": "Forest"},
+        {"latitude": 38.60, "longitude": -109.55, "nearest_city_name": "", "administrative_area": ""},
+        # ~220 km from Moab: beyond GEOCODER_MAX_DISTANCE_KM.
+        {"latitude": 40.55, "longitude": -109.55, "nearest_city_name": "", "administrative_area": "Park"},
+    ]
+
+
+def test_fill_only_sets_missing_cities_within_range(town, monkeypatch):
+    monkeypatch.setattr(geocoder, "GEOCODER_MODE", "fill")
+    records = geocoder.fill_location_fields(_records())
+    assert [r["nearest_city_name"] for r in records] == ["Page City", "Moab", ""]
+    assert [r["administrative_area"] for r in records] == ["Forest", "", "Park"]
+
+
+def test_replace_overwrites_only_when_a_place_is_in_range(town, monkeypatch):
+    monkeypatch.setattr(geocoder, "GEOCODER_MODE", "replace")
+    records = geocoder.fill_location_fields(_records())
+    assert [r["nearest_city_name"] for r in records] == ["Moab", "Moab", ""]
+    assert [r["administrative_area"] for r in records] == ["Forest", "", "Park"]
+
+
+def test_off_leaves_records_alone(town, monkeypatch):
+    monkeypatch.setattr(geocoder, "GEOCODER_MODE", "off")
+    assert geocoder.fill_location_fields(_records()) == _records()
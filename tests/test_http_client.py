@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+import requests
+from src.Scraper import http_client
+from src.Scraper.http_client import AIMDLimiter, CircuitBreaker, CircuitOpenError, OutboundClient, TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module inside http_client; sleep() advances it."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StubSession:
+    """Returns (or raises) the scripted outcomes in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(http_client, "time", clock)
+    return clock
+
+
+def test_token_bucket_spends_the_burst_then_waits_for_the_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+    # Idle time refills up to the burst, never beyond it.
+    clock.now += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert len(clock.sleeps) == 1
+
+
+def test_token_bucket_with_zero_rate_never_waits(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    for _ in range(10):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_aimd_grows_only_while_the_limit_is_binding(clock):
+    limiter = AIMDLimiter(initial=4, minimum=1, maximum=8)
+    # One request at a time under a limit of 4 is not held back.
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.acquire()
+    limiter.release()
+    assert limiter.limit == pytest.approx(4.25)
+
+
+def test_aimd_halves_once_per_window(clock):
+    limiter = AIMDLimiter(initial=16, minimum=1, maximum=32)
+    for _ in range(8):
+        limiter.acquire()
+    # A burst of failures from requests already in flight halves once.
+    for _ in range(4):
+        limiter.release(congested=True, window=2.0)
+    assert limiter.limit == 8
+
+    clock.now += 2.0
+    limiter.release(congested=True, window=2.0)
+    assert limiter.limit == 4
+    # Never below the minimum.
+    for _ in range(3):
+        clock.now += 2.0
+        limiter.release(congested=True, window=2.0)
+    assert limiter.limit == 1 and limiter.in_flight == 0
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=30)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe while half-open.
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+
+
+def test_released_probe_lets_the_next_call_probe(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.state == "open"
+    assert breaker.allow()
+    # Outside the half-open state it is a no-op.
+    breaker.record_success()
+    breaker.release_probe()
+    assert breaker.state == "closed"
+
+
+def test_retry_after_seconds_and_http_date(clock):
+    clock.now = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    in_two_minutes = format_datetime(datetime(2026, 1, 1, 0, 2, tzinfo=timezone.utc), usegmt=True)
+    in_the_past = format_datetime(datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(hours=1), usegmt=True)
+
+    assert http_client._retry_after(Response(429, {"Retry-After": "7"})) == 7
+    assert http_client._retry_after(Response(429, {"Retry-After": in_two_minutes})) == pytest.approx(120)
+    assert http_client._retry_after(Response(429, {"Retry-After": in_the_past})) == 0
+    assert http_client._retry_after(Response(429, {"Retry-After": "soon"})) is None
+    assert http_client._retry_after(Response(429)) is None
+    assert http_client._retry_after(None) is None
+
+
+def test_request_retries_errors_and_retryable_statuses(clock):
+    throttled = Response(429, {"Retry-After": "3"})
+    unavailable = Response(503)
+    session = StubSession(requests.ConnectionError("reset"), throttled, unavailable, Response(200))
+    client = OutboundClient(max_retries=4)
+
+    response = client.get("http://example.test/a", session=session)
+
+    assert response.status_code == 200
+    assert session.calls == 4
+    assert throttled.closed and unavailable.closed
+    assert clock.sleeps[1] == 3
+    stats = client.stats()["example.test"]
+    assert stats["retries"] == 3 and stats["throttled"] == 1 and stats["failures"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_request_returns_the_last_response_or_raises_the_last_error(clock):
+    client = OutboundClient(max_retries=2)
+    session = StubSession(Response(500), Response(502), Response(503))
+    assert client.get("http://example.test/a", session=session).status_code == 503
+    assert session.calls == 3
+
+    session = StubSession(*[requests.Timeout("slow")] * 3)
+    with pytest.raises(requests.Timeout):
+        client.get("http://example.test/b", session=session)
+    assert session.calls == 3
+
+
+def test_request_does_not_retry_client_errors(clock):
+    client = OutboundClient(max_retries=4)
+    session = StubSession(Response(404))
+    assert client.get("http://example.test/a", session=session).status_code == 404
+    assert session.calls == 1 and clock.sleeps == []
+
+
+def test_open_circuit_rejects_without_sending(clock, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_BREAKER_THRESHOLD", 2)
+    client = OutboundClient(max_retries=1)
+    session = StubSession(Response(500), Response(500))
+    client.get("http://example.test/a", session=session)
+
+    with pytest.raises(CircuitOpenError):
+        client.get("http://example.test/a", session=session)
+    assert session.calls == 2
+    assert client.stats()["example.test"]["rejected"] == 1
+
+
+def test_page_loads_do_not_share_the_request_concurrency_limit(clock):
+    client = OutboundClient()
+    state = client.host_state("http://example.test/a")
+    for _ in range(int(state.limiter.limit)):
+        state.limiter.acquire()
+
+    # With every request slot taken a page load still goes through.
+    assert client.call("http://example.test/a", lambda: "loaded") == "loaded"
+    assert state.page_limiter.limit == http_client.HTTP_MAX_CONCURRENCY
+    assert state.page_limiter.in_flight == 0
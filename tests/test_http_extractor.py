@@ -0,0 +1,65 @@
+import json
+import os
+from benchmarks.server import FIXTURE_DIR, render_page
+from src.Scraper.http_extractor import extract_campground_from_html, has_required_fields
+from src.Scraper.pipeline import build_db_record
+from src.Scraper.scraper import build_record, read_fields_with_waits
+from html_driver import HtmlDriver
+
+URL = "https://thedyrt.com/camping/utah/benchmark-campground-1"
+
+
+def _page(drop=(), **overrides):
+    with open(os.path.join(FIXTURE_DIR, "campground_page.html"), encoding="utf-8") as f:
+        html = render_page(f.read(), "utah", "benchmark-campground-1").decode()
+    start = html.index('id="__NEXT_DATA__"')
+    start = html.index(">", start) + 1
+    end = html.index("</script>", start)
+    next_data = json.loads(html[start:end])
+    attributes = next_data["props"]["pageProps"]["campground"]["attributes"]
+    for key in drop:
+        attributes.pop(key)
+    attributes.update(overrides)
+    return html[:start] + json.dumps(next_data) + html[end:], attributes
+
+
+def test_complete_next_data_is_extracted():
+    html, attributes = _page()
+    record = extract_campground_from_html(html, URL, {})
+    assert has_required_fields(record)
+    assert record["type"] == "Campground"
+    assert record["price_low"] == attributes["price-low"]
+    assert record["rating"] == attributes["rating"]
+
+
+def test_missing_price_rating_or_type_goes_to_selenium():
+    for keys in (("price-low", "price-high"), ("rating",), ("campground-type",)):
+        html, _ = _page(drop=keys)
+        assert extract_campground_from_html(html, URL, {}) is None, keys
+
+
+def test_null_price_is_stored_as_unknown():
+    html, _ = _page(**{"price-low": None})
+    record = extract_campground_from_html(html, URL, {})
+    assert record["price_low"] is None
+
+
+def test_null_coordinates_fall_back_to_the_page():
+    html, _ = _page(latitude=None, longitude=None)
+    record = extract_campground_from_html(html, URL, {})
+    coordinates = HtmlDriver(html).find_element("id", "coordinates").text.split()
+    assert (record["latitude"], record["longitude"]) == (coordinates[0], coordinates[2])
+
+
+def test_http_and_selenium_extract_the_same_record():
+    sitemap_data = {"availability_updated_at": "2024-05-01T12:00:00+00:00", "image_count": 1,
+                    "photo_url": "https://images.example.org/1.jpg", "photo_urls": ["https://images.example.org/1.jpg"]}
+    for slug in ("benchmark-campground-1", "benchmark-campground-2"):
+        url = URL.rsplit("/", 1)[0] + "/" + slug
+        with open(os.path.join(FIXTURE_DIR, "campground_page.html"), encoding="utf-8") as f:
+            html = render_page(f.read(), "utah", slug).decode()
+        via_http = extract_campground_from_html(html, url, dict(sitemap_data))
+        via_selenium = build_record(url, dict(sitemap_data), read_fields_with_waits(HtmlDriver(html)))
+        http_record, selenium_record = build_db_record(via_http), build_db_record(via_selenium)
+        http_record.pop("id"), selenium_record.pop("id")
+        assert http_record == selenium_record
@@ -0,0 +1,68 @@
+import threading
+from src.api.jobs import JobManager
+from src.Scraper.refresh_scheduler import RefreshScheduler
+
+
+def _wait(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if job.finished:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job.id} did not finish")
+
+
+def test_refresh_scrape_is_skipped_while_a_scrape_job_runs(monkeypatch):
+    release = threading.Event()
+    manager = JobManager(lambda progress: release.wait(5))
+    running, _ = manager.submit()
+
+    scheduler = RefreshScheduler(mode="local", jobs=manager)
+    monkeypatch.setattr("src.Scraper.refresh_scheduler.refresh_stats.seed_from_campgrounds", lambda: 0)
+    monkeypatch.setattr(scheduler, "update_from_sitemap", lambda: 0)
+    monkeypatch.setattr(scheduler, "plan", lambda candidates, now=None: ([("https://x.invalid/1", {})], {}))
+    monkeypatch.setattr("src.Scraper.refresh_scheduler.refresh_stats.iter_refresh_candidates", lambda: iter(()))
+
+    cycle = scheduler.run_cycle()
+    assert cycle["job_id"] == running.id
+    assert "scrape_skipped" in cycle
+    release.set()
+    _wait(running)
+
+    ran = []
+    monkeypatch.setattr("src.Scraper.refresh_scheduler.ScrapePipeline",
+                        lambda progress: type("Pipeline", (), {"run": lambda self, items: ran.extend(items)})())
+    cycle = scheduler.run_cycle()
+    job = manager.get(cycle["job_id"])
+    _wait(job)
+    assert job.kind == "refresh" and job.status == "succeeded"
+    assert ran == [("https://x.invalid/1", {})]
+
+
+def test_cancel_is_refused_once_the_job_finished():
+    release = threading.Event()
+    manager = JobManager(lambda progress: release.wait(5))
+    job, _ = manager.submit()
+    assert manager.cancel(job.id) == (job, True)
+    release.set()
+    _wait(job)
+    assert job.status == "cancelled"
+    assert manager.cancel(job.id) == (job, False)
+    assert manager.cancel("missing") == (None, False)
+
+
+def test_cancel_while_the_job_finishes_is_refused():
+    manager = JobManager(lambda progress: None)
+    finishing = threading.Event()
+    finish = manager._finish
+
+    def slow_finish(job, status):
+        finishing.set()
+        threading.Event().wait(0.2)
+        finish(job, status)
+
+    manager._finish = slow_finish
+    job, _ = manager.submit()
+    assert finishing.wait(5)
+    assert manager.cancel(job.id) == (job, False)
+    _wait(job)
+    assert job.status == "succeeded"
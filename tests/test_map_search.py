@@ -0,0 +1,79 @@
+from datetime import datetime
+import pytest
+from benchmarks.server import FixtureServer, map_point
+from src.Scraper import map_search
+from src.Scraper.map_search import MapSearchCrawler, build_db_record_from_search, campground_url, crawl_map_search
+
+CONTIGUOUS_US = [(-125.0, 24.0, -66.0, 50.0)]
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(sitemap_urls=0, map_campgrounds=600) as server:
+        yield server
+
+
+def test_crawl_splits_and_pages_until_every_campground_is_found(server):
+    # 12 of the 600 points share one location, more than a page of 10.
+    crawler = MapSearchCrawler(url=server.map_search_url, result_cap=10, concurrency=4, max_depth=6)
+    results = map_search.asyncio.run(crawler.crawl(CONTIGUOUS_US))
+
+    assert set(results) == {point["id"] for point in server.map_points}
+    assert crawler.stats["splits"] > 0
+    assert crawler.stats["failed_tiles"] == 0
+
+
+def test_small_area_is_a_single_request(server):
+    results = crawl_map_search([(-111.6, 38.4, -111.4, 38.6)], url=server.map_search_url, result_cap=500)
+    assert len(results) == 12
+    assert server.map_requests == 1
+
+
+def test_result_without_slug_has_no_url():
+    assert campground_url({"region-name": "Utah", "slug": None}) is None
+    assert campground_url({"region-name": "", "slug": "x"}) is None
+    with pytest.raises(ValueError):
+        build_db_record_from_search({"id": "1", "attributes": {"name": "x", "latitude": 1, "longitude": 2}})
+
+
+def test_type_comes_from_the_category_not_the_resource_type():
+    # Every stub result's JSON:API type is "campground".
+    assert build_db_record_from_search(map_point(1))["type"] == "Campground"
+    assert build_db_record_from_search(map_point(5))["type"] == "Dispersed"
+
+
+def test_map_crawl_does_not_clobber_scraped_rows(database, server, monkeypatch):
+    monkeypatch.setattr(map_search, "CAMPGROUND_BASE_URL", server.base_url + "/camping/")
+    point = server.map_points[1]
+    url = campground_url(point["attributes"])
+    scraped = {
+        **build_db_record_from_search(point),
+        "type": "Campground (page label)",
+        "operator": "Forest Service", "camper_types": ["Tent"], "accommodation_type_names": ["Tent"],
+        "photo_urls": ["https://images.example.org/1.jpg"], "price_low": None,
+        "availability_updated_at": datetime(2026, 1, 1),
+    }
+    try:
+        with database.CampgroundBatchWriter() as writer:
+            writer.add(scraped)
+        area = point["attributes"]
+        bbox = (area["longitude"] - 0.001, area["latitude"] - 0.001, area["longitude"] + 0.001, area["latitude"] + 0.001)
+        result = map_search.run_map_crawl(bboxes=[bbox], url=server.map_search_url)
+        assert result["written"]["updated"] == 1
+
+        with database.get_cursor() as cur:
+            cur.execute(
+                "SELECT type, operator, camper_types, photo_urls, availability_updated_at, price_low, content_hash "
+                "FROM campgrounds WHERE links = %s", (url,))
+            type_, operator, camper_types, photo_urls, availability, price_low, content_hash = cur.fetchone()
+        assert type_ == "Campground (page label)"
+        assert operator == "Forest Service"
+        assert camper_types == ["Tent"] and photo_urls == ["https://images.example.org/1.jpg"]
+        assert availability is not None
+        # The search result's price fills the gap the scrape left.
+        assert price_low == point["attributes"]["price-low"]
+        assert content_hash is None
+    finally:
+        with database.get_cursor() as cur:
+            cur.execute("DELETE FROM campgrounds WHERE links LIKE %s", (server.base_url + "%",))
+            cur.execute("DELETE FROM campground_refresh_stats WHERE links LIKE %s", (server.base_url + "%",))
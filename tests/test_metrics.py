@@ -0,0 +1,92 @@
+import re
+import threading
+import time
+from prometheus_client.parser import text_string_to_metric_families
+from src.Scraper import metrics
+from src.Scraper.http_client import OutboundClient, get_client
+from src.Scraper.metrics import HttpClientCollector, record_failure, timed
+from src.Scraper.profiler import SamplingProfiler
+
+FOLDED_LINE = re.compile(r"^(?P<stack>[^ ;][^;]*(?:;[^;]+)*) (?P<hits>\d+)$")
+
+
+def parked(event):
+    event.wait()
+
+
+def test_profiler_writes_collapsed_stacks(tmp_path):
+    release = threading.Event()
+    thread = threading.Thread(target=parked, args=(release,), name="parked-thread")
+    thread.start()
+    profiler = SamplingProfiler("unit", interval=0.001, output_dir=str(tmp_path)).start()
+    try:
+        deadline = time.monotonic() + 5
+        while profiler.samples < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        path = profiler.stop()
+        release.set()
+        thread.join()
+
+    lines = open(path, encoding="utf-8").read().splitlines()
+    parsed = [FOLDED_LINE.match(line) for line in lines]
+    assert lines and all(parsed), lines
+    # Outermost first: the thread name, then the frames down to the leaf.
+    parked_stacks = [m["stack"].split(";") for m in parsed if m["stack"].startswith("parked-thread;")]
+    assert parked_stacks
+    frames = parked_stacks[0]
+    assert frames[1].startswith("_bootstrap (threading.py:")
+    assert any(re.fullmatch(r"parked \(test_metrics\.py:\d+\)", frame) for frame in frames)
+    assert frames[-1].startswith("wait (threading.py:")
+    # The profiler never samples its own thread.
+    assert not any(m["stack"].startswith("sampling-profiler;") for m in parsed)
+    assert sum(int(m["hits"]) for m in parsed) == sum(profiler.stacks.values())
+
+
+def test_collector_exports_per_host_gauges(monkeypatch):
+    client = OutboundClient()
+    busy = client.host_state("https://busy.example.test/a")
+    client.host_state("https://idle.example.test/a")
+    busy.limiter.acquire()
+    busy.count("requests")
+    busy.count("retries")
+    busy.breaker.state = "open"
+    monkeypatch.setattr(metrics, "get_client", lambda: client)
+
+    samples = {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in HttpClientCollector().collect() for sample in family.samples
+    }
+
+    def value(name, host, **labels):
+        return samples[(name, tuple(sorted({"host": host, **labels}.items())))]
+
+    assert value("http_client_events_total", "busy.example.test", event="requests") == 1
+    assert value("http_client_events_total", "busy.example.test", event="retries") == 1
+    assert value("http_client_events_total", "idle.example.test", event="requests") == 0
+    assert value("http_client_in_flight", "busy.example.test") == 1
+    assert value("http_client_in_flight", "idle.example.test") == 0
+    assert value("http_client_concurrency_limit", "busy.example.test") == busy.limiter.limit
+    assert value("http_client_circuit_open", "busy.example.test") == 1
+    assert value("http_client_circuit_open", "idle.example.test") == 0
+
+
+def test_metrics_endpoint_renders_parseable_text():
+    from src.api.api import app
+    with timed("geocode"):
+        pass
+    record_failure("selenium", "TimeoutException")
+    get_client().host_state("https://metrics.example.test/")
+
+    response = app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    families = {family.name: family for family in text_string_to_metric_families(response.get_data(as_text=True))}
+    for name in ("scraper_stage_seconds", "scraper_failures", "scraper_pages", "http_client_events",
+                 "http_client_concurrency_limit", "http_client_circuit_open"):
+        assert name in families, name
+    assert any(sample.labels.get("host") == "metrics.example.test"
+               for sample in families["http_client_concurrency_limit"].samples)
+    assert any(sample.labels == {"stage": "selenium", "error": "TimeoutException"}
+               for sample in families["scraper_failures"].samples)
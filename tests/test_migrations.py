@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from datetime import datetime
+import psycopg2
+import pytest
+
+SCHEMA = "migration_test"
+
+
+@pytest.fixture
+def legacy_schema(database, monkeypatch):
+    """
+    A scratch schema holding a pre-upsert campgrounds table (no unique index
+    on links); create_table() runs against it through get_cursor.
+    """
+    conn = psycopg2.connect(**database._connection_params())
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"CREATE TABLE {SCHEMA}.campgrounds (LIKE public.campgrounds INCLUDING DEFAULTS)")
+        cur.execute(f"SET search_path TO {SCHEMA}, public")
+    conn.commit()
+
+    @contextmanager
+    def scratch_cursor(cursor_factory=None, timeout=None):
+        cur = conn.cursor(cursor_factory=cursor_factory)
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    monkeypatch.setattr(database, "get_cursor", scratch_cursor)
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def test_dedup_keeps_the_most_recently_updated_copy(database, legacy_schema):
+    rows = [
+        # (links, name, availability_updated_at) in insertion order
+        ("a", "a-newest", datetime(2025, 6, 1)),
+        ("a", "a-older", datetime(2024, 1, 1)),
+        ("a", "a-unknown", None),
+        ("b", "b-first", datetime(2025, 1, 1)),
+        ("b", "b-last", datetime(2025, 1, 1)),
+        ("c", "c-first", None),
+        ("c", "c-last", None),
+        ("d", "d-only", datetime(2023, 1, 1)),
+    ]
+    with legacy_schema.cursor() as cur:
+        for links, name, updated in rows:
+            cur.execute(
+                "INSERT INTO campgrounds (type, links, name, latitude, longitude, region_name, "
+                "accommodation_type_names, camper_types, photo_urls, availability_updated_at) "
+                "VALUES ('Campground', %s, %s, 38.5, -111.5, 'Utah', '{}', '{}', '{}', %s)",
+                (links, name, updated),
+            )
+    legacy_schema.commit()
+
+    database.create_table()
+
+    with legacy_schema.cursor() as cur:
+        cur.execute("SELECT links, name FROM campgrounds ORDER BY links")
+        kept = cur.fetchall()
+        cur.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = %s AND indexname = 'campgrounds_links_key'", (SCHEMA,)
+        )
+        indexed = cur.fetchone()
+    assert kept == [("a", "a-newest"), ("b", "b-last"), ("c", "c-last"), ("d", "d-only")]
+    assert indexed is not None
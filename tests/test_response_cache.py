@@ -0,0 +1,123 @@
+from flask import Flask, jsonify
+import pytest
+from src.api import cache
+from src.api.cache import ResponseCache, cached_response
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def app(monkeypatch, clock):
+    """A one-view app on a fresh cache; the view counts its calls."""
+    version = {"value": 1}
+    calls = {"count": 0}
+    monkeypatch.setattr(cache, "dataset_version", lambda: version["value"])
+    monkeypatch.setattr(cache, "response_cache", ResponseCache(max_entries=10, max_bytes=10_000, ttl=60))
+
+    app = Flask(__name__)
+
+    @app.route("/items")
+    @cached_response
+    def items():
+        calls["count"] += 1
+        return jsonify({"call": calls["count"]})
+
+    @app.route("/missing")
+    @cached_response
+    def missing():
+        calls["count"] += 1
+        return jsonify({"error": "not found"}), 404
+
+    app.version, app.calls = version, calls
+    return app
+
+
+def test_lru_evicts_the_least_recently_used_entry_by_count(clock):
+    lru = ResponseCache(max_entries=2, max_bytes=1000, ttl=60)
+    lru.put("a", b"1", "text/plain", 1)
+    lru.put("b", b"2", "text/plain", 1)
+    assert lru.get("a") is not None
+    lru.put("c", b"3", "text/plain", 1)
+
+    assert lru.get("b") is None
+    assert lru.get("a") is not None and lru.get("c") is not None
+    assert lru.stats()["evictions"] == 1
+
+
+def test_lru_evicts_by_bytes_and_skips_oversized_bodies(clock):
+    lru = ResponseCache(max_entries=10, max_bytes=10, ttl=60)
+    lru.put("a", b"12345", "text/plain", 1)
+    lru.put("b", b"12345", "text/plain", 1)
+    lru.put("c", b"123", "text/plain", 1)
+    assert lru.get("a") is None
+    assert lru.stats()["bytes"] == 8
+
+    entry = lru.put("huge", b"x" * 11, "text/plain", 1)
+    assert entry.body == b"x" * 11
+    assert lru.get("huge") is None
+    assert lru.stats()["entries"] == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    lru = ResponseCache(max_entries=10, max_bytes=1000, ttl=60)
+    lru.put("a", b"1", "text/plain", 1)
+    clock.now += 59
+    assert lru.get("a") is not None
+    clock.now += 1
+    assert lru.get("a") is None
+    assert lru.stats()["entries"] == 0 and lru.stats()["bytes"] == 0
+
+
+def test_second_request_is_served_from_the_cache(app):
+    client = app.test_client()
+    first = client.get("/items?b=2&a=1")
+    second = client.get("/items?a=1&b=2")
+
+    assert first.headers["X-Cache"] == "MISS" and second.headers["X-Cache"] == "HIT"
+    assert second.get_json() == first.get_json() == {"call": 1}
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert app.calls["count"] == 1
+
+
+def test_dataset_version_bump_invalidates(app):
+    client = app.test_client()
+    first = client.get("/items")
+    app.version["value"] += 1
+    second = client.get("/items")
+
+    assert second.headers["X-Cache"] == "MISS"
+    assert second.get_json() == {"call": 2}
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+def test_matching_if_none_match_gets_304(app):
+    client = app.test_client()
+    etag = client.get("/items").headers["ETag"]
+
+    revalidated = client.get("/items", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.data == b""
+
+    app.version["value"] += 1
+    changed = client.get("/items", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.get_json() == {"call": 2}
+
+
+def test_error_responses_are_not_cached(app):
+    client = app.test_client()
+    assert client.get("/missing").status_code == 404
+    assert client.get("/missing").status_code == 404
+    assert app.calls["count"] == 2
+    assert cache.response_cache.stats()["entries"] == 0
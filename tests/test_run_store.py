@@ -0,0 +1,70 @@
+import pytest
+from src.db import run_store
+
+
+@pytest.fixture
+def run_id(database):
+    run_store.create_run_tables()
+    run_id = run_store.start_run()
+    yield run_id
+    with database.get_cursor() as cur:
+        cur.execute("DELETE FROM scrape_runs WHERE id = %s", (run_id,))
+
+
+def test_rows_survive_a_failed_journal_flush(run_id, monkeypatch):
+    journal = run_store.RunJournal(run_id, flush_interval=3600)
+    journal.add_pending("https://example.invalid/a", {})
+    journal.add_pending("https://example.invalid/b", {})
+    journal.mark_failed(["https://example.invalid/a"], "boom")
+
+    def broken_cursor(*args, **kwargs):
+        raise RuntimeError("database down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(run_store, "get_cursor", broken_cursor)
+        journal.flush()
+    journal.flush()
+
+    assert run_store.failed_links(run_id) == ["https://example.invalid/a"]
+    assert sorted(links for links, _ in run_store.iter_unfinished_items(run_id)) == [
+        "https://example.invalid/a", "https://example.invalid/b",
+    ]
+
+
+def test_run_with_retryable_failures_is_resumed(run_id):
+    journal = run_store.RunJournal(run_id)
+    journal.add_pending("https://example.invalid/a", {})
+    journal.mark_failed(["https://example.invalid/a"], "boom")
+    journal.flush()
+    run_store.mark_sitemap_complete(run_id)
+
+    assert run_store.count_retryable_items(run_id) == 1
+    run_store.finish_run(run_id, "incomplete")
+    assert run_store.find_resumable_run() == run_id
+
+
+def test_unfinished_items_are_paged_by_links(run_id):
+    journal = run_store.RunJournal(run_id, flush_interval=3600)
+    for index in range(7):
+        journal.add_pending(f"https://example.invalid/{index}", {"index": index})
+    journal.mark_done(["https://example.invalid/2", "https://example.invalid/5"])
+    journal.flush()
+    items = list(run_store.iter_unfinished_items(run_id, batch_size=2))
+    assert [data["index"] for _, data in items] == [0, 1, 3, 4, 6]
+
+
+def test_old_runs_are_pruned_whatever_their_status(run_id, database):
+    old = [run_store.start_run() for _ in range(3)]
+    for other, status in zip(old, ("abandoned", "incomplete", None)):
+        if status:
+            run_store.finish_run(other, status)
+    with database.get_cursor() as cur:
+        cur.execute(
+            "UPDATE scrape_runs SET started_at = started_at - interval '30 days', "
+            "finished_at = finished_at - interval '30 days' WHERE id = ANY(%s::uuid[])",
+            (old,),
+        )
+    run_store.prune_runs(retention_days=7)
+    with database.get_cursor() as cur:
+        cur.execute("SELECT id::text FROM scrape_runs WHERE id = ANY(%s::uuid[])", (old + [run_id],))
+        assert [row[0] for row in cur.fetchall()] == [run_id]
@@ -0,0 +1,70 @@
+import multiprocessing
+import pytest
+from src.db import scrape_queue
+
+PREFIX = "https://queue.invalid/"
+ITEMS = 600
+WORKERS = 4
+
+
+def _claim_all(worker_id, start):
+    # Runs in a child process, with its own pool; all workers start claiming
+    # together so they really contend for the same rows.
+    start.wait()
+    claimed = []
+    while True:
+        rows = scrape_queue.claim(worker_id, 7)
+        if not rows:
+            return claimed
+        claimed.extend(links for links, _ in rows)
+        scrape_queue.complete(worker_id, [links for links, _ in rows])
+
+
+@pytest.fixture
+def queue(database):
+    scrape_queue.create_queue_table()
+    if any(scrape_queue.queue_stats()[status] for status in ("pending", "leased")):
+        pytest.skip("scrape_queue has items of its own.")
+    yield scrape_queue
+    with database.get_cursor() as cur:
+        cur.execute("DELETE FROM scrape_queue WHERE links LIKE %s", (PREFIX + "%",))
+
+
+def test_concurrent_processes_never_claim_the_same_item(queue):
+    queue.enqueue((f"{PREFIX}{index}", {"index": index}) for index in range(ITEMS))
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, context.Pool(WORKERS) as pool:
+        start = manager.Barrier(WORKERS)
+        claimed = pool.starmap(_claim_all, [(f"test-worker-{index}", start) for index in range(WORKERS)])
+    everything = [links for links in sum(claimed, []) if links.startswith(PREFIX)]
+    assert len(everything) == len(set(everything)) == ITEMS
+    assert sum(1 for links in claimed if links) > 1
+
+
+def test_prune_done_keeps_recent_and_unfinished_items(queue, database):
+    queue.enqueue([(f"{PREFIX}old", {}), (f"{PREFIX}new", {}), (f"{PREFIX}pending", {})])
+    queue.claim("test-worker", 3)
+    queue.complete("test-worker", [f"{PREFIX}old", f"{PREFIX}new"])
+    queue.release("test-worker", [f"{PREFIX}pending"])
+    with database.get_cursor() as cur:
+        cur.execute("UPDATE scrape_queue SET updated_at = updated_at - interval '2 days' WHERE links = %s",
+                    (f"{PREFIX}old",))
+    assert queue.prune_done(retention_hours=24) == 1
+    with database.get_cursor() as cur:
+        cur.execute("SELECT links FROM scrape_queue WHERE links LIKE %s ORDER BY links", (PREFIX + "%",))
+        assert [row[0] for row in cur.fetchall()] == [f"{PREFIX}new", f"{PREFIX}pending"]
+
+
+def test_failed_items_are_rearmed_after_the_cooldown(queue, database):
+    queue.enqueue([(f"{PREFIX}old", {}), (f"{PREFIX}recent", {})])
+    for _ in range(queue.QUEUE_MAX_ATTEMPTS):
+        queue.claim("test-worker", 2)
+        queue.fail("test-worker", [f"{PREFIX}old", f"{PREFIX}recent"], "boom")
+    with database.get_cursor() as cur:
+        cur.execute("UPDATE scrape_queue SET updated_at = updated_at - interval '1 day' WHERE links = %s",
+                    (f"{PREFIX}old",))
+    assert queue.rearm_failed(cooldown_hours=6) == 1
+    with database.get_cursor() as cur:
+        cur.execute("SELECT links, status, attempts FROM scrape_queue WHERE links LIKE %s ORDER BY links",
+                    (PREFIX + "%",))
+        assert cur.fetchall() == [(f"{PREFIX}old", "pending", 0), (f"{PREFIX}recent", "failed", queue.QUEUE_MAX_ATTEMPTS)]
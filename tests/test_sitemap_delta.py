@@ -0,0 +1,49 @@
+from benchmarks.server import FixtureServer
+from src.Scraper import pipeline
+from src.Scraper.sitemap_handler import SitemapDelta
+
+
+def _changed_locs(server, cache_dir, exclude=()):
+    delta = SitemapDelta(server.sitemap_url, cache_dir=str(cache_dir))
+    if not delta.fetch():
+        return None
+    locs = [loc for loc, _, _ in delta]
+    delta.commit(exclude=exclude)
+    return locs
+
+
+def test_excluded_locs_stay_changed_after_commit(tmp_path):
+    with FixtureServer(sitemap_urls=50, map_campgrounds=0) as server:
+        first = _changed_locs(server, tmp_path, exclude=server.page_urls(50)[:3])
+        second = _changed_locs(server, tmp_path)
+        third = _changed_locs(server, tmp_path)
+
+    assert len(first) == 50
+    # The sitemap answers 304 from the second run on; the excluded locs
+    # are replayed from the cached copy once, then nothing is left.
+    assert second == server.page_urls(3)
+    assert third is None
+    assert server.sitemap_requests == 3 and server.sitemap_not_modified == 2
+
+
+def test_second_run_makes_no_page_requests(database, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "SCRAPER_ENGINE", "http")
+    with FixtureServer(sitemap_urls=10, map_campgrounds=0) as server:
+        monkeypatch.setattr(pipeline, "SITEMAP_URL", server.sitemap_url)
+        first = {}
+        try:
+            first = pipeline.run_scrape()
+            pages_after_first = server.page_requests
+            second = pipeline.run_scrape()
+        finally:
+            with database.get_cursor() as cur:
+                cur.execute("DELETE FROM campgrounds WHERE links LIKE %s", (server.base_url + "%",))
+                cur.execute("DELETE FROM campground_refresh_stats WHERE links LIKE %s", (server.base_url + "%",))
+                cur.execute("DELETE FROM scrape_runs WHERE id = %s", (first.get("run_id"),))
+
+    assert first["message"] == "Completed." and first["retryable"] == 0
+    assert pages_after_first == 10
+    assert second == {"message": "Sitemap not modified."}
+    assert server.page_requests == pages_after_first
+    assert server.sitemap_not_modified == 1
@@ -0,0 +1,166 @@
+import queue
+import threading
+import pytest
+from selenium.common.exceptions import WebDriverException
+from src.Scraper import scraper
+from src.Scraper.progress import ScrapeProgress
+from src.Scraper.scraper import STOP, WebDriverPool
+
+
+class FakeDriver:
+    def __init__(self, index, crash_on):
+        self.index = index
+        self.crash_on = crash_on
+        self.pages = []
+        self.quit_calls = 0
+
+    def get(self, url):
+        if self.crash_on(url, self):
+            raise WebDriverException("chrome not reachable")
+        self.pages.append(url)
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class DriverFactory:
+    """Hands out FakeDrivers; crash_on(url, driver) decides which loads fail."""
+
+    def __init__(self, crash_on=lambda url, driver: False):
+        self.crash_on = crash_on
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            driver = FakeDriver(len(self.drivers), self.crash_on)
+            self.drivers.append(driver)
+            return driver
+
+
+@pytest.fixture(autouse=True)
+def fake_scrape(monkeypatch):
+    def scrape(driver, url, data):
+        driver.get(url)
+        return {"name": url, "slug": url.rsplit("/", 1)[-1], "driver": driver.index}
+    monkeypatch.setattr(scraper, "scrape_campground_page", scrape)
+
+
+def _run(pool, urls):
+    tasks = queue.Queue()
+    for url in urls:
+        tasks.put((url, {}))
+    for _ in range(pool.size):
+        tasks.put(STOP)
+    results = {}
+    lock = threading.Lock()
+
+    def collect(url, record):
+        with lock:
+            assert url not in results
+            results[url] = record
+
+    pool.run(tasks, collect, total=len(urls))
+    return results
+
+
+URLS = [f"https://example.test/camping/utah/site-{i}" for i in range(40)]
+
+
+def test_every_url_gets_one_result_and_every_driver_is_quit():
+    factory = DriverFactory()
+    pool = WebDriverPool(size=4, pages_per_driver=1000, driver_factory=factory, memory_probe=lambda driver: None)
+
+    results = _run(pool, URLS)
+
+    assert set(results) == set(URLS)
+    assert sum(len(driver.pages) for driver in factory.drivers) == len(URLS)
+    assert len(factory.drivers) <= 4
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
+    assert pool.progress.done == len(URLS) and pool.progress.failed == 0
+
+
+def test_crash_is_retried_once_on_a_fresh_driver():
+    crashed = set()
+
+    def crash_once(url, driver):
+        # Only the first load of site-3 crashes its driver.
+        if url == URLS[3] and url not in crashed:
+            crashed.add(url)
+            return True
+        return False
+
+    factory = DriverFactory(crash_once)
+    pool = WebDriverPool(size=1, pages_per_driver=1000, driver_factory=factory, memory_probe=lambda driver: None)
+
+    results = _run(pool, URLS[:6])
+
+    assert set(results) == set(URLS[:6])
+    assert len(factory.drivers) == 2
+    assert factory.drivers[0].quit_calls == 1
+    assert results[URLS[3]]["driver"] == 1
+    assert pool.progress.failed == 0
+
+
+def test_page_that_crashes_twice_fails_once():
+    factory = DriverFactory(lambda url, driver: url == URLS[2])
+    pool = WebDriverPool(size=1, pages_per_driver=1000, driver_factory=factory, memory_probe=lambda driver: None)
+
+    results = _run(pool, URLS[:5])
+
+    assert set(results) == set(URLS[:5]) - {URLS[2]}
+    assert pool.progress.failed == 1 and pool.progress.done == 4
+    assert len(factory.drivers) == 3
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
+
+
+def test_driver_is_recycled_after_pages_per_driver():
+    factory = DriverFactory()
+    pool = WebDriverPool(size=1, pages_per_driver=3, driver_factory=factory, memory_probe=lambda driver: None)
+
+    _run(pool, URLS[:7])
+
+    assert [len(driver.pages) for driver in factory.drivers] == [3, 3, 1]
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
+
+
+def test_driver_over_the_memory_limit_is_recycled(monkeypatch):
+    monkeypatch.setattr(scraper, "RSS_CHECK_INTERVAL", 2)
+    factory = DriverFactory()
+    pool = WebDriverPool(size=1, pages_per_driver=1000, driver_factory=factory, max_rss_mb=100,
+                         memory_probe=lambda driver: 200 * 2**20)
+
+    _run(pool, URLS[:5])
+
+    assert [len(driver.pages) for driver in factory.drivers] == [2, 2, 1]
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
+    assert pool.peak_rss == {0: 200 * 2**20}
+
+
+def test_stopped_pool_drains_a_bounded_queue_and_quits_its_drivers():
+    factory = DriverFactory()
+    progress = ScrapeProgress()
+    pool = WebDriverPool(size=2, pages_per_driver=1000, driver_factory=factory, progress=progress,
+                         memory_probe=lambda driver: None)
+    tasks = queue.Queue(maxsize=2)
+    results = []
+
+    def produce():
+        for url in URLS:
+            tasks.put((url, {}))
+        for _ in range(pool.size):
+            tasks.put(STOP)
+
+    def collect(url, record):
+        results.append(url)
+        pool.stop()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    pool.run(tasks, collect)
+    producer.join(timeout=5)
+
+    assert not producer.is_alive()
+    assert tasks.empty()
+    assert 1 <= len(results) <= pool.size
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
@@ -0,0 +1,92 @@
+"""
+Scrape queue worker. Claims campgrounds from the scrape_queue table and
+scrapes them; any number of these can run side by side, on one machine or
+several, against the same database.
+
+    python worker.py                               # scrape until stopped
+    python worker.py --processes 4                 # four worker processes
+    python worker.py --exit-when-empty             # stop once the queue is drained
+    python worker.py --enqueue                     # scan the sitemap and enqueue changes
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+from prometheus_client import start_http_server
+from src.db import db_methods, scrape_queue
+from src.Scraper.queue_worker import QueueWorker, enqueue_updated_entries
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Each worker process serves /metrics on WORKER_METRICS_PORT + its index; 0 disables it.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+
+def start_logging():
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format="%(asctime)s - %(processName)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+
+def prepare_database():
+    db_methods.create_database()
+    db_methods.create_table()
+    scrape_queue.create_queue_table()
+
+
+def run_worker(index=0, exit_when_empty=False, metrics_port=WORKER_METRICS_PORT):
+    start_logging()
+    if metrics_port:
+        start_http_server(metrics_port + index)
+    worker = QueueWorker(exit_when_empty=exit_when_empty)
+
+    def stop(signum, frame):
+        logging.info(f"Signal {signum} received, finishing the pages in progress.")
+        worker.progress.cancel()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    result = worker.run()
+    logging.info(f"Worker finished: {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--exit-when-empty", action="store_true")
+    parser.add_argument("--enqueue", action="store_true", help="enqueue changed campgrounds and exit")
+    args = parser.parse_args()
+
+    start_logging()
+    prepare_database()
+    if args.enqueue:
+        logging.info(f"Enqueue finished: {enqueue_updated_entries()}")
+        return
+    if args.processes <= 1:
+        run_worker(exit_when_empty=args.exit_when_empty)
+        return
+
+    # Spawned, not forked: every worker opens its own DB pool and threads.
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(i, args.exit_when_empty), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()